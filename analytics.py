@@ -0,0 +1,205 @@
+"""Columnar sales extracts for the reporting API.
+
+Paid bills and their order lines are pulled into NumPy arrays once and
+topped up incrementally by bill_id, so a report over any date range is a
+couple of binary searches and bincounts instead of SQL over order history.
+Timestamps are stored as int64 seconds in the database's local time.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+DAY = 86400
+
+
+class Columns:
+    """One immutable set of arrays; a refresh builds a new one and swaps it in."""
+
+    def __init__(self, bill_ts=None, bill_revenue=None, line_ts=None, line_item=None,
+                 line_qty=None, line_revenue=None):
+        self.bill_ts = _array(bill_ts, np.int64)
+        self.bill_revenue = _array(bill_revenue, np.float64)
+        self.line_ts = _array(line_ts, np.int64)
+        self.line_item = _array(line_item, np.int64)
+        self.line_qty = _array(line_qty, np.int64)
+        self.line_revenue = _array(line_revenue, np.float64)
+
+    def extend(self, bills, lines):
+        """Return new Columns with extra bills/lines appended, kept sorted by time."""
+        bill_ts = np.concatenate([self.bill_ts, bills[0]])
+        bill_revenue = np.concatenate([self.bill_revenue, bills[1]])
+        order = np.argsort(bill_ts, kind='stable')
+        line_ts = np.concatenate([self.line_ts, lines[0]])
+        line_cols = [np.concatenate([old, new]) for old, new in
+                     zip((self.line_item, self.line_qty, self.line_revenue), lines[1:])]
+        line_order = np.argsort(line_ts, kind='stable')
+        return Columns(bill_ts[order], bill_revenue[order], line_ts[line_order],
+                       *(col[line_order] for col in line_cols))
+
+
+def _array(values, dtype):
+    if values is None:
+        return np.empty(0, dtype=dtype)
+    return np.asarray(values, dtype=dtype)
+
+
+def _to_seconds(timestamps):
+    return np.array(timestamps, dtype='datetime64[s]').astype(np.int64)
+
+
+def bucket_starts(ts, granularity):
+    if granularity == 'hour':
+        return ts - ts % 3600
+    days = ts // DAY
+    if granularity == 'day':
+        return days * DAY
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        return (days - (days + 3) % 7) * DAY
+    months = ts.astype('datetime64[s]').astype('datetime64[M]')
+    return months.astype('datetime64[s]').astype(np.int64)
+
+
+def bucket_labels(starts, granularity):
+    unit = {'hour': 'h', 'day': 'D', 'week': 'D', 'month': 'M'}[granularity]
+    return np.datetime_as_string(starts.astype('datetime64[s]'), unit=unit).tolist()
+
+
+class SalesExtract:
+    """Paid bills as Columns, topped up by bill_id.
+
+    Concurrent settles can commit a lower bill_id after a higher one was
+    loaded, so each update re-reads the `rescan` ids below the highest one
+    loaded and skips the bills it already has.
+    """
+
+    def __init__(self, refresh=60, rescan=1000):
+        self.refresh = refresh
+        self.rescan = rescan
+        self.columns = Columns()
+        self.last_bill_id = 0
+        # Loaded bill ids inside the rescan window
+        self._loaded = set()
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def needs_refresh(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh
+
+    def update(self, conn):
+        """Append bills paid since the last update; only one caller loads at a time."""
+        with self._lock:
+            if not self.needs_refresh():
+                return
+            floor = max(0, self.last_bill_id - self.rescan)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    SELECT b.bill_id, o.time_stamp, b.tot_amt
+                    FROM bill b
+                    JOIN orders o ON o.order_id = b.order_id
+                    WHERE b.bill_id > %s
+                    ORDER BY b.bill_id
+                """, (floor,))
+                bills = [row for row in cursor.fetchall() if row[0] not in self._loaded]
+                if bills:
+                    new_ids = {row[0] for row in bills}
+                    cursor.execute("""
+                        SELECT b.bill_id, o.time_stamp, od.item_id, od.qty, od.qty * od.unit_price
+                        FROM bill b
+                        JOIN orders o ON o.order_id = b.order_id
+                        JOIN order_details od ON od.order_id = b.order_id
+                        WHERE b.bill_id > %s AND b.bill_id <= %s
+                    """, (floor, bills[-1][0]))
+                    lines = [row for row in cursor.fetchall() if row[0] in new_ids]
+                    self.append(
+                        (_to_seconds([row[1] for row in bills]),
+                         np.fromiter((row[2] for row in bills), np.float64, len(bills))),
+                        (_to_seconds([row[1] for row in lines]),
+                         np.fromiter((row[2] for row in lines), np.int64, len(lines)),
+                         np.fromiter((row[3] for row in lines), np.int64, len(lines)),
+                         np.fromiter((row[4] for row in lines), np.float64, len(lines))))
+                    self.last_bill_id = max(self.last_bill_id, bills[-1][0])
+                    floor = self.last_bill_id - self.rescan
+                    self._loaded = {bill_id for bill_id in self._loaded | new_ids if bill_id > floor}
+            finally:
+                cursor.close()
+            self._refreshed_at = time.monotonic()
+
+    def append(self, bills, lines):
+        # bills: (ts, revenue); lines: (ts, item_id, qty, revenue)
+        self.columns = self.columns.extend(bills, lines)
+
+    def report(self, start, end, granularity='day', menu_by_id=None):
+        """Sales between start (inclusive) and end (exclusive), both datetimes."""
+        cols = self.columns
+        start_ts, end_ts = _to_seconds([start, end])
+        b0, b1 = np.searchsorted(cols.bill_ts, [start_ts, end_ts])
+        l0, l1 = np.searchsorted(cols.line_ts, [start_ts, end_ts])
+        bill_ts = cols.bill_ts[b0:b1]
+        bill_revenue = cols.bill_revenue[b0:b1]
+
+        revenue = float(bill_revenue.sum())
+        covers = int(bill_ts.size)
+
+        series = []
+        if covers:
+            starts, inverse = np.unique(bucket_starts(bill_ts, granularity), return_inverse=True)
+            period_covers = np.bincount(inverse)
+            period_revenue = np.bincount(inverse, weights=bill_revenue)
+            for label, count, amount in zip(bucket_labels(starts, granularity),
+                                            period_covers.tolist(), period_revenue.tolist()):
+                series.append({'period': label, 'revenue': round(amount, 2), 'covers': count,
+                               'avg_ticket': round(amount / count, 2)})
+
+        item_mix = []
+        line_item = cols.line_item[l0:l1]
+        if line_item.size:
+            items, inverse = np.unique(line_item, return_inverse=True)
+            qty = np.bincount(inverse, weights=cols.line_qty[l0:l1])
+            item_revenue = np.bincount(inverse, weights=cols.line_revenue[l0:l1])
+            line_total = float(item_revenue.sum())
+            menu_by_id = menu_by_id or {}
+            for index in np.argsort(-item_revenue, kind='stable').tolist():
+                item_id = int(items[index])
+                menu_item = menu_by_id.get(item_id, {})
+                item_mix.append({
+                    'item_id': item_id,
+                    'item_name': menu_item.get('item_name', f'Item #{item_id}'),
+                    'category': menu_item.get('category'),
+                    'qty': int(qty[index]),
+                    'revenue': round(float(item_revenue[index]), 2),
+                    'share': round(float(item_revenue[index]) / line_total * 100, 1) if line_total else 0,
+                })
+
+        days = bill_ts // DAY
+        cells = ((days + 3) % 7) * 24 + (bill_ts % DAY) // 3600
+        heat_covers = np.bincount(cells, minlength=7 * 24).reshape(7, 24)
+        heat_revenue = np.bincount(cells, weights=bill_revenue, minlength=7 * 24).reshape(7, 24)
+
+        return {
+            'granularity': granularity,
+            'totals': {
+                'revenue': round(revenue, 2),
+                'covers': covers,
+                'avg_ticket': round(revenue / covers, 2) if covers else 0,
+                'items_sold': int(cols.line_qty[l0:l1].sum()),
+            },
+            'series': series,
+            'item_mix': item_mix,
+            'heatmap': {
+                'days': list(WEEKDAYS),
+                'hours': list(range(24)),
+                'covers': heat_covers.tolist(),
+                'revenue': np.round(heat_revenue, 2).tolist(),
+            },
+        }
+
+
+def sales_extract_from_env():
+    return SalesExtract(refresh=float(os.getenv('REPORTS_REFRESH', 60)),
+                        rescan=int(os.getenv('REPORTS_RESCAN_BILLS', 1000)))
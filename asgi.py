@@ -0,0 +1,566 @@
+"""Asyncio server: the busiest customer and kitchen routes as coroutines, every other route on the Flask app.
+
+    python asgi.py --bind 0.0.0.0:8000
+    uvicorn --factory asgi:create_asgi_app --port 8000
+
+Placing an order, waiter and chef status changes, the menu page, the chef
+queue and the live event streams run on one event loop with an asyncio
+connection pool (async_db.py), so a request waiting on the database, or a
+dashboard holding its event stream open, ties up no thread. Every other URL
+goes to the Flask app from app.py on a small thread pool in the same
+process, so both halves share the menu cache, the kitchen queue, the chef
+scheduler and the event broker. URLs, sessions and replies are the same as
+the Flask routes', so this can stand in for serve.py on a host, or take only
+the routes above from the load balancer while serve.py keeps the rest (then
+use EVENT_BROKER=redis, as with several serve.py workers).
+
+APP_BLUEPRINTS (or --blueprints) narrows both halves the same way.
+"""
+import argparse
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template, url_for
+from mysql.connector import Error
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import dump_cookie
+
+# app loads .env before blueprints.common builds the shared state from it
+from app import create_app
+from async_db import (AsyncEmployeeRepository, AsyncMenuRepository, AsyncOrderRepository, AsyncSpotRepository,
+                      apply_transition, async_pool_from_env, lock_lines, record_events, resolve_identity)
+from blueprints.common import (chef_scheduler, db_config, event_broker, identity_cache, kitchen_queue,
+                               line_work, lines_transitioned, menu_cache, order_line_event, parse_cart,
+                               publish_order_event)
+from events import format_sse
+from lifecycle import WAITER_STATUSES
+from scheduler import OPEN_STATUSES
+from sessions import OPENED_SESSION, ServerSessionInterface
+
+
+class HandToFlask:
+    """Returned by a route to let the Flask app answer the request after all."""
+
+    async def __call__(self, scope, receive, send):
+        # The Flask app opens and saves the session itself
+        scope.get('state', {}).pop('session', None)
+        await scope['app'].state.wsgi(scope, receive, send)
+
+
+class RefreshSession:
+    """Re-issues the session cookie of the async routes once it is due, as save_session() does for Flask."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            session = scope.get('state', {}).pop('session', None)
+            if message['type'] == 'http.response.start' and session is not None:
+                flask_app = scope['app'].state.flask_app
+                interface = flask_app.session_interface
+                if getattr(interface.store, 'blocking', True):
+                    value = await asyncio.to_thread(interface.refresh, flask_app, session)
+                else:
+                    value = interface.refresh(flask_app, session)
+                if value is not None:
+                    cookie = dump_cookie(interface.get_cookie_name(flask_app), value,
+                                         domain=interface.get_cookie_domain(flask_app),
+                                         path=interface.get_cookie_path(flask_app),
+                                         httponly=interface.get_cookie_httponly(flask_app),
+                                         secure=interface.get_cookie_secure(flask_app),
+                                         samesite=interface.get_cookie_samesite(flask_app))
+                    message = dict(message, headers=list(message.get('headers', []))
+                                   + [(b'set-cookie', cookie.encode('latin-1'))])
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+async def read_session(request):
+    # A logged-in session's store entry is read to confirm it was not logged
+    # out; file and Redis stores do that on a thread
+    flask_app = request.app.state.flask_app
+    interface = flask_app.session_interface
+    raw = request.cookies.get(interface.get_cookie_name(flask_app))
+    if getattr(interface.store, 'blocking', True):
+        session = await asyncio.to_thread(interface.session_from_cookie, flask_app, raw)
+    else:
+        session = interface.session_from_cookie(flask_app, raw)
+    request.state.session = session
+    return session
+
+
+def flask_context(request):
+    # url_for(), session and get_flashed_messages() need a Flask request
+    # context; one built from this request's URL and the session already
+    # read does no I/O
+    return request.app.state.flask_app.test_request_context(
+        request.url.path, base_url=f'{request.url.scheme}://{request.url.netloc}',
+        headers={'Cookie': request.headers.get('cookie', '')},
+        environ_overrides={OPENED_SESSION: getattr(request.state, 'session', None)})
+
+
+def json_response(request, data, status_code=200):
+    # Decimal and datetime as text, like the event streams
+    return Response(json.dumps(data, default=str), status_code, media_type='application/json')
+
+
+async def after_commit(function, *args):
+    # Bookkeeping that publishes events; a Redis publish is network I/O, so it
+    # runs on a thread instead of stalling the loop (custom brokers too)
+    if getattr(event_broker, 'publish_blocks', True):
+        return await asyncio.to_thread(function, *args)
+    return function(*args)
+
+
+async def read_json(request):
+    # None for a body that is not JSON, like Flask's get_json(silent=True)
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def redirect(request, endpoint):
+    with flask_context(request):
+        return RedirectResponse(url_for(endpoint), status_code=302)
+
+
+async def menu_snapshot(pool):
+    async def load():
+        async with pool.connection() as conn:
+            return await AsyncMenuRepository(conn.cursor()).all()
+    return await menu_cache.get_async(load)
+
+
+async def current_identity(request, session, role):
+    """blueprints.common.current_identity() for coroutines.
+
+    The Flask app's identity key lives in the session store, so identities
+    are cached here under the session id instead.
+    """
+    emp_id = session.get('user_id')
+    if emp_id is None or session.get('role') != role:
+        return None
+    key = f'sid:{session.sid}'
+    identity = identity_cache.get(key, emp_id)
+    if identity is None:
+        async with request.app.state.db_pool.connection() as conn:
+            identity = await resolve_identity(conn.cursor(), emp_id)
+        if identity is None:
+            return None
+        identity_cache.put(key, identity)
+    if not identity.active or getattr(identity, f'{role}_id') is None:
+        return None
+    return identity
+
+
+def event_stream(channel):
+    async def generate():
+        subscription = event_broker.subscribe_async(channel)
+        try:
+            yield 'retry: 3000\n\n'
+            # Ends when the server shuts down; the browser reconnects to another one
+            while not event_broker.closed:
+                event = await subscription.get(timeout=15)
+                if event_broker.closed:
+                    break
+                if event is None:
+                    # Keep proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                else:
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(generate(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def menu(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session['role'] != 'customer':
+        return redirect(request, 'main.customer_login')
+    if session.stored:
+        # Flash messages are read and cleared through the session store
+        return HandToFlask()
+
+    pool = request.app.state.db_pool
+    try:
+        categories = (await menu_snapshot(pool)).categories
+        async with pool.connection() as conn:
+            orders = AsyncOrderRepository(conn.cursor())
+            current_order = await orders.current(session['user_id'])
+            current_order_items = {}
+            if current_order:
+                current_order_items = await orders.quantities(current_order['order_id'])
+    except Error as e:
+        print(f"Error in async menu: {str(e)}")
+        # The Flask view reports it with a flash message
+        return HandToFlask()
+
+    with flask_context(request):
+        return HTMLResponse(render_template('menu.html',
+                                            categories=categories,
+                                            current_order=current_order,
+                                            current_order_items=current_order_items))
+
+
+async def place_order_final(request):
+    """customer.place_order_final on the event loop; see there for the steps."""
+    session = await read_session(request)
+    if 'user_id' not in session or session['role'] != 'customer':
+        return json_response(request, {'error': 'Unauthorized'}, 401)
+
+    data = await read_json(request)
+    items = data.get('items') if isinstance(data, dict) else None
+
+    if not items:
+        return json_response(request, {'error': 'No items provided'}, 400)
+    try:
+        cart = parse_cart(items)
+    except (KeyError, TypeError, ValueError) as e:
+        return json_response(request, {'error': f'Invalid items: {e}'}, 400)
+
+    pool = request.app.state.db_pool
+    try:
+        menu_items = (await menu_snapshot(pool)).by_id
+        async with pool.connection() as conn:
+            cursor = conn.cursor()
+            orders = AsyncOrderRepository(cursor)
+
+            if chef_scheduler.needs_load():
+                chef_scheduler.load(await AsyncEmployeeRepository(cursor).chefs(), await orders.chef_backlog())
+
+            await conn.start_transaction()
+
+            existing_order = await orders.unpaid(session['user_id'], lock=True)
+            placed_at = None
+
+            if existing_order:
+                order_id = existing_order['order_id']
+                placed_at = existing_order['time_stamp'].timestamp()
+            else:
+                order_id = await orders.create(session['user_id'])
+
+            existing_lines = {line['item_id']: line for line in await orders.lines_for_items(order_id, list(cart))}
+
+            unknown = [item_id for item_id in cart if item_id not in menu_items]
+            if unknown:
+                await conn.rollback()
+                return json_response(request, {'error': f'Unknown menu item {unknown[0]}'}, 400)
+            assigned = {}
+            for item_id, qty in cart.items():
+                line = existing_lines.get(item_id)
+                if line:
+                    if line['order_status'] in OPEN_STATUSES:
+                        chef_scheduler.add_work(line['chef_id'], line_work(item_id, qty - line['qty'], menu_items))
+                    continue
+                chef_id = chef_scheduler.assign(line_work(item_id, qty, menu_items),
+                                                menu_items.get(item_id, {}).get('category'))
+                if chef_id is None:
+                    await conn.rollback()
+                    chef_scheduler.invalidate()
+                    return json_response(request, {'error': 'No chefs available in the system'}, 500)
+                assigned[item_id] = chef_id
+
+            await orders.upsert_lines([(order_id, item_id, qty, assigned.get(item_id),
+                                        menu_items[item_id]['item_name'], menu_items[item_id]['category'],
+                                        menu_items[item_id]['item_price'])
+                                       for item_id, qty in cart.items()])
+            await record_events(cursor, [(order_id, item_id, chef_id, None, 'placed')
+                                         for item_id, chef_id in assigned.items()])
+
+            spot = await AsyncSpotRepository(cursor).for_customer(session['user_id'])
+
+            await conn.commit()
+    except Error as e:
+        # Backlog charged for the failed cart is dropped on the next resync
+        chef_scheduler.invalidate()
+        print(f"Error in async place_order_final: {str(e)}")
+        return json_response(request, {'error': str(e)}, 500)
+
+    def cart_placed():
+        for item_id, qty in cart.items():
+            line = existing_lines.get(item_id, {'order_status': 'placed', 'chef_id': assigned.get(item_id)})
+            menu_item = menu_items.get(item_id, {})
+            if line['order_status'] in OPEN_STATUSES:
+                kitchen_queue.upsert_line(line['chef_id'], order_id, item_id, qty, line['order_status'],
+                                          menu_item.get('prep_time'), placed_at)
+            publish_order_event(order_line_event(order_id, item_id, line['order_status'],
+                                                 qty=qty,
+                                                 item_name=menu_item.get('item_name'),
+                                                 category=menu_item.get('category'),
+                                                 item_price=menu_item.get('item_price'),
+                                                 chef_id=line['chef_id'],
+                                                 table_id=spot['table_id'] if spot else None),
+                                chef_id=line['chef_id'],
+                                waiter_id=spot['waiter_id'] if spot else None)
+
+    await after_commit(cart_placed)
+    return json_response(request, {'success': True, 'order_id': order_id})
+
+
+async def order_events(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session.get('role') != 'customer':
+        return json_response(request, {'error': 'Unauthorized'}, 401)
+
+    order_id = request.path_params['order_id']
+    try:
+        async with request.app.state.db_pool.connection() as conn:
+            order = await AsyncOrderRepository(conn.cursor()).owned(order_id, session['user_id'])
+    except Error as e:
+        print(f"Error in async order_events: {str(e)}")
+        return json_response(request, {'error': 'Database connection failed'}, 500)
+
+    if not order:
+        return json_response(request, {'error': 'Order not found or not authorized'}, 403)
+    return event_stream(f'order:{order_id}')
+
+
+async def update_order_status(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return json_response(request, {'error': 'Unauthorized'}, 401)
+
+    data = await read_json(request)
+    if not isinstance(data, dict):
+        data = {}
+    order_id = data.get('order_id')
+    item_id = data.get('item_id')
+    status = data.get('status')
+
+    if not all([order_id, item_id, status]):
+        return json_response(request, {'error': 'Missing required parameters'}, 400)
+    if status not in WAITER_STATUSES:
+        return json_response(request, {'error': f"status must be one of {', '.join(WAITER_STATUSES)}"}, 400)
+
+    pool = request.app.state.db_pool
+    try:
+        waiter = await current_identity(request, session, 'waiter')
+        if not waiter:
+            return json_response(request, {'error': 'Waiter not found'}, 403)
+
+        menu_items = (await menu_snapshot(pool)).by_id
+        async with pool.connection() as conn:
+            cursor = conn.cursor()
+            await conn.start_transaction()
+
+            # Verify the order belongs to a spot assigned to this waiter
+            locked = await lock_lines(cursor, 'od.order_id = %s AND od.item_id = %s AND s.waiter_id = %s',
+                                      (order_id, item_id, waiter.waiter_id))
+            if not locked:
+                await conn.rollback()
+                return json_response(request, {'error': 'Order not found or not authorized'}, 403)
+
+            changed, rejected = await apply_transition(cursor, locked, status)
+            if rejected:
+                await conn.rollback()
+                return json_response(request, {'error': rejected[0]['error']}, 409)
+
+            await conn.commit()
+        await after_commit(lines_transitioned, changed, status, menu_items)
+        return json_response(request, {'success': True})
+    except Exception as e:
+        return json_response(request, {'error': str(e)}, 500)
+
+
+async def chef_queue(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return json_response(request, {'error': 'Unauthorized'}, 401)
+
+    pool = request.app.state.db_pool
+    try:
+        chef = await current_identity(request, session, 'chef')
+        if not chef:
+            return json_response(request, {'error': 'Chef not found'}, 403)
+
+        if kitchen_queue.needs_load():
+            async with pool.connection() as conn:
+                kitchen_queue.load(await AsyncOrderRepository(conn.cursor()).kitchen_lines())
+
+        menu_items = (await menu_snapshot(pool)).by_id
+    except Error as e:
+        print(f"Error in async chef_queue: {str(e)}")
+        return json_response(request, {'error': 'Database connection failed'}, 500)
+
+    groups = kitchen_queue.queue(chef.chef_id)
+    for group in groups:
+        menu_item = menu_items.get(group['item_id'], {})
+        group['item_name'] = menu_item.get('item_name')
+        group['category'] = menu_item.get('category')
+    return json_response(request, {'groups': groups})
+
+
+async def chef_mark_cooked(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return json_response(request, {'success': False, 'error': 'Unauthorized access'})
+
+    pool = request.app.state.db_pool
+    try:
+        data = await request.json()
+        order_id = data.get('order_id')
+        item_id = data.get('item_id')
+
+        if not order_id or not item_id:
+            return json_response(request, {'success': False, 'error': 'Missing required parameters'})
+
+        chef = await current_identity(request, session, 'chef')
+        if not chef:
+            return json_response(request, {'success': False, 'error': 'Chef not found'})
+
+        menu_items = (await menu_snapshot(pool)).by_id
+        async with pool.connection() as conn:
+            cursor = conn.cursor()
+            await conn.start_transaction()
+            locked = await lock_lines(cursor, 'od.order_id = %s AND od.item_id = %s AND od.chef_id = %s',
+                                      (order_id, item_id, chef.chef_id))
+            changed, rejected = await apply_transition(cursor, locked, 'cooked')
+            await conn.commit()
+
+        if not locked:
+            return json_response(request, {'success': False, 'error': 'Order item not found'})
+        if rejected:
+            return json_response(request, {'success': False, 'error': rejected[0]['error']})
+
+        await after_commit(lines_transitioned, changed, 'cooked', menu_items)
+        return json_response(request, {'success': True})
+
+    except Exception as e:
+        print(f"Error in async chef_mark_cooked: {str(e)}")
+        return json_response(request, {'success': False, 'error': str(e)})
+
+
+async def waiter_events(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return json_response(request, {'error': 'Unauthorized'}, 401)
+
+    try:
+        waiter = await current_identity(request, session, 'waiter')
+    except Error as e:
+        print(f"Error in async waiter_events: {str(e)}")
+        return json_response(request, {'error': 'Database connection failed'}, 500)
+    if not waiter:
+        return json_response(request, {'error': 'Waiter not found'}, 403)
+    return event_stream(f'waiter:{waiter.waiter_id}')
+
+
+async def chef_events(request):
+    session = await read_session(request)
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return json_response(request, {'error': 'Unauthorized'}, 401)
+
+    try:
+        chef = await current_identity(request, session, 'chef')
+    except Error as e:
+        print(f"Error in async chef_events: {str(e)}")
+        return json_response(request, {'error': 'Database connection failed'}, 500)
+    if not chef:
+        return json_response(request, {'error': 'Chef not found'}, 403)
+    return event_stream(f'chef:{chef.chef_id}')
+
+
+async def async_db_pool_stats(request):
+    return json_response(request, request.app.state.db_pool.stats())
+
+
+# Served here for each role blueprint the Flask app loads
+ASYNC_ROUTES = {
+    'customer': [
+        Route('/menu', menu),
+        Route('/place_order_final', place_order_final, methods=['POST']),
+        Route('/events/order/{order_id:int}', order_events),
+    ],
+    'waiter': [
+        Route('/update_order_status', update_order_status, methods=['POST']),
+        Route('/events/waiter', waiter_events),
+    ],
+    'chef': [
+        Route('/chef/queue', chef_queue),
+        Route('/chef/mark_cooked', chef_mark_cooked, methods=['POST']),
+        Route('/events/chef', chef_events),
+    ],
+}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    pool = app.state.db_pool
+    try:
+        await pool.warm()
+        await menu_snapshot(pool)
+    except Error as e:
+        # Serve anyway; the pool and the cache fill on demand once the database is back
+        print(f"Warm-up could not reach the database: {e}")
+    yield
+    await pool.dispose()
+
+
+def create_asgi_app(roles=None, threads=None):
+    """The async routes for `roles` (see app.create_app) in front of the Flask app.
+
+    threads: how many Flask requests run at once (WEB_THREADS, default DB_POOL_SIZE).
+    """
+    flask_app = create_app(roles)
+    if not isinstance(flask_app.session_interface, ServerSessionInterface):
+        raise RuntimeError('The async routes read server-side sessions; SESSION_STORE=cookie is not supported')
+    if threads is None:
+        threads = int(os.getenv('WEB_THREADS', os.getenv('DB_POOL_SIZE', 5)))
+
+    routes = [Route('/health/async_db_pool', async_db_pool_stats)]
+    for name in flask_app.blueprints:
+        routes.extend(ASYNC_ROUTES.get(name, []))
+    wsgi = WSGIMiddleware(flask_app, workers=threads)
+    routes.append(Mount('/', app=wsgi))
+
+    app = Starlette(routes=routes, middleware=[Middleware(RefreshSession)], lifespan=lifespan)
+    app.state.flask_app = flask_app
+    app.state.wsgi = wsgi
+    app.state.db_pool = async_pool_from_env(db_config)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default=os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 8000)}"))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', os.getenv('DB_POOL_SIZE', 5))),
+                        help='threads for the routes the Flask app serves (WEB_THREADS, default DB_POOL_SIZE)')
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv('GRACEFUL_TIMEOUT', 30)),
+                        help='seconds in-flight requests get to finish after SIGTERM')
+    parser.add_argument('--blueprints', default=os.getenv('APP_BLUEPRINTS'),
+                        help='roles this server serves, e.g. chef (APP_BLUEPRINTS, default all)')
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError('asgi.py requires uvicorn (pip install uvicorn)')
+
+    class Server(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # Event streams never finish by themselves; end them so the
+            # graceful shutdown only waits for real requests
+            event_broker.close()
+            super().handle_exit(sig, frame)
+
+    host, _, port = args.bind.rpartition(':')
+    Server(uvicorn.Config(create_asgi_app(args.blueprints, args.threads), host=host or '0.0.0.0', port=int(port),
+                          timeout_graceful_shutdown=args.graceful_timeout, lifespan='on')).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+"""Asyncio counterparts of db.py, the repositories and the lifecycle statements, for asgi.py.
+
+AsyncConnectionPool hands out aiomysql connections, or aiosqlite ones when
+DB_ENGINE=sqlite, and is sized by the same DB_POOL_* variables as the
+thread pool. Its cursors take %s placeholders, return dictionary rows and
+raise mysql.connector errors like the synchronous ones, so the SQL is not
+repeated here: the Async* repositories only turn the query primitives of
+repositories.Repository into coroutines.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from mysql.connector import Error, errors
+
+import lifecycle
+from db import (MYSQL, SQLITE, PoolTimeoutError, SQLiteCursor, _dict_row, _sqlite_error, connect,
+                create_sqlite_schema, dialect_of)
+from identity import IDENTITY_QUERY, identity_from_row
+from repositories import EmployeeRepository, MenuRepository, OrderRepository, Repository, SpotRepository
+
+
+def _mysql_error(error):
+    import pymysql
+
+    if isinstance(error, pymysql.err.IntegrityError):
+        return errors.IntegrityError(msg=str(error))
+    if isinstance(error, pymysql.err.OperationalError):
+        return errors.OperationalError(msg=str(error))
+    return errors.DatabaseError(msg=str(error))
+
+
+class AsyncMySQLCursor:
+    """aiomysql dictionary cursor, opened on first use."""
+
+    dialect = MYSQL
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._cursor = None
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    async def _call(self, name, *args):
+        import aiomysql
+        import pymysql
+
+        try:
+            if self._cursor is None:
+                self._cursor = await self._raw.cursor(aiomysql.DictCursor)
+            return await getattr(self._cursor, name)(*args)
+        except pymysql.err.Error as e:
+            raise _mysql_error(e) from e
+
+    async def execute(self, operation, params=None):
+        return await self._call('execute', operation, params)
+
+    async def executemany(self, operation, seq_params):
+        return await self._call('executemany', operation, list(seq_params))
+
+    async def fetchone(self):
+        return await self._call('fetchone')
+
+    async def fetchall(self):
+        return await self._call('fetchall')
+
+
+class AsyncSQLiteCursor:
+    """The results of the last statement run on an aiosqlite connection."""
+
+    dialect = SQLITE
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._cursor = None
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @staticmethod
+    async def _call(method, *args):
+        try:
+            return await method(*args)
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    async def execute(self, operation, params=None):
+        if params is None:
+            self._cursor = await self._call(self._raw.execute, operation)
+        else:
+            self._cursor = await self._call(self._raw.execute, SQLiteCursor._operation(operation), tuple(params))
+
+    async def executemany(self, operation, seq_params):
+        self._cursor = await self._call(self._raw.executemany, SQLiteCursor._operation(operation),
+                                        [tuple(params) for params in seq_params])
+
+    async def fetchone(self):
+        return await self._call(self._cursor.fetchone)
+
+    async def fetchall(self):
+        return await self._call(self._cursor.fetchall)
+
+
+class AsyncMySQLConnection:
+    cursor_class = AsyncMySQLCursor
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.created_at = time.monotonic()
+        self.in_transaction = False
+
+    @classmethod
+    async def open(cls, db_config):
+        try:
+            import aiomysql
+            import pymysql
+        except ImportError:
+            raise RuntimeError('The async app requires the aiomysql package (pip install aiomysql)')
+        try:
+            raw = await aiomysql.connect(host=db_config['host'], port=db_config['port'], user=db_config['user'],
+                                         password=db_config['password'], db=db_config['database'],
+                                         autocommit=True)
+        except pymysql.err.Error as e:
+            raise _mysql_error(e) from e
+        return cls(raw)
+
+    def cursor(self):
+        return self.cursor_class(self._raw)
+
+    async def _call(self, method, *args):
+        import pymysql
+
+        try:
+            return await method(*args)
+        except pymysql.err.Error as e:
+            raise _mysql_error(e) from e
+
+    async def start_transaction(self):
+        await self._call(self._raw.begin)
+        self.in_transaction = True
+
+    async def commit(self):
+        await self._call(self._raw.commit)
+        self.in_transaction = False
+
+    async def rollback(self):
+        self.in_transaction = False
+        await self._call(self._raw.rollback)
+
+    async def ping(self):
+        await self._call(self._raw.ping, False)
+
+    async def close(self):
+        self._raw.close()
+
+
+class AsyncSQLiteConnection(AsyncMySQLConnection):
+    """An aiosqlite connection, set up like db.SQLiteConnection (WAL, BEGIN IMMEDIATE for writes)."""
+
+    cursor_class = AsyncSQLiteCursor
+
+    @classmethod
+    async def open(cls, path, timeout=30):
+        try:
+            import aiosqlite
+        except ImportError:
+            raise RuntimeError('The async app requires the aiosqlite package (pip install aiosqlite)')
+        try:
+            raw = await aiosqlite.connect(path, timeout=timeout, isolation_level=None,
+                                          detect_types=sqlite3.PARSE_DECLTYPES)
+            raw.row_factory = _dict_row
+            for pragma in ('foreign_keys = ON', 'journal_mode = WAL', 'synchronous = NORMAL'):
+                await raw.execute(f'PRAGMA {pragma}')
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+        return cls(raw)
+
+    async def _call(self, method, *args):
+        try:
+            return await method(*args)
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    async def start_transaction(self):
+        await self._call(self._raw.execute, 'BEGIN IMMEDIATE')
+        self.in_transaction = True
+
+    async def ping(self):
+        await self._call(self._raw.execute, 'SELECT 1')
+
+    async def close(self):
+        await self._raw.close()
+
+
+class AsyncConnectionPool:
+    """db.ConnectionPool for coroutines: same sizing, overflow, recycling, pre-ping and stats.
+
+    Used from a single event loop, so its state needs no lock; a coroutine
+    waiting for a connection is woken when one is released.
+    """
+
+    def __init__(self, db_config, pool_size=5, max_overflow=10, recycle=3600,
+                 timeout=30, pre_ping=True):
+        self.db_config = dict(db_config)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        self._idle = []
+        self._open = 0
+        self._waiters = deque()
+        self._schema_ready = db_config.get('engine') != 'sqlite'
+
+        # Counters exposed through stats()
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_pings = 0
+
+    async def _connect(self):
+        if self.db_config.get('engine') != 'sqlite':
+            return await AsyncMySQLConnection.open(self.db_config)
+        if not self._schema_ready:
+            # Once per process, like SQLitePool
+            await asyncio.to_thread(self._create_schema)
+            self._schema_ready = True
+        return await AsyncSQLiteConnection.open(self.db_config['path'], self.timeout)
+
+    def _create_schema(self):
+        conn = connect(self.db_config)
+        try:
+            create_sqlite_schema(conn)
+        finally:
+            conn.close()
+
+    async def _is_stale(self, conn):
+        if self.recycle and time.monotonic() - conn.created_at > self.recycle:
+            self._recycled += 1
+            return True
+        if self.pre_ping:
+            try:
+                await conn.ping()
+            except Error:
+                self._failed_pings += 1
+                return True
+        return False
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def checkout(self):
+        started = time.monotonic()
+        waited = False
+        while not self._idle and self._open >= self.pool_size + self.max_overflow:
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                self._waits += 1
+                self._timeouts += 1
+                self._wait_time += time.monotonic() - started
+                raise PoolTimeoutError(msg=f'Timed out after {self.timeout}s waiting for a database connection')
+            waited = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+        if waited:
+            self._waits += 1
+            self._wait_time += time.monotonic() - started
+
+        conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            self._open += 1
+        try:
+            if conn is not None and await self._is_stale(conn):
+                await conn.close()
+                conn = None
+            if conn is None:
+                conn = await self._connect()
+        except BaseException:
+            self._open -= 1
+            self._wake()
+            raise
+
+        self._in_use += 1
+        self._checkouts += 1
+        return conn
+
+    async def release(self, conn):
+        keep = False
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            keep = True
+        except Error:
+            pass
+        finally:
+            # Also when the request was cancelled mid-rollback: give up the slot
+            self._in_use -= 1
+            if keep and len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                conn = None
+            else:
+                self._open -= 1
+            self._wake()
+        if conn is not None:
+            await conn.close()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.checkout()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def warm(self, count=None):
+        count = self.pool_size if count is None else min(count, self.pool_size)
+        conns = [await self.checkout() for _ in range(count)]
+        for conn in conns:
+            await self.release(conn)
+
+    async def dispose(self):
+        while self._idle:
+            await self._idle.pop().close()
+            self._open -= 1
+
+    def stats(self):
+        return {
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'open': self._open,
+            'in_use': self._in_use,
+            'idle': len(self._idle),
+            'overflow': max(0, self._open - self.pool_size),
+            'waiting': sum(1 for waiter in self._waiters if not waiter.done()),
+            'checkouts': self._checkouts,
+            'waits': self._waits,
+            'wait_time_total': round(self._wait_time, 6),
+            'timeouts': self._timeouts,
+            'recycled': self._recycled,
+            'failed_pings': self._failed_pings,
+        }
+
+
+def async_pool_from_env(db_config):
+    return AsyncConnectionPool(
+        db_config,
+        pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+        max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+        recycle=int(os.getenv('DB_POOL_RECYCLE', 3600)),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        pre_ping=os.getenv('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no'),
+    )
+
+
+class AsyncRepository(Repository):
+    async def _one(self, sql, params=None):
+        await self.cursor.execute(sql, params)
+        return await self.cursor.fetchone()
+
+    async def _all(self, sql, params=None, into=None):
+        await self.cursor.execute(sql, params)
+        rows = await self.cursor.fetchall()
+        return into(rows) if into else rows
+
+    async def _insert(self, sql, params):
+        await self.cursor.execute(sql, params)
+        return self.cursor.lastrowid
+
+    async def _many(self, sql, seq_params):
+        await self.cursor.executemany(sql, seq_params)
+
+
+class AsyncEmployeeRepository(AsyncRepository, EmployeeRepository):
+    pass
+
+
+class AsyncMenuRepository(AsyncRepository, MenuRepository):
+    pass
+
+
+class AsyncOrderRepository(AsyncRepository, OrderRepository):
+    pass
+
+
+class AsyncSpotRepository(AsyncRepository, SpotRepository):
+    pass
+
+
+async def resolve_identity(cursor, emp_id):
+    await cursor.execute(IDENTITY_QUERY, (emp_id,))
+    return identity_from_row(await cursor.fetchone())
+
+
+async def lock_lines(cursor, where, params):
+    await cursor.execute(lifecycle.lock_lines_statement(dialect_of(cursor), where), params)
+    return await cursor.fetchall()
+
+
+async def record_events(cursor, events):
+    if events:
+        await cursor.executemany(lifecycle.RECORD_EVENTS, events)
+
+
+async def apply_transition(cursor, lines, status):
+    """lifecycle.apply_transition() on an async cursor."""
+    changed, rejected = lifecycle.split_transition(lines, status)
+    if changed:
+        await cursor.execute(*lifecycle.transition_statement(changed, status))
+        await record_events(cursor, lifecycle.transition_events(changed, status))
+    return changed, rejected
@@ -0,0 +1,212 @@
+"""How many open dashboards serve.py and asgi.py hold while still serving the hot routes.
+
+Both servers run on the same scratch SQLite database, seeded like
+login_storm.py. For each --streams count, that many chef and waiter
+dashboards open their live event stream (/events/chef, /events/waiter) and
+keep it open. Then --users clients work the hot routes back to back for
+--duration seconds: customers load /menu and place orders, chefs poll
+/chef/queue and mark the first line in it cooked. Each setup prints how
+many streams were answered within 5 seconds, requests per second, p50/p95
+latency, failed requests (errors and replies slower than --timeout) and
+how many order events reached the open streams:
+  serve WxT     python serve.py --workers W --threads T; every open stream
+                holds one of the W x T request threads
+  asgi          python asgi.py; streams and the hot routes are coroutines,
+                the rest of the site runs on --threads threads
+
+    python benchmarks/async_capacity.py --streams 0 8 50 200 --workers 2 --threads 5
+"""
+import argparse
+import http.client
+import http.cookiejar
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.local_mysql import free_port  # noqa: E402
+from benchmarks.login_storm import seed  # noqa: E402
+from benchmarks.rush_hour import MENU, NoRedirect  # noqa: E402
+from benchmarks.serve_throughput import Load, pct, wait_until_up  # noqa: E402
+
+CUSTOMERS, WAITERS, CHEFS = 40, 3, 3
+
+
+class Client:
+    def __init__(self, port, timeout):
+        self.port = port
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def open(self, path, form=None, body=None):
+        headers = {}
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(f'http://127.0.0.1:{self.port}{path}', data=data, headers=headers)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login_employee(self, n, role):
+        if role == 'chef':
+            self.open('/employee/login', {'phone': f'71{n % CHEFS:08d}', 'password': 'chef'})
+        else:
+            self.open('/employee/login', {'phone': f'72{n % WAITERS:08d}', 'password': 'waiter'})
+
+
+class Stream(Client):
+    """A dashboard holding its event stream open and counting the events it gets."""
+
+    def __init__(self, port, n):
+        super().__init__(port, timeout=None)
+        self.role = 'chef' if n % 2 else 'waiter'
+        self.n = n
+        self.answered = threading.Event()
+        self.events = 0
+
+    def run(self, stop):
+        try:
+            self.login_employee(self.n, self.role)
+            request = urllib.request.Request(f'http://127.0.0.1:{self.port}/events/{self.role}')
+            with self.opener.open(request) as response:
+                self.answered.set()
+                while not stop.is_set():
+                    line = response.readline()
+                    if not line:
+                        break
+                    if line.startswith(b'event: line'):
+                        self.events += 1
+        except (OSError, http.client.HTTPException):
+            pass
+
+
+class User(Client):
+    def __init__(self, port, n, timeout):
+        super().__init__(port, timeout)
+        self.n = n
+        self.chef = n % 4 == 0
+
+    def login(self):
+        if self.chef:
+            self.login_employee(self.n, 'chef')
+        else:
+            self.open('/customer/login', {'phone': f'9{self.n % CUSTOMERS:09d}'})
+
+    def step(self, i):
+        if self.chef:
+            status, body = self.open('/chef/queue')
+            groups = json.loads(body).get('groups', []) if status == 200 else []
+            if groups:
+                line = groups[0]['lines'][0]
+                status, _ = self.open('/chef/mark_cooked', body={'order_id': line['order_id'],
+                                                                 'item_id': groups[0]['item_id']})
+            return status
+        if i % 3 == 2:
+            cart = [{'id': 1 + (self.n + i) % len(MENU), 'quantity': 1 + i % 3}]
+            return self.open('/place_order_final', body={'items': cart})[0]
+        return self.open('/menu')[0]
+
+    def run(self, load, stop):
+        logged_in = False
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                if not logged_in:
+                    self.login()
+                    logged_in = True
+                    continue
+                status = self.step(i)
+                load.record(time.perf_counter() - started, failed=status >= 500)
+            except (OSError, http.client.HTTPException):
+                # Includes replies that took longer than --timeout
+                load.record(failed=True)
+            i += 1
+
+
+def start(setup, port, env, args):
+    if setup == 'asgi':
+        command = [sys.executable, os.path.join(ROOT, 'asgi.py'), '--threads', str(args.threads)]
+    else:
+        command = [sys.executable, os.path.join(ROOT, 'serve.py'), '--workers', str(args.workers),
+                   '--threads', str(args.threads)]
+    process = subprocess.Popen(command + ['--bind', f'127.0.0.1:{port}'], env=env, cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_up(port, process)
+    return process
+
+
+def run(setup, streams, args, env):
+    port = free_port()
+    process = start(setup, port, env, args)
+    stop = threading.Event()
+    load = Load()
+    dashboards = [Stream(port, n) for n in range(streams)]
+    users = [User(port, n, args.timeout) for n in range(args.users)]
+    threads = ([threading.Thread(target=stream.run, args=(stop,), daemon=True) for stream in dashboards] +
+               [threading.Thread(target=user.run, args=(load, stop), daemon=True) for user in users])
+    try:
+        for thread in threads[:streams]:
+            thread.start()
+        deadline = time.monotonic() + 5
+        for stream in dashboards:
+            stream.answered.wait(max(0, deadline - time.monotonic()))
+        answered = sum(stream.answered.is_set() for stream in dashboards)
+
+        for thread in threads[streams:]:
+            thread.start()
+        time.sleep(args.duration)
+        samples, failed = list(load.latencies), load.failed
+        events = sum(stream.events for stream in dashboards)
+    finally:
+        stop.set()
+        process.terminate()
+        process.wait(timeout=60)
+        for thread in threads[streams:]:
+            thread.join(timeout=args.timeout + 5)
+    return answered, samples, failed, events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, nargs='+', default=[0, 8, 50, 200],
+                        help='open event streams to try')
+    parser.add_argument('--users', type=int, default=16, help='concurrent clients on the hot routes')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=5, help='seconds before a request counts as failed')
+    parser.add_argument('--workers', type=int, default=2, help='serve.py worker processes')
+    parser.add_argument('--threads', type=int, default=5, help='serve.py threads per worker; asgi.py Flask threads')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'server':<11} {'streams':>8} {'answered':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'failed':>7} {'events':>7}")
+        for setup in (f'serve {args.workers}x{args.threads}', 'asgi'):
+            for streams in args.streams:
+                # A fresh database for each run, so every run starts from empty kitchens
+                database = os.path.join(workdir, f'capacity_{setup[0]}{streams}.sqlite3')
+                seed(database, CUSTOMERS, WAITERS, CHEFS)
+                env = dict(os.environ, DB_ENGINE='sqlite', SQLITE_PATH=database, SESSION_STORE='file',
+                           SESSION_DIR=os.path.join(workdir, 'sessions'),
+                           SECRET_KEY_FILE=os.path.join(workdir, 'secret_key'))
+                answered, samples, failed, events = run(setup, streams, args, env)
+                print(f'{setup:<11} {streams:>8} {answered:>9} {len(samples) / args.duration:>8.1f} '
+                      f'{pct(samples, 50):>8.1f} {pct(samples, 95):>8.1f} {failed:>7} {events:>7}')
+
+
+if __name__ == '__main__':
+    main()
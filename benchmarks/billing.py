@@ -0,0 +1,177 @@
+"""Check and time bill pricing.
+
+Every bill is priced by billing.price_bill(). This script prices many random
+orders, settings and redemptions and compares each result, to the paisa,
+with an independent integer-paise calculation. It then times price_bill().
+Exits non-zero on the first mismatch.
+
+With --db it also seeds a throwaway MySQL server (--db sqlite: a scratch
+SQLite file) with open orders. It times quote_bill() (the single aggregated
+query every bill page and payment uses) and checks each quote against the
+same orders priced in Python, exiting non-zero on the first mismatch. The
+pure pricing check needs no database; the quote check covers only the
+engine named.
+
+    python benchmarks/billing.py --cases 100000
+    python benchmarks/billing.py --db --orders 2000
+    python benchmarks/billing.py --db sqlite
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from billing import BillSettings, price_bill  # noqa: E402
+
+
+def reference(subtotal_paise, tax_bp, rupee_per_point_paise, points_per_rupee_hundredths,
+              min_points, available, requested):
+    """Same rules as price_bill, in integers: tax_bp is the tax percentage times 100."""
+    redeem = max(0, min(requested, available))
+    redeem = min(redeem, subtotal_paise // rupee_per_point_paise) if rupee_per_point_paise else 0
+    if redeem < min_points:
+        redeem = 0
+    discount = redeem * rupee_per_point_paise
+    taxable = subtotal_paise - discount
+    tax = (taxable * tax_bp + 5000) // 10000
+    total = taxable + tax
+    earned = total * points_per_rupee_hundredths // 10000
+    return discount, tax, total, redeem, earned
+
+
+def random_case(rng):
+    lines = [(rng.randint(1, 99999), rng.randint(1, 6)) for _ in range(rng.randint(1, 12))]
+    return {
+        'subtotal_paise': sum(price * qty for price, qty in lines),
+        'tax_bp': rng.choice([0, 500, 1200, 1800, 2800, rng.randint(0, 10000)]),
+        'rupee_per_point_paise': rng.choice([0, 25, 100, rng.randint(1, 1000)]),
+        'points_per_rupee_hundredths': rng.choice([0, 10, 100, rng.randint(0, 500)]),
+        'min_points': rng.choice([0, 1, 100, rng.randint(0, 5000)]),
+        'available': rng.randint(0, 20000),
+        'requested': rng.choice([0, rng.randint(0, 20000), 10 ** 6]),
+    }
+
+
+def priced(case):
+    settings = BillSettings(Decimal(case['tax_bp']) / 100, Decimal(case['points_per_rupee_hundredths']) / 100,
+                            Decimal(case['rupee_per_point_paise']) / 100, case['min_points'])
+    return price_bill(Decimal(case['subtotal_paise']) / 100, settings, case['available'], case['requested'])
+
+
+def check(cases, seed):
+    rng = random.Random(seed)
+    for n in range(cases):
+        case = random_case(rng)
+        bill = priced(case)
+        got = (int(bill.discount * 100), int(bill.tax * 100), int(bill.total * 100),
+               bill.points_redeemed, bill.points_earned)
+        expected = reference(**case)
+        if got != expected:
+            sys.exit(f'case {n} {case}: price_bill gave {got}, expected {expected}')
+    print(f'{cases} random bills agree to the paisa')
+
+
+def time_pricing(cases, seed):
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(cases):
+        case = random_case(rng)
+        settings = BillSettings(Decimal(case['tax_bp']) / 100, Decimal(case['points_per_rupee_hundredths']) / 100,
+                                Decimal(case['rupee_per_point_paise']) / 100, case['min_points'])
+        inputs.append((Decimal(case['subtotal_paise']) / 100, settings, case['available'], case['requested']))
+    started = time.perf_counter()
+    for args in inputs:
+        price_bill(*args)
+    elapsed = time.perf_counter() - started
+    print(f'price_bill: {elapsed / cases * 1e6:.1f} us per bill ({cases / elapsed:,.0f} bills/s)')
+
+
+def time_quotes(args):
+    if args.db == 'sqlite':
+        import tempfile
+
+        import db
+
+        with tempfile.TemporaryDirectory() as workdir:
+            conn = db.connect({'engine': 'sqlite', 'path': os.path.join(workdir, 'billing.sqlite3')})
+            db.create_sqlite_schema(conn, sample_data=False)
+            check_quotes(conn, args)
+        return
+
+    import mysql.connector
+
+    from benchmarks.local_mysql import LocalMySQL, create_schema
+
+    with LocalMySQL() as server:
+        create_schema(server.db_config)
+        check_quotes(mysql.connector.connect(**server.db_config), args)
+
+
+def check_quotes(conn, args):
+    from billing import quote_bill
+
+    rng = random.Random(args.seed)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute('UPDATE settings SET tax_rate = 12.50, points_per_rupee = 0.25, rupee_per_point = 0.50, '
+                   'min_points_redemption = 50')
+    prices = {}
+    for item_id in range(1, 41):
+        prices[item_id] = Decimal(rng.randint(1000, 99999)) / 100
+        cursor.execute("INSERT INTO menu (item_name, category, item_price, prep_time) "
+                       "VALUES (%s, 'Bench', %s, 5)", (f'Bench {item_id}', prices[item_id]))
+    first_item = cursor.lastrowid - 39
+    cursor.executemany('INSERT INTO customer (c_phone, c_name, loyal_pts) VALUES (%s, %s, %s)',
+                       [(f'8{i:09d}', f'Guest {i}', rng.randint(0, 2000)) for i in range(args.orders)])
+    cursor.execute('SELECT cust_id, loyal_pts FROM customer WHERE c_phone LIKE %s ORDER BY cust_id', ('8%',))
+    customers = cursor.fetchall()
+    expected = {}
+    settings = BillSettings(Decimal('12.50'), Decimal('0.25'), Decimal('0.50'), 50)
+    for customer in customers:
+        redeem = rng.randint(0, 2500)
+        cursor.execute('INSERT INTO orders (cust_id, redeem_points) VALUES (%s, %s)',
+                       (customer['cust_id'], redeem))
+        order_id = cursor.lastrowid
+        items = rng.sample(range(40), rng.randint(1, 10))
+        lines = [(order_id, first_item + i, rng.randint(1, 5), prices[i + 1]) for i in items]
+        cursor.executemany("INSERT INTO order_details (order_id, item_id, qty, unit_price, order_status) "
+                           "VALUES (%s, %s, %s, %s, 'delivered')", lines)
+        subtotal = sum(price * qty for _, _, qty, price in lines)
+        expected[order_id] = price_bill(subtotal, settings, customer['loyal_pts'], redeem)
+    conn.commit()
+
+    timings = []
+    for order_id, want in expected.items():
+        started = time.perf_counter()
+        bill = quote_bill(cursor, order_id)
+        timings.append(time.perf_counter() - started)
+        got = (bill.subtotal, bill.discount, bill.tax, bill.total, bill.points_earned)
+        if got != (want.subtotal, want.discount, want.tax, want.total, want.points_earned):
+            sys.exit(f'{args.db}: order {order_id}: quote_bill gave {got}, expected {want.summary()}')
+    cursor.close()
+    conn.close()
+    timings.sort()
+    print(f'quote_bill on {args.db} over {len(timings)} orders agrees to the paisa: '
+          f'p50 {timings[len(timings) // 2] * 1000:.2f} ms  p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', nargs='?', const='mysql', choices=['mysql', 'sqlite'],
+                        help='also check and time quote_bill on a throwaway MySQL (default) or SQLite database')
+    parser.add_argument('--orders', type=int, default=2000)
+    args = parser.parse_args()
+
+    check(args.cases, args.seed)
+    time_pricing(args.cases, args.seed)
+    if args.db:
+        time_quotes(args)
+
+
+if __name__ == '__main__':
+    main()
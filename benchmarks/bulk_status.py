@@ -0,0 +1,131 @@
+"""Compare one bulk status request against one request per order line.
+
+A seated customer places an order with every menu item; the chef then marks
+the lines cooked and the waiter marks them delivered, first one request per
+line and then with a single /chef/bulk_status or /waiter/bulk_status call.
+Line statuses are reset with SQL between rounds. Runs against a throwaway
+mysqld by default, or a scratch SQLite file with --engine sqlite.
+
+    python benchmarks/bulk_status.py --rounds 50
+    python benchmarks/bulk_status.py --engine sqlite
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from benchmarks.local_mysql import LocalMySQL, create_schema, free_port  # noqa: E402
+from benchmarks.rush_hour import MENU, Client, Recorder, seed  # noqa: E402
+
+
+def reset(conn, order_id, status):
+    cursor = conn.cursor()
+    cursor.execute('UPDATE order_details SET order_status = %s WHERE order_id = %s', (status, order_id))
+    conn.commit()
+    cursor.close()
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(db_config, args):
+    args.chefs, args.waiters, args.spots, args.customers = 1, 1, 1, 1
+    seed(db_config, args)
+
+    if db_config.get('engine') == 'sqlite':
+        os.environ.update({'DB_ENGINE': 'sqlite', 'SQLITE_PATH': db_config['path']})
+    else:
+        os.environ.update({
+            'DB_HOST': db_config['host'], 'DB_PORT': str(db_config['port']),
+            'DB_USER': db_config['user'], 'DB_PASSWORD': db_config['password'],
+            'DB_NAME': db_config['database'],
+        })
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+
+    port = free_port()
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{port}'
+
+    recorder = Recorder()
+    customer, chef, waiter = (Client(base_url, recorder) for _ in range(3))
+    customer.request('customer_login', '/customer/login', form={'phone': '9000000000'})
+    _, body = customer.json('place_order_final', '/place_order_final',
+                            {'items': [{'id': item_id, 'quantity': 1} for item_id in range(1, len(MENU) + 1)]})
+    order_id = body['order_id']
+    chef.request('employee_login', '/employee/login', form={'phone': '7100000000', 'password': 'chef'})
+    waiter.request('employee_login', '/employee/login', form={'phone': '7200000000', 'password': 'waiter'})
+
+    conn = db.connect(db_config)
+    items = range(1, len(MENU) + 1)
+    lines = [{'order_id': order_id, 'item_id': item_id} for item_id in items]
+    rounds = {'chef single': [], 'chef bulk': [], 'waiter single': [], 'waiter bulk': []}
+    for _ in range(args.rounds):
+        reset(conn, order_id, 'placed')
+        rounds['chef single'].append(timed(lambda: [
+            chef.json('chef_mark_cooked', '/chef/mark_cooked', line) for line in lines]))
+        reset(conn, order_id, 'placed')
+        rounds['chef bulk'].append(timed(lambda: chef.json(
+            'chef_bulk_status', '/chef/bulk_status', {'lines': lines, 'status': 'cooked'})))
+
+        reset(conn, order_id, 'cooked')
+        rounds['waiter single'].append(timed(lambda: [
+            waiter.json('update_order_status', '/update_order_status', dict(line, status='delivered'))
+            for line in lines]))
+        reset(conn, order_id, 'cooked')
+        rounds['waiter bulk'].append(timed(lambda: waiter.json(
+            'waiter_bulk_status', '/waiter/bulk_status',
+            {'table_id': 1, 'from_status': 'cooked', 'status': 'delivered'})))
+    # The last bulk call must have moved every line, or the timings compare nothing
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM order_details WHERE order_id = %s AND order_status <> 'delivered'",
+                   (order_id,))
+    undelivered = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    server.shutdown()
+
+    print(f"{db_config.get('engine', 'mysql')}: {len(lines)} lines per round, {args.rounds} rounds")
+    for label, timings in rounds.items():
+        timings.sort()
+        print(f'{label:14s} p50 {timings[len(timings) // 2]:7.1f} ms  p95 {timings[int(len(timings) * 0.95)]:7.1f} ms')
+    errors = {endpoint: count for endpoint, count in recorder.errors.items() if count}
+    if errors:
+        sys.exit(f'errors: {errors}')
+    if undelivered:
+        sys.exit(f'{undelivered} lines were not delivered by the bulk request')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--engine', choices=['mysql', 'sqlite'], default='mysql')
+    args = parser.parse_args()
+
+    if args.engine == 'sqlite':
+        with tempfile.TemporaryDirectory() as workdir:
+            db_config = {'engine': 'sqlite', 'path': os.path.join(workdir, 'bulk_status.sqlite3')}
+            conn = db.connect(db_config)
+            db.create_sqlite_schema(conn, sample_data=False)
+            conn.close()
+            run(db_config, args)
+        return
+
+    with LocalMySQL() as server:
+        create_schema(server.db_config)
+        run(server.db_config, args)
+
+
+if __name__ == '__main__':
+    main()
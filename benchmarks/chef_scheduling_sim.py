@@ -0,0 +1,95 @@
+"""Simulate kitchen load under the round-robin and least-work chef policies.
+
+No database is needed: orders arrive as a Poisson process over a dinner
+service, each line is cooked by its chef one at a time in arrival order, and
+the report compares makespan, per-chef utilisation and mean ticket wait.
+
+    python benchmarks/chef_scheduling_sim.py --chefs 8 --orders 60 --hours 3
+"""
+import argparse
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import ChefScheduler, round_robin_chef  # noqa: E402
+
+# (category, prep_time) for the sample menu in schema.sql
+MENU = [
+    ('Pizza', 15), ('Burgers', 10), ('Salads', 5), ('Tiffin', 10), ('Tiffin', 15),
+    ('Tiffin', 6), ('Lunch', 25), ('Lunch', 25), ('Lunch', 10), ('Drinks', 2), ('Drinks', 3),
+]
+
+
+def generate_orders(count, minutes, seed):
+    rng = random.Random(seed)
+    orders = []
+    clock = 0.0
+    for order_id in range(1, count + 1):
+        clock += rng.expovariate(count / minutes)
+        lines = [(rng.choice(MENU), rng.randint(1, 3)) for _ in range(rng.randint(1, 5))]
+        orders.append((order_id, clock, lines))
+    return orders
+
+
+def simulate(orders, chef_ids, policy):
+    free_at = {chef_id: 0.0 for chef_id in chef_ids}
+    busy = {chef_id: 0.0 for chef_id in chef_ids}
+    queues = {chef_id: deque() for chef_id in chef_ids}
+    waits = []
+    scheduler = ChefScheduler()
+    scheduler.load([{'chef_id': chef_id} for chef_id in chef_ids], {})
+
+    for order_id, arrival, lines in orders:
+        # Lines finished before this arrival no longer count against their chef
+        for chef_id, queue in queues.items():
+            while queue and queue[0][0] <= arrival:
+                scheduler.complete(chef_id, queue.popleft()[1])
+
+        ticket_done = arrival
+        for (category, prep_time), qty in lines:
+            work = prep_time * qty
+            if policy == 'round-robin':
+                chef_id = round_robin_chef(order_id, chef_ids)
+            else:
+                chef_id = scheduler.assign(work, category)
+            start = max(arrival, free_at[chef_id])
+            free_at[chef_id] = start + work
+            busy[chef_id] += work
+            queues[chef_id].append((free_at[chef_id], work))
+            if policy == 'round-robin':
+                scheduler.add_work(chef_id, work)
+            ticket_done = max(ticket_done, free_at[chef_id])
+        waits.append(ticket_done - arrival)
+
+    makespan = max(free_at.values())
+    return {
+        'makespan': makespan,
+        'mean_wait': sum(waits) / len(waits),
+        'max_wait': max(waits),
+        'utilisation': {chef_id: busy[chef_id] / makespan for chef_id in chef_ids},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chefs', type=int, default=8)
+    parser.add_argument('--orders', type=int, default=60)
+    parser.add_argument('--hours', type=float, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    orders = generate_orders(args.orders, args.hours * 60, args.seed)
+    chef_ids = list(range(1, args.chefs + 1))
+    for policy in ('round-robin', 'least-work'):
+        result = simulate(orders, chef_ids, policy)
+        utilisation = ' '.join(f'{chef_id}:{value:.0%}' for chef_id, value in result['utilisation'].items())
+        print(f"{policy:<12} makespan {result['makespan']:7.1f} min  "
+              f"mean wait {result['mean_wait']:6.1f} min  max wait {result['max_wait']:6.1f} min  "
+              f"utilisation {utilisation}")
+
+
+if __name__ == '__main__':
+    main()
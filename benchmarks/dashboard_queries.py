@@ -0,0 +1,112 @@
+"""Check that the waiter dashboard runs the same number of SQL statements for any number of tables.
+
+Each size gets a scratch SQLite database with one waiter whose spots are all
+occupied, each by a customer with an open order of three lines. A child
+process per size logs the waiter in and loads /waiter/dashboard twice,
+reading the statement count from the Server-Timing header. The warm
+(second) load must cost the same at every size; exits non-zero otherwise.
+SQLite only: the count comes from the app's SQL, which is the same on MySQL.
+
+    python benchmarks/dashboard_queries.py --spots 10 20 40
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.rush_hour import MENU  # noqa: E402
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+LINES_PER_ORDER = 3
+
+
+def seed(path, spots):
+    import db
+
+    conn = db.connect({'engine': 'sqlite', 'path': path})
+    db.create_sqlite_schema(conn, sample_data=False)
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO menu (item_name, category, item_price, prep_time) VALUES (%s, %s, %s, %s)', MENU)
+    cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                   "VALUES ('Chef', 'chef', '7100000000', 'chef', 40000)")
+    cursor.execute("INSERT INTO chef (emp_id, specialization) VALUES (%s, 'General')", (cursor.lastrowid,))
+    chef_id = cursor.lastrowid
+    cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                   "VALUES ('Waiter', 'waiter', '7200000000', 'waiter', 30000)")
+    cursor.execute("INSERT INTO waiter (emp_id) VALUES (%s)", (cursor.lastrowid,))
+    waiter_id = cursor.lastrowid
+    for i in range(spots):
+        cursor.execute('INSERT INTO customer (c_phone, c_name) VALUES (%s, %s)', (f'9{i:09d}', f'Guest {i}'))
+        cust_id = cursor.lastrowid
+        cursor.execute('INSERT INTO spots (QR_code, waiter_id, cust_id, availability) VALUES (%s, %s, %s, 0)',
+                       (f'dash_qr_{i}', waiter_id, cust_id))
+        cursor.execute('INSERT INTO orders (cust_id) VALUES (%s)', (cust_id,))
+        order_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO order_details (order_id, item_id, chef_id, qty, item_name, category, unit_price)
+            VALUES (%s, %s, %s, 1, %s, %s, %s)
+        """, [(order_id, item_id, chef_id, name, category, price)
+              for item_id, (name, category, price, _) in enumerate(MENU[:LINES_PER_ORDER], start=1)])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def load_dashboard():
+    """Child process: log the waiter in and load the dashboard; prints the statement counts as JSON."""
+    from app import create_app
+
+    client = create_app().test_client()
+    client.post('/employee/login', data={'phone': '7200000000', 'password': 'waiter'})
+    counts = []
+    for _ in range(2):
+        response = client.get('/waiter/dashboard')
+        if response.status_code != 200:
+            raise SystemExit(f'/waiter/dashboard answered {response.status_code}')
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        counts.append(int(match.group(1)) if match else None)
+    print(json.dumps(counts))
+
+
+def count_queries(spots, workdir):
+    path = os.path.join(workdir, f'dashboard_{spots}.sqlite3')
+    seed(path, spots)
+    env = dict(os.environ, DB_ENGINE='sqlite', SQLITE_PATH=path)
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'],
+                           env=env, cwd=ROOT, capture_output=True, text=True)
+    if child.returncode:
+        raise SystemExit(f'{spots} spots: {child.stderr.strip() or child.stdout.strip()}')
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--spots', type=int, nargs='+', default=[10, 20], help='tables per run')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        load_dashboard()
+        return
+
+    warm = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'spots':>6} {'cold':>6} {'warm':>6}")
+        for spots in args.spots:
+            cold, warm[spots] = count_queries(spots, workdir)
+            print(f'{spots:>6} {cold:>6} {warm[spots]:>6}')
+    if len(set(warm.values())) != 1:
+        print('FAIL: the warm dashboard query count changes with the number of spots')
+        sys.exit(1)
+    print('OK: the warm dashboard query count does not depend on the number of spots')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Check that the app behaves the same on MySQL and SQLite, and time both.
+
+Each engine gets a scratch database with the same seed data: a temporary
+SQLite file created from schema_sqlite.sql, and a throwaway mysqld (or
+--db-host) created from schema.sql and the migrations. A child process per
+engine then drives the same scripted service through the Flask test client:
+customers log in, browse, order, chefs cook, waiters deliver and approve
+bills, and an admin reads the reports and an export. Every request must
+succeed and run the same number of SQL statements on both engines (read
+from the Server-Timing header); p50 latency per step is printed side by side.
+Exits non-zero on any failed request or query-count mismatch. With a single
+engine only the requests are checked; the last line names the engines run.
+
+    python benchmarks/engine_parity.py --rounds 50
+    python benchmarks/engine_parity.py --engines sqlite
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.rush_hour import MENU  # noqa: E402
+
+ENGINES = ('sqlite', 'mysql')
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# In-memory caches resync on timers; keep them from firing mid-run so both
+# engines see the same sequence of cache loads
+QUIET_CACHES = {
+    'CHEF_SCHEDULER_RESYNC': '3600', 'KITCHEN_QUEUE_RESYNC': '3600', 'MENU_CACHE_TTL': '3600',
+    'SEAT_RESYNC': '3600', 'WAITLIST_ETA_REFRESH': '3600', 'REPORTS_REFRESH': '3600',
+    'IDENTITY_CACHE_TTL': '3600',
+}
+
+
+def seed(conn, customers, spots):
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO menu (item_name, category, item_price, prep_time) VALUES (%s, %s, %s, %s)', MENU)
+    cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                   "VALUES ('Admin', 'admin', '7000000000', 'admin', 50000)")
+    cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                   "VALUES ('Chef', 'chef', '7100000000', 'chef', 40000)")
+    cursor.execute("INSERT INTO chef (emp_id, specialization) VALUES (%s, 'General')", (cursor.lastrowid,))
+    cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                   "VALUES ('Waiter', 'waiter', '7200000000', 'waiter', 30000)")
+    cursor.execute("INSERT INTO waiter (emp_id) VALUES (%s)", (cursor.lastrowid,))
+    waiter_id = cursor.lastrowid
+    cursor.executemany('INSERT INTO spots (QR_code, waiter_id) VALUES (%s, %s)',
+                       [(f'parity_qr_{i}', waiter_id) for i in range(spots)])
+    cursor.executemany('INSERT INTO customer (c_phone, c_name) VALUES (%s, %s)',
+                       [(f'9{i:09d}', f'Guest {i}') for i in range(customers)])
+    conn.commit()
+    cursor.close()
+
+
+class Steps:
+    def __init__(self):
+        self.queries = {}
+        self.seconds = {}
+        self.failures = []
+
+    def call(self, step, client, method, path, **kwargs):
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - started
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        self.queries.setdefault(step, []).append(int(match.group(1)) if match else None)
+        self.seconds.setdefault(step, []).append(elapsed)
+        body = response.get_data()
+        if response.status_code >= 400 or (response.is_json and response.get_json().get('success') is False):
+            self.failures.append(f'{step} {path}: {response.status_code} {body[:200]!r}')
+        return response
+
+
+def drive(rounds, seed_value):
+    """Child process: serve the scripted evening against the database in the environment."""
+    from app import create_app
+
+    app = create_app()
+
+    rng = random.Random(seed_value)
+    steps = Steps()
+    chef = app.test_client()
+    waiter = app.test_client()
+    admin = app.test_client()
+    steps.call('employee_login', chef, 'post', '/employee/login', data={'phone': '7100000000', 'password': 'chef'})
+    steps.call('employee_login', waiter, 'post', '/employee/login',
+               data={'phone': '7200000000', 'password': 'waiter'})
+    steps.call('employee_login', admin, 'post', '/employee/login', data={'phone': '7000000000', 'password': 'admin'})
+
+    for n in range(rounds):
+        customer = app.test_client()
+        steps.call('customer_login', customer, 'post', '/customer/login', data={'phone': f'9{n:09d}'})
+        steps.call('menu', customer, 'get', '/menu')
+        item_ids = rng.sample(range(1, len(MENU) + 1), rng.randint(1, 5))
+        response = steps.call('place_order_final', customer, 'post', '/place_order_final',
+                              json={'items': [{'id': item_id, 'quantity': rng.randint(1, 3)} for item_id in item_ids]})
+        order_id = (response.get_json() or {}).get('order_id')
+        if not order_id:
+            continue
+        # A second cart on the same order exercises the upsert path
+        steps.call('place_order_final', customer, 'post', '/place_order_final',
+                   json={'items': [{'id': item_ids[0], 'quantity': 4}]})
+        steps.call('customer_dashboard', customer, 'get', '/customer/dashboard')
+        steps.call('chef_queue', chef, 'get', '/chef/queue')
+        lines = [{'order_id': order_id, 'item_id': item_id} for item_id in item_ids]
+        steps.call('chef_bulk_status', chef, 'post', '/chef/bulk_status', json={'lines': lines, 'status': 'cooked'})
+        steps.call('waiter_dashboard', waiter, 'get', '/waiter/dashboard')
+        steps.call('waiter_bulk_status', waiter, 'post', '/waiter/bulk_status',
+                   json={'lines': lines, 'status': 'delivered'})
+        steps.call('customer_bill', customer, 'get', f'/customer/bill/{order_id}')
+        steps.call('request_bill', customer, 'post', '/request_bill',
+                   json={'order_id': order_id, 'redeem_points': rng.choice([0, 100])})
+        steps.call('approve_bill', waiter, 'post', '/waiter/approve_bill', json={'order_id': order_id})
+        steps.call('logout', customer, 'get', '/logout')
+        if n % 10 == 9:
+            steps.call('admin_reports', admin, 'get', '/admin/reports')
+            steps.call('admin_lifecycle', admin, 'get', '/admin/reports/lifecycle')
+            steps.call('admin_export', admin, 'get', '/admin/export/order_lines')
+
+    return {'queries': steps.queries, 'seconds': steps.seconds, 'failures': steps.failures}
+
+
+def run_engine(engine, args, db_config):
+    import db
+
+    conn = db.connect(db_config)
+    if engine == 'sqlite':
+        db.create_sqlite_schema(conn, sample_data=False)
+    seed(conn, args.rounds, args.spots)
+    conn.close()
+
+    env = dict(os.environ, **QUIET_CACHES)
+    if engine == 'sqlite':
+        env.update({'DB_ENGINE': 'sqlite', 'SQLITE_PATH': db_config['path']})
+    else:
+        env.update({'DB_ENGINE': 'mysql', 'DB_HOST': db_config['host'], 'DB_PORT': str(db_config['port']),
+                    'DB_USER': db_config['user'], 'DB_PASSWORD': db_config['password'],
+                    'DB_NAME': db_config['database']})
+    # The app reads its database settings at import time, so each engine gets its own process
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child',
+                            '--rounds', str(args.rounds), '--seed', str(args.seed)],
+                           env=env, cwd=ROOT, capture_output=True, text=True)
+    if child.returncode:
+        sys.exit(f'{engine} run failed:\n{child.stderr}')
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def with_engine(engine, args):
+    if engine == 'sqlite':
+        with tempfile.TemporaryDirectory() as workdir:
+            return run_engine(engine, args, {'engine': 'sqlite', 'path': os.path.join(workdir, 'parity.sqlite3')})
+
+    from benchmarks.local_mysql import LocalMySQL, create_schema
+
+    if args.db_host:
+        import mysql.connector
+
+        if args.db_name == 'restaurant_db':
+            sys.exit('Refusing to benchmark against restaurant_db; use a scratch database')
+        db_config = {'host': args.db_host, 'port': args.db_port, 'user': args.db_user,
+                     'password': args.db_password, 'database': args.db_name}
+        conn = mysql.connector.connect(**{k: v for k, v in db_config.items() if k != 'database'})
+        cursor = conn.cursor()
+        cursor.execute(f'DROP DATABASE IF EXISTS {args.db_name}')
+        cursor.execute(f'CREATE DATABASE {args.db_name}')
+        cursor.close()
+        conn.close()
+        create_schema(db_config)
+        return run_engine(engine, args, db_config)
+    with LocalMySQL(args.db_name) as server:
+        create_schema(server.db_config)
+        return run_engine(engine, args, server.db_config)
+
+
+def p50_ms(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2] * 1000
+
+
+def report(results):
+    engines = list(results)
+    problems = []
+    for engine, result in results.items():
+        problems.extend(f'{engine}: {failure}' for failure in result['failures'])
+    steps = sorted(set().union(*(result['queries'] for result in results.values())))
+    print(f"{'step':<20} {'reqs':>5} {'queries':>8} " + ' '.join(f'{engine + " p50 ms":>15}' for engine in engines))
+    for step in steps:
+        counts = [results[engine]['queries'].get(step) for engine in engines]
+        if any(count != counts[0] for count in counts):
+            problems.append(f'{step}: query counts differ ' +
+                            ', '.join(f'{engine} {count}' for engine, count in zip(engines, counts)))
+        first = counts[0] or []
+        total = sum(count or 0 for count in first)
+        print(f'{step:<20} {len(first):>5} {total / max(len(first), 1):>8.1f} ' +
+              ' '.join(f"{p50_ms(results[engine]['seconds'][step]):>15.2f}" for engine in engines))
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"FAIL on {', '.join(engines)}")
+    elif len(engines) == 1:
+        # Nothing to compare the counts with
+        print(f'OK: every request succeeded on {engines[0]}; query-count parity was not checked')
+    else:
+        print(f"OK: every request succeeded and query counts match on {', '.join(engines)}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50, help='customers served, one after another')
+    parser.add_argument('--spots', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    parser.add_argument('--db-host', help='use an existing MySQL server instead of a throwaway mysqld')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='restaurant_bench')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(drive(args.rounds, args.seed)))
+        return
+
+    results = {engine: with_engine(engine, args) for engine in args.engines}
+    if not report(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Time the hot lookup queries before and after the index migrations.
+
+Seeds a throwaway MySQL server with order history (1,000,000 order lines by
+default), times each query, runs `migrate up`, times them again, then rolls
+back with `migrate down` to check the rollback path.
+
+Migrations are MySQL-only. With --engine sqlite the same queries run on a
+scratch SQLite file, first with the migrations' indexes dropped and then
+with them created again; that measures the indexes but not migrate.py.
+
+    python benchmarks/index_migration.py --lines 1000000 --repeat 50
+    python benchmarks/index_migration.py --engine sqlite
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from benchmarks.local_mysql import LocalMySQL, create_schema  # noqa: E402
+from migrate import discover, index_exists, migrate  # noqa: E402
+
+CHEFS = 8
+SPOTS = 40
+CUSTOMERS = 20000
+
+QUERIES = [
+    ('unpaid order for customer',
+     'SELECT order_id FROM orders WHERE cust_id = %s AND paid_status = 0',
+     lambda rng: (rng.randint(1, CUSTOMERS),)),
+    ('chef open lines',
+     "SELECT order_id, item_id, qty FROM order_details WHERE chef_id = %s AND order_status IN ('placed', 'cooking')",
+     lambda rng: (rng.randint(1, CHEFS),)),
+    ('free spots',
+     'SELECT table_id FROM spots WHERE availability = 1 ORDER BY table_id',
+     lambda rng: ()),
+    ('orders in last 30 days',
+     'SELECT COUNT(*) FROM orders WHERE time_stamp >= %s',
+     lambda rng: (datetime(2026, 1, 1) - timedelta(days=30),)),
+]
+
+
+def seed(db_config, lines, seed_value):
+    rng = random.Random(seed_value)
+    conn = db.connect(db_config)
+    cursor = conn.cursor()
+    cursor.executemany('INSERT INTO customer (c_phone, c_name) VALUES (%s, %s)',
+                       [(f'8{i:09d}', f'Customer {i}') for i in range(1, CUSTOMERS + 1)])
+    cursor.executemany('INSERT INTO employee (e_name, role, e_phone, passwd, salary) VALUES (%s, %s, %s, %s, %s)',
+                       [(f'Chef {i}', 'chef', f'7{i:09d}', 'x', 30000) for i in range(1, CHEFS + 1)]
+                       + [('Waiter', 'waiter', '7999999999', 'x', 20000)])
+    cursor.executemany('INSERT INTO chef (emp_id) VALUES (%s)', [(i,) for i in range(1, CHEFS + 1)])
+    cursor.execute('INSERT INTO waiter (emp_id) VALUES (%s)', (CHEFS + 1,))
+    cursor.executemany('INSERT INTO spots (QR_code, waiter_id, availability) VALUES (%s, 1, %s)',
+                       [(f'qr{i}', int(i % 4 == 0)) for i in range(1, SPOTS + 1)])
+    cursor.executemany('INSERT INTO menu (item_name, category, item_price, prep_time) VALUES (%s, %s, %s, %s)',
+                       [(f'Item {i}', 'Lunch', 100 + i, 5 + i) for i in range(1, 21)])
+    conn.commit()
+
+    # Three lines per order over two years; only the newest orders are still open
+    order_count = lines // 3
+    start = datetime(2024, 1, 1)
+    batch_orders, batch_lines = [], []
+    for order_id in range(1, order_count + 1):
+        open_order = order_id > order_count - 200
+        stamp = start + timedelta(seconds=int(order_id / order_count * 730 * 86400))
+        batch_orders.append((order_id, rng.randint(1, CUSTOMERS), stamp, int(not open_order)))
+        for item_id in rng.sample(range(1, 21), 3):
+            status = rng.choice(['placed', 'cooking']) if open_order else 'billed'
+            batch_lines.append((order_id, item_id, status, rng.randint(1, CHEFS), rng.randint(1, 3)))
+        if len(batch_lines) >= 30000 or order_id == order_count:
+            cursor.executemany('INSERT INTO orders (order_id, cust_id, time_stamp, paid_status) '
+                               'VALUES (%s, %s, %s, %s)', batch_orders)
+            cursor.executemany('INSERT INTO order_details (order_id, item_id, order_status, chef_id, qty) '
+                               'VALUES (%s, %s, %s, %s, %s)', batch_lines)
+            conn.commit()
+            batch_orders, batch_lines = [], []
+    analyze(cursor, db_config)
+    cursor.close()
+    conn.close()
+
+
+def analyze(cursor, db_config):
+    if db_config.get('engine') == 'sqlite':
+        cursor.execute('ANALYZE')
+    else:
+        cursor.execute('ANALYZE TABLE orders, order_details, spots')
+        cursor.fetchall()
+
+
+def migration_indexes():
+    return [index for m in discover() for index in getattr(m.module, 'INDEXES', [])]
+
+
+def time_queries(db_config, repeat, seed_value):
+    rng = random.Random(seed_value)
+    conn = db.connect(db_config)
+    cursor = conn.cursor()
+    results = {}
+    for label, sql, params in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params(rng))
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        results[label] = (timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.95)] * 1000)
+    cursor.close()
+    conn.close()
+    return results
+
+
+def print_results(before, after):
+    print(f'\n{"query":28s} {"before p50":>11s} {"after p50":>10s} {"before p95":>11s} {"after p95":>10s}')
+    for label, _, _ in QUERIES:
+        print(f'{label:28s} {before[label][0]:9.2f}ms {after[label][0]:8.2f}ms '
+              f'{before[label][1]:9.2f}ms {after[label][1]:8.2f}ms')
+
+
+def run_sqlite(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        db_config = {'engine': 'sqlite', 'path': os.path.join(workdir, 'index_migration.sqlite3')}
+        conn = db.connect(db_config)
+        db.create_sqlite_schema(conn, sample_data=False)
+        # schema_sqlite.sql already has every migration applied
+        cursor = conn.cursor()
+        for _, name, _ in migration_indexes():
+            cursor.execute(f'DROP INDEX {name}')
+        conn.commit()
+        started = time.perf_counter()
+        seed(db_config, args.lines, args.seed)
+        print(f'sqlite: seeded {args.lines} order lines in {time.perf_counter() - started:.0f}s')
+
+        before = time_queries(db_config, args.repeat, args.seed)
+        for table, name, columns in migration_indexes():
+            cursor.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+        analyze(cursor, db_config)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        after = time_queries(db_config, args.repeat, args.seed)
+        print_results(before, after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--engine', choices=['mysql', 'sqlite'], default='mysql')
+    args = parser.parse_args()
+
+    if args.engine == 'sqlite':
+        run_sqlite(args)
+        return
+
+    with LocalMySQL() as server:
+        db_config = server.db_config
+        create_schema(db_config, migrations=False)
+        started = time.perf_counter()
+        seed(db_config, args.lines, args.seed)
+        print(f'seeded {args.lines} order lines in {time.perf_counter() - started:.0f}s')
+
+        before = time_queries(db_config, args.repeat, args.seed)
+        conn = db.connect(db_config)
+        migrate(conn)
+        after = time_queries(db_config, args.repeat, args.seed)
+        print_results(before, after)
+
+        print()
+        migrate(conn, target=0, direction='down')
+        cursor = conn.cursor()
+        leftover = [name for table, name, _ in migration_indexes() if index_exists(cursor, table, name)]
+        cursor.close()
+        conn.close()
+        if leftover:
+            sys.exit(f'rollback left indexes behind: {", ".join(leftover)}')
+        print('rollback removed all indexes')
+
+
+if __name__ == '__main__':
+    main()
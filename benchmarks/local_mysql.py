@@ -0,0 +1,110 @@
+"""Throwaway MySQL server for benchmarks, seeded from schema.sql and the migrations.
+
+Starts a private mysqld on a temporary data directory and a free port so a
+benchmark never touches a real restaurant database.
+"""
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+import mysql.connector
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalMySQL:
+    def __init__(self, database='restaurant_bench', mysqld=None):
+        self.database = database
+        self.mysqld = mysqld or shutil.which('mysqld')
+        if not self.mysqld:
+            raise RuntimeError('mysqld not found on PATH; pass --db-host to use an existing server')
+        self.port = free_port()
+        self.workdir = None
+        self.process = None
+
+    @property
+    def db_config(self):
+        return {'host': '127.0.0.1', 'port': self.port, 'user': 'root', 'password': '',
+                'database': self.database}
+
+    def start(self):
+        self.workdir = tempfile.mkdtemp(prefix='rms-mysql-')
+        datadir = os.path.join(self.workdir, 'data')
+        subprocess.run([self.mysqld, '--no-defaults', '--initialize-insecure', f'--datadir={datadir}'],
+                       check=True, capture_output=True)
+        self.process = subprocess.Popen([
+            self.mysqld, '--no-defaults',
+            f'--datadir={datadir}',
+            f'--socket={os.path.join(self.workdir, "mysql.sock")}',
+            f'--port={self.port}',
+            '--bind-address=127.0.0.1',
+            '--mysqlx=OFF',
+            f'--log-error={os.path.join(self.workdir, "error.log")}',
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                conn = mysql.connector.connect(host='127.0.0.1', port=self.port, user='root', password='')
+                break
+            except mysql.connector.Error:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f'mysqld did not start; see {self.workdir}/error.log')
+                time.sleep(0.2)
+        cursor = conn.cursor()
+        cursor.execute(f'CREATE DATABASE {self.database}')
+        cursor.close()
+        conn.close()
+        return self
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def schema_statements(path=SCHEMA_PATH):
+    # Only the table definitions are taken from schema.sql; benchmarks seed
+    # their own data so runs are comparable
+    with open(path) as schema:
+        sql = re.sub(r'--[^\n]*', '', schema.read())
+    for statement in sql.split(';'):
+        statement = statement.strip()
+        if re.match(r'(CREATE TABLE|ALTER TABLE)', statement, re.IGNORECASE):
+            yield statement
+
+
+def create_schema(db_config, path=SCHEMA_PATH, migrations=True):
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor()
+    for statement in schema_statements(path):
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+    if migrations:
+        from migrate import migrate
+        migrate(conn)
+    conn.close()
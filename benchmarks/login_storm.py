@@ -0,0 +1,287 @@
+"""Measure the re-login storm a rolling restart causes, with and without server-side sessions.
+
+Several app worker processes share one SQLite database and sit behind a
+round-robin "load balancer" (each request goes to the next worker).
+Customers browse the menu, waiters watch their dashboard and chefs poll
+their queue. Whenever a request bounces to a login page the user logs in
+again, which for customers re-runs seat allocation. After a steady
+period every worker is restarted in turn, then the run settles again.
+
+Two setups are compared:
+  before  Flask cookie sessions, each worker process with its own random
+          secret key, as with app.secret_key = os.urandom(24)
+  after   server-side sessions (SESSION_STORE=file) signed with one shared
+          key from SECRET_KEY_FILE
+
+For each setup the script prints re-logins, failed requests and p50/p95
+latency before, during and after the restart.
+
+    python benchmarks/login_storm.py --workers 3 --customers 40
+"""
+import argparse
+import http.client
+import http.cookiejar
+import itertools
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.local_mysql import free_port  # noqa: E402
+from benchmarks.rush_hour import MENU, NoRedirect  # noqa: E402
+
+PHASES = ('steady', 'restart', 'settled')
+
+
+def seed(path, customers, waiters, chefs):
+    import db
+
+    conn = db.connect({'engine': 'sqlite', 'path': path})
+    db.create_sqlite_schema(conn, sample_data=False)
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO menu (item_name, category, item_price, prep_time) VALUES (%s, %s, %s, %s)', MENU)
+    for i in range(chefs):
+        cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                       "VALUES (%s, 'chef', %s, 'chef', 40000)", (f'Chef {i}', f'71{i:08d}'))
+        cursor.execute("INSERT INTO chef (emp_id, specialization) VALUES (%s, 'General')", (cursor.lastrowid,))
+    waiter_ids = []
+    for i in range(waiters):
+        cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                       "VALUES (%s, 'waiter', %s, 'waiter', 30000)", (f'Waiter {i}', f'72{i:08d}'))
+        cursor.execute("INSERT INTO waiter (emp_id) VALUES (%s)", (cursor.lastrowid,))
+        waiter_ids.append(cursor.lastrowid)
+    # A spot for everyone, so a re-login finds the customer's own table again
+    cursor.executemany('INSERT INTO spots (QR_code, waiter_id) VALUES (%s, %s)',
+                       [(f'storm_qr_{i}', waiter_ids[i % len(waiter_ids)]) for i in range(customers)])
+    cursor.executemany('INSERT INTO customer (c_phone, c_name) VALUES (%s, %s)',
+                       [(f'9{i:09d}', f'Guest {i}') for i in range(customers)])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+class Worker:
+    def __init__(self, port, env):
+        self.port = port
+        self.env = env
+        self.process = None
+
+    def start(self, secret_key=None):
+        env = dict(self.env)
+        if secret_key:
+            env['SECRET_KEY'] = secret_key
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(self.port)],
+                                        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/health/sessions', timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError(f'worker on port {self.port} did not start')
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=30)
+
+
+class Stats:
+    def __init__(self):
+        self.phase = PHASES[0]
+        self.latencies = {phase: [] for phase in PHASES}
+        self.relogins = {phase: 0 for phase in PHASES}
+        self.seatless = {phase: 0 for phase in PHASES}
+        self.failures = {phase: 0 for phase in PHASES}
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.latencies[self.phase].append(seconds)
+            if not ok:
+                self.failures[self.phase] += 1
+
+    def relogin(self, seated=True):
+        with self._lock:
+            self.relogins[self.phase] += 1
+            if not seated:
+                self.seatless[self.phase] += 1
+
+
+class User:
+    def __init__(self, balancer, stats, role, phone):
+        self.balancer = balancer
+        self.stats = stats
+        self.role = role
+        self.phone = phone
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, path, form=None):
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        started = time.perf_counter()
+        # A worker that is restarting refuses connections; the balancer moves on
+        for _ in range(len(self.balancer.ports) * 2):
+            req = urllib.request.Request(f'http://127.0.0.1:{self.balancer.next_port()}{path}', data=data)
+            try:
+                with self.opener.open(req, timeout=30) as response:
+                    response.read()
+                    status, location = response.status, ''
+                break
+            except urllib.error.HTTPError as e:
+                e.read()
+                status, location = e.code, e.headers.get('Location', '')
+                break
+            except (OSError, http.client.HTTPException):
+                status, location = None, ''
+        self.stats.record(time.perf_counter() - started, status is not None and status < 500)
+        return status, location
+
+    def login(self):
+        if self.role == 'customer':
+            status, location = self.request('/customer/login', {'phone': self.phone})
+            return status == 302 and location.endswith('/menu')
+        password = self.role
+        status, _ = self.request('/employee/login', {'phone': self.phone, 'password': password})
+        return status == 302
+
+    def visit(self):
+        # True while the session is still accepted
+        if self.role == 'customer':
+            status, location = self.request('/menu')
+            return not (status == 302 and 'login' in location)
+        if self.role == 'waiter':
+            status, location = self.request('/waiter/dashboard')
+            return not (status == 302 and 'login' in location)
+        status, _ = self.request('/chef/queue')
+        return status not in (401, 403)
+
+    def run(self, stop, think):
+        self.login()
+        while not stop.is_set():
+            if not self.visit():
+                self.stats.relogin(self.login())
+            stop.wait(think)
+
+
+class Balancer:
+    def __init__(self, ports):
+        self.ports = ports
+        self._cycle = itertools.cycle(ports)
+        self._lock = threading.Lock()
+
+    def next_port(self):
+        with self._lock:
+            return next(self._cycle)
+
+
+def run(mode, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'storm.sqlite3')
+        seed(database, args.customers, args.waiters, args.chefs)
+        env = dict(os.environ, DB_ENGINE='sqlite', SQLITE_PATH=database)
+        if mode == 'before':
+            env['SESSION_STORE'] = 'cookie'
+        else:
+            env.update({'SESSION_STORE': 'file', 'SESSION_DIR': os.path.join(workdir, 'sessions'),
+                        'SECRET_KEY_FILE': os.path.join(workdir, 'secret_key')})
+            env.pop('SECRET_KEY', None)
+
+        def key():
+            # What os.urandom(24) at import time amounted to
+            return secrets.token_hex(24) if mode == 'before' else None
+
+        workers = [Worker(free_port(), env) for _ in range(args.workers)]
+        for worker in workers:
+            worker.start(key())
+        balancer = Balancer([worker.port for worker in workers])
+        stats = Stats()
+        stop = threading.Event()
+        users = ([User(balancer, stats, 'customer', f'9{i:09d}') for i in range(args.customers)] +
+                 [User(balancer, stats, 'waiter', f'72{i:08d}') for i in range(args.waiters)] +
+                 [User(balancer, stats, 'chef', f'71{i:08d}') for i in range(args.chefs)])
+        threads = [threading.Thread(target=user.run, args=(stop, args.think), daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+        try:
+            time.sleep(args.settle)
+            stats.phase = 'restart'
+            restart_started = time.monotonic()
+            for worker in workers:
+                worker.stop()
+                worker.start(key())
+                time.sleep(args.gap)
+            restart_seconds = time.monotonic() - restart_started
+            stats.phase = 'settled'
+            time.sleep(args.settle)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=30)
+            for worker in workers:
+                worker.stop()
+    return stats, restart_seconds
+
+
+def pct(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+
+def report(mode, stats, restart_seconds, users):
+    print(f'\n{mode}: {users} users, rolling restart took {restart_seconds:.1f}s')
+    print(f"{'phase':<10} {'requests':>9} {'failed':>7} {'re-logins':>10} {'no seat':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for phase in PHASES:
+        samples = stats.latencies[phase]
+        print(f'{phase:<10} {len(samples):>9} {stats.failures[phase]:>7} {stats.relogins[phase]:>10} '
+              f'{stats.seatless[phase]:>8} {pct(samples, 50):>8.1f} {pct(samples, 95):>8.1f}')
+
+
+def serve(port):
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--customers', type=int, default=40)
+    parser.add_argument('--waiters', type=int, default=3)
+    parser.add_argument('--chefs', type=int, default=3)
+    parser.add_argument('--think', type=float, default=0.2, help='seconds each user waits between requests')
+    parser.add_argument('--settle', type=float, default=5, help='seconds before and after the restart')
+    parser.add_argument('--gap', type=float, default=1, help='seconds between restarting two workers')
+    parser.add_argument('--modes', nargs='+', choices=('before', 'after'), default=['before', 'after'])
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    for mode in args.modes:
+        stats, restart_seconds = run(mode, args)
+        report(mode, stats, restart_seconds, args.customers + args.waiters + args.chefs)
+
+
+if __name__ == '__main__':
+    main()
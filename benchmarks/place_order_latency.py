@@ -0,0 +1,89 @@
+"""Latency of /place_order_final versus cart size.
+
+Runs the app in-process against the database configured in .env and places
+carts of increasing size for a throwaway customer, removing the order after
+each run so every sample writes fresh lines.
+
+    python benchmarks/place_order_latency.py --runs 50 --sizes 1 2 5 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from blueprints.common import db_pool  # noqa: E402
+
+app = create_app()
+
+BENCH_PHONE = '0000000000'
+
+
+def setup_customer():
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('SELECT cust_id FROM customer WHERE c_phone = %s', (BENCH_PHONE,))
+        customer = cursor.fetchone()
+        if customer:
+            cust_id = customer['cust_id']
+        else:
+            cursor.execute("INSERT INTO customer (c_name, c_phone) VALUES ('Benchmark', %s)", (BENCH_PHONE,))
+            cust_id = cursor.lastrowid
+        cursor.execute('SELECT item_id FROM menu ORDER BY item_id')
+        item_ids = [row['item_id'] for row in cursor.fetchall()]
+        cursor.close()
+    return cust_id, item_ids
+
+
+def clear_orders(cust_id):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            DELETE od FROM order_details od
+            JOIN orders o ON od.order_id = o.order_id
+            WHERE o.cust_id = %s
+        ''', (cust_id,))
+        cursor.execute('DELETE FROM orders WHERE cust_id = %s', (cust_id,))
+        cursor.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 5, 10, 20])
+    args = parser.parse_args()
+
+    cust_id, item_ids = setup_customer()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = cust_id
+        sess['role'] = 'customer'
+
+    print(f"{'cart':>5} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    try:
+        for size in args.sizes:
+            cart = [{'id': item_id, 'quantity': 1} for item_id in item_ids[:size]]
+            samples = []
+            for _ in range(args.runs):
+                clear_orders(cust_id)
+                started = time.perf_counter()
+                response = client.post('/place_order_final', json={'items': cart})
+                samples.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    sys.exit(f'place_order_final failed: {response.get_json()}')
+            print(f'{len(cart):>5} {args.runs:>5} {statistics.median(samples):>9.2f} '
+                  f'{percentile(samples, 95):>9.2f} {statistics.mean(samples):>9.2f}')
+    finally:
+        clear_orders(cust_id)
+
+
+if __name__ == '__main__':
+    main()
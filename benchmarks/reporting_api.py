@@ -0,0 +1,66 @@
+"""Time the columnar reporting engine on a synthetic year of sales.
+
+No database is needed: bills and order lines are generated straight into
+the extract's arrays, then a year-long report is run at each granularity.
+
+    python benchmarks/reporting_api.py --lines 1000000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import GRANULARITIES, SalesExtract  # noqa: E402
+
+# item_id -> price for the sample menu in schema.sql
+PRICES = np.array([299, 199, 149, 99, 69, 49, 349, 279, 350, 49, 39], dtype=np.float64)
+
+
+def synthesize(extract, line_count, seed, start=datetime(2025, 1, 1)):
+    rng = np.random.default_rng(seed)
+    bill_count = line_count // 3
+    start_ts = int(np.datetime64(start, 's').astype(np.int64))
+    # Service hours cluster around lunch and dinner
+    days = rng.integers(0, 365, bill_count)
+    hours = np.where(rng.random(bill_count) < 0.4, rng.normal(13, 1, bill_count), rng.normal(20, 1.5, bill_count))
+    bill_ts = start_ts + days * 86400 + (np.clip(hours, 0, 23.99) * 3600).astype(np.int64)
+
+    line_bill = np.sort(rng.integers(0, bill_count, line_count))
+    item_index = rng.integers(0, len(PRICES), line_count)
+    qty = rng.integers(1, 4, line_count)
+    line_revenue = PRICES[item_index] * qty
+    bill_revenue = np.bincount(line_bill, weights=line_revenue, minlength=bill_count)
+
+    extract.append((bill_ts, bill_revenue), (bill_ts[line_bill], item_index + 1, qty, line_revenue))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    extract = SalesExtract()
+    started = time.perf_counter()
+    synthesize(extract, args.lines, args.seed)
+    print(f'built extract: {args.lines} lines, {extract.columns.bill_ts.size} bills '
+          f'in {time.perf_counter() - started:.2f}s')
+
+    for granularity in GRANULARITIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            report = extract.report(datetime(2025, 1, 1), datetime(2026, 1, 1), granularity)
+            timings.append(time.perf_counter() - started)
+        print(f'{granularity:>6}: {len(report["series"]):5d} periods  '
+              f'best {min(timings) * 1000:7.1f} ms  worst {max(timings) * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
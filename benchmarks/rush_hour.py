@@ -0,0 +1,397 @@
+"""Friday night load test: drive the whole app with a realistic mix of users.
+
+The app is served over HTTP from a background thread against a scratch
+database (a throwaway mysqld by default, seeded from schema.sql) while
+virtual customers grab seats, browse the menu, order and pay, chefs cook,
+waiters deliver and approve bills, and an admin watches the reports.
+Throughput and p50/p95/p99 latency per endpoint are printed and written to
+a JSON file so runs can be compared across commits.
+
+    python benchmarks/rush_hour.py --duration 60 --customers 30
+    python benchmarks/rush_hour.py --compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mysql.connector  # noqa: E402
+
+import db  # noqa: E402
+from benchmarks.local_mysql import LocalMySQL, create_schema, free_port  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Same items as the sample menu in schema.sql
+MENU = [
+    ('Margherita Pizza', 'Pizza', 299.00, 15),
+    ('Chicken Burger', 'Burgers', 199.00, 10),
+    ('Caesar Salad', 'Salads', 149.00, 5),
+    ('Dosa', 'Tiffin', 99.00, 10),
+    ('Idly', 'Tiffin', 69.00, 15),
+    ('Chapthi', 'Tiffin', 49.00, 6),
+    ('Veg Thali', 'Lunch', 349.00, 25),
+    ('Biryani', 'Lunch', 279.00, 25),
+    ('Noodles', 'Lunch', 350.00, 10),
+    ('Fresh Lime Soda', 'Drinks', 49.00, 2),
+    ('Filter Coffee', 'Drinks', 39.00, 3),
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, duration):
+        result = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+
+            def pct(p):
+                return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+            result[endpoint] = {
+                'requests': len(ordered),
+                'errors': self.errors.get(endpoint, 0),
+                'throughput': len(ordered) / duration,
+                'p50_ms': pct(50),
+                'p95_ms': pct(95),
+                'p99_ms': pct(99),
+            }
+        return result
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Each timed request is exactly one round trip
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, endpoint, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            status = e.code
+        self.recorder.record(endpoint, time.perf_counter() - started, status < 400)
+        return status, body
+
+    def json(self, endpoint, path, body):
+        status, raw = self.request(endpoint, path, json_body=body)
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, {}
+
+
+def seed(db_config, args):
+    # db.connect() so seat_race.py can seed a SQLite file the same way
+    conn = db.connect(db_config)
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO menu (item_name, category, item_price, prep_time) VALUES (%s, %s, %s, %s)', MENU)
+    cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                   "VALUES ('Admin', 'admin', '7000000000', 'admin', 50000)")
+    for i in range(args.chefs):
+        cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                       "VALUES (%s, 'chef', %s, 'chef', 40000)", (f'Chef {i}', f'71{i:08d}'))
+        cursor.execute("INSERT INTO chef (emp_id, specialization) VALUES (%s, 'General')", (cursor.lastrowid,))
+    waiter_ids = []
+    for i in range(args.waiters):
+        cursor.execute("INSERT INTO employee (e_name, role, e_phone, passwd, salary) "
+                       "VALUES (%s, 'waiter', %s, 'waiter', 30000)", (f'Waiter {i}', f'72{i:08d}'))
+        cursor.execute("INSERT INTO waiter (emp_id) VALUES (%s)", (cursor.lastrowid,))
+        waiter_ids.append(cursor.lastrowid)
+    cursor.executemany('INSERT INTO spots (QR_code, waiter_id) VALUES (%s, %s)',
+                       [(f'bench_qr_{i}', waiter_ids[i % len(waiter_ids)]) for i in range(args.spots)])
+    cursor.executemany('INSERT INTO customer (c_phone, c_name) VALUES (%s, %s)',
+                       [(f'9{i:09d}', f'Guest {i}') for i in range(args.customers)])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def query(conn, sql, params=()):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def customer_user(base_url, recorder, db_config, phone, stop):
+    client = Client(base_url, recorder)
+    conn = mysql.connector.connect(autocommit=True, **db_config)
+    rng = random.Random(phone)
+    try:
+        while not stop.is_set():
+            status, _ = client.request('customer_login', '/customer/login', form={'phone': phone})
+            if status != 302:
+                # Waiting room: try again shortly
+                stop.wait(1)
+                continue
+            for _ in range(rng.randint(1, 3)):
+                client.request('menu', '/menu')
+            cart = [{'id': item_id, 'quantity': rng.randint(1, 3)}
+                    for item_id in rng.sample(range(1, len(MENU) + 1), rng.randint(1, 5))]
+            status, body = client.json('place_order_final', '/place_order_final', {'items': cart})
+            order_id = body.get('order_id')
+            if not order_id:
+                continue
+            while not stop.is_set():
+                client.request('customer_dashboard', '/customer/dashboard')
+                lines = query(conn, 'SELECT order_status FROM order_details WHERE order_id = %s', (order_id,))
+                if lines and all(line['order_status'] == 'delivered' for line in lines):
+                    break
+                stop.wait(1)
+            client.json('request_bill', '/request_bill', {'order_id': order_id})
+            while not stop.is_set():
+                if query(conn, 'SELECT paid_status FROM orders WHERE order_id = %s AND paid_status = 1',
+                         (order_id,)):
+                    break
+                stop.wait(0.5)
+            client.request('logout', '/logout')
+    finally:
+        conn.close()
+
+
+def chef_user(base_url, recorder, db_config, phone, cook_scale, stop):
+    client = Client(base_url, recorder)
+    conn = mysql.connector.connect(autocommit=True, **db_config)
+    try:
+        client.request('employee_login', '/employee/login', form={'phone': phone, 'password': 'chef'})
+        chef_id = query(conn, 'SELECT c.chef_id FROM chef c JOIN employee e ON c.emp_id = e.emp_id '
+                              'WHERE e.e_phone = %s', (phone,))[0]['chef_id']
+        while not stop.is_set():
+            client.request('chef_dashboard', '/chef/dashboard')
+            lines = query(conn, """
+                SELECT od.order_id, od.item_id, od.qty, m.prep_time
+                FROM order_details od JOIN menu m ON od.item_id = m.item_id
+                WHERE od.chef_id = %s AND od.order_status = 'placed'
+                ORDER BY od.order_id
+            """, (chef_id,))
+            if not lines:
+                stop.wait(0.5)
+                continue
+            for line in lines:
+                stop.wait(line['prep_time'] * line['qty'] * cook_scale)
+                client.json('chef_mark_cooked', '/chef/mark_cooked',
+                            {'order_id': line['order_id'], 'item_id': line['item_id']})
+    finally:
+        conn.close()
+
+
+def waiter_user(base_url, recorder, db_config, phone, stop):
+    client = Client(base_url, recorder)
+    conn = mysql.connector.connect(autocommit=True, **db_config)
+    try:
+        client.request('employee_login', '/employee/login', form={'phone': phone, 'password': 'waiter'})
+        waiter_id = query(conn, 'SELECT w.waiter_id FROM waiter w JOIN employee e ON w.emp_id = e.emp_id '
+                                'WHERE e.e_phone = %s', (phone,))[0]['waiter_id']
+        while not stop.is_set():
+            client.request('waiter_dashboard', '/waiter/dashboard')
+            cooked = query(conn, """
+                SELECT od.order_id, od.item_id
+                FROM order_details od
+                JOIN orders o ON od.order_id = o.order_id
+                JOIN spots s ON o.cust_id = s.cust_id
+                WHERE s.waiter_id = %s AND od.order_status = 'cooked'
+            """, (waiter_id,))
+            for line in cooked:
+                client.json('update_order_status', '/update_order_status',
+                            {'order_id': line['order_id'], 'item_id': line['item_id'], 'status': 'delivered'})
+            requested = query(conn, """
+                SELECT o.order_id
+                FROM orders o
+                JOIN spots s ON o.cust_id = s.cust_id
+                WHERE s.waiter_id = %s AND o.bill_status = 'requested' AND o.paid_status = 0
+            """, (waiter_id,))
+            for order in requested:
+                client.json('approve_bill', '/waiter/approve_bill', {'order_id': order['order_id']})
+            if not cooked and not requested:
+                stop.wait(0.5)
+    finally:
+        conn.close()
+
+
+def admin_user(base_url, recorder, stop):
+    client = Client(base_url, recorder)
+    client.request('employee_login', '/employee/login', form={'phone': '7000000000', 'password': 'admin'})
+    while not stop.is_set():
+        client.request('admin_reports', '/admin/reports')
+        stop.wait(2)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args, db_config):
+    create_schema(db_config)
+    seed(db_config, args)
+
+    # The app reads its database settings from the environment at import time
+    os.environ.update({
+        'DB_HOST': db_config['host'], 'DB_PORT': str(db_config['port']),
+        'DB_USER': db_config['user'], 'DB_PASSWORD': db_config['password'],
+        'DB_NAME': db_config['database'],
+    })
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+
+    port = free_port()
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{port}'
+
+    recorder = Recorder()
+    stop = threading.Event()
+    users = []
+    for i in range(args.chefs):
+        users.append(threading.Thread(target=chef_user, args=(base_url, recorder, db_config, f'71{i:08d}',
+                                                               args.cook_scale, stop)))
+    for i in range(args.waiters):
+        users.append(threading.Thread(target=waiter_user, args=(base_url, recorder, db_config, f'72{i:08d}', stop)))
+    users.append(threading.Thread(target=admin_user, args=(base_url, recorder, stop)))
+    for i in range(args.customers):
+        users.append(threading.Thread(target=customer_user, args=(base_url, recorder, db_config, f'9{i:09d}', stop)))
+
+    started = time.monotonic()
+    for user in users:
+        user.daemon = True
+        user.start()
+    time.sleep(args.duration)
+    stop.set()
+    for user in users:
+        user.join(timeout=30)
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'duration': elapsed,
+        'config': {key: getattr(args, key) for key in
+                   ('customers', 'chefs', 'waiters', 'spots', 'cook_scale', 'duration')},
+        'endpoints': recorder.summary(elapsed),
+    }
+
+
+def print_report(result):
+    print(f"commit {result['commit']}  {result['timestamp']}  {result['duration']:.0f}s")
+    print(f"{'endpoint':<22} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"{endpoint:<22} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+
+def compare(base_path, new_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{base['commit']} -> {new['commit']}")
+    print(f"{'endpoint':<22} {'req/s':>16} {'p95 ms':>18}")
+    for endpoint in sorted(set(base['endpoints']) | set(new['endpoints'])):
+        old = base['endpoints'].get(endpoint)
+        cur = new['endpoints'].get(endpoint)
+        if not old or not cur:
+            print(f"{endpoint:<22} {'only in ' + ('new' if cur else 'base'):>16}")
+            continue
+        print(f"{endpoint:<22} {old['throughput']:>7.1f} -> {cur['throughput']:<7.1f}"
+              f"{old['p95_ms']:>8.1f} -> {cur['p95_ms']:<8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--customers', type=int, default=30)
+    parser.add_argument('--chefs', type=int, default=4)
+    parser.add_argument('--waiters', type=int, default=3)
+    parser.add_argument('--spots', type=int, default=20)
+    parser.add_argument('--cook-scale', type=float, default=0.02,
+                        help='seconds of simulated cooking per prep_time minute')
+    parser.add_argument('--db-host', help='use an existing MySQL server instead of a throwaway mysqld')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='restaurant_bench')
+    parser.add_argument('--output', help='where to write the JSON results')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.db_host:
+        if args.db_name == 'restaurant_db':
+            sys.exit('Refusing to benchmark against restaurant_db; use a scratch database')
+        db_config = {'host': args.db_host, 'port': args.db_port, 'user': args.db_user,
+                     'password': args.db_password, 'database': args.db_name}
+        conn = mysql.connector.connect(**{k: v for k, v in db_config.items() if k != 'database'})
+        cursor = conn.cursor()
+        cursor.execute(f'DROP DATABASE IF EXISTS {args.db_name}')
+        cursor.execute(f'CREATE DATABASE {args.db_name}')
+        cursor.close()
+        conn.close()
+        result = run(args, db_config)
+    else:
+        with LocalMySQL(args.db_name) as server:
+            result = run(args, server.db_config)
+
+    print_report(result)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{result['timestamp'].replace(':', '')}-{result['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
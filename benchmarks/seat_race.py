@@ -0,0 +1,125 @@
+"""Hammer customer_login in parallel and check nobody is double-seated.
+
+More customers than spots log in at the same moment. Every customer whose
+login reaches the menu must own exactly one occupied spot, no spot may be
+given to two customers, and no customer may hold a spot without having
+been seated. Exits non-zero if any of that fails. Runs against a throwaway
+mysqld by default, or a scratch SQLite file with --engine sqlite; the
+output names the engine checked.
+
+    python benchmarks/seat_race.py --customers 200 --spots 40
+    python benchmarks/seat_race.py --engine sqlite
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from benchmarks.local_mysql import LocalMySQL, create_schema, free_port  # noqa: E402
+from benchmarks.rush_hour import Client, Recorder, seed  # noqa: E402
+
+
+def race(db_config, args):
+    args.chefs, args.waiters = 1, 1
+    seed(db_config, args)
+
+    if db_config.get('engine') == 'sqlite':
+        os.environ.update({'DB_ENGINE': 'sqlite', 'SQLITE_PATH': db_config['path']})
+    else:
+        os.environ.update({
+            'DB_HOST': db_config['host'], 'DB_PORT': str(db_config['port']),
+            'DB_USER': db_config['user'], 'DB_PASSWORD': db_config['password'],
+            'DB_NAME': db_config['database'],
+        })
+    os.environ['DB_POOL_SIZE'] = str(args.threads)
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+
+    port = free_port()
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{port}'
+
+    recorder = Recorder()
+    seated = []
+    barrier = threading.Barrier(args.customers)
+
+    def login(phone):
+        client = Client(base_url, recorder)
+        barrier.wait()
+        status, _ = client.request('customer_login', '/customer/login', form={'phone': phone})
+        # Errors redirect back to the login page too; only a seated customer gets the menu
+        if status == 302 and client.request('menu', '/menu')[0] == 200:
+            seated.append(phone)
+
+    threads = [threading.Thread(target=login, args=(f'9{i:09d}',)) for i in range(args.customers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    conn = db.connect(db_config)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT c.c_phone, COUNT(*)
+        FROM spots s
+        JOIN customer c ON c.cust_id = s.cust_id
+        WHERE s.availability = 0
+        GROUP BY c.c_phone
+    """)
+    spots_held = dict(cursor.fetchall())
+    cursor.execute('SELECT COUNT(*) FROM spots WHERE availability = 0 AND cust_id IS NOT NULL')
+    occupied = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+
+    engine = db_config.get('engine', 'mysql')
+    print(f'{engine}: {len(seated)} customers seated, {occupied} spots occupied, {args.spots} spots total')
+    stats = recorder.summary(1)['customer_login']
+    print(f"customer_login p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  errors {stats['errors']}")
+    problems = []
+    if len(set(seated)) != len(seated):
+        problems.append('a customer was seated twice')
+    if occupied > args.spots:
+        problems.append(f'{occupied} spots occupied out of {args.spots}')
+    problems.extend(f'{phone} holds {count} spots' for phone, count in spots_held.items() if count > 1)
+    problems.extend(f'{phone} was seated but holds no spot' for phone in set(seated) - set(spots_held))
+    problems.extend(f'{phone} holds a spot but was not seated' for phone in set(spots_held) - set(seated))
+    if problems:
+        for problem in problems:
+            print(problem)
+        sys.exit(f'{engine}: double seating detected')
+    print(f'{engine}: no double seating')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--spots', type=int, default=40)
+    parser.add_argument('--threads', type=int, default=20, help='database pool size for the app')
+    parser.add_argument('--engine', choices=['mysql', 'sqlite'], default='mysql')
+    args = parser.parse_args()
+
+    if args.engine == 'sqlite':
+        with tempfile.TemporaryDirectory() as workdir:
+            db_config = {'engine': 'sqlite', 'path': os.path.join(workdir, 'seat_race.sqlite3')}
+            conn = db.connect(db_config)
+            db.create_sqlite_schema(conn, sample_data=False)
+            conn.close()
+            race(db_config, args)
+        return
+
+    with LocalMySQL() as server:
+        create_schema(server.db_config)
+        race(server.db_config, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Throughput of serve.py against the development server, and what a SIGTERM costs in flight.
+
+Both servers run the app on the same scratch SQLite database, seeded like
+login_storm.py. Logged-in customers, waiters and chefs each request their
+own page back to back (/menu, /customer/dashboard, /waiter/dashboard,
+/chef/queue) for --duration seconds. Each setup prints requests per second
+and p50/p95/p99 latency:
+  dev           what `python app.py` runs: Flask's threaded development
+                server with the debugger on (without the reloader)
+  serve N       python serve.py --workers N --threads T (--threads)
+
+With --drain, every serve.py run then sends SIGTERM to the master while
+the load keeps going and a chef holds an event stream open. It reports how
+many requests failed (a 5xx or a cut-off reply) and how many were turned
+away (refused, or reset before any reply because they were still queued
+when the server closed its socket; a load balancer would retry those on
+another server), and how long the stream and the server took to stop.
+
+    python benchmarks/serve_throughput.py --users 16 --workers 1 2 4 --drain
+"""
+import argparse
+import http.client
+import http.cookiejar
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.local_mysql import free_port  # noqa: E402
+from benchmarks.login_storm import seed  # noqa: E402
+from benchmarks.rush_hour import NoRedirect  # noqa: E402
+
+CUSTOMERS, WAITERS, CHEFS = 40, 3, 3
+
+
+class Load:
+    def __init__(self):
+        self.latencies = []
+        self.failed = 0
+        self.turned_away = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds=None, failed=False, turned_away=False):
+        with self._lock:
+            if seconds is not None:
+                self.latencies.append(seconds)
+            self.failed += failed
+            self.turned_away += turned_away
+
+
+class User:
+    def __init__(self, port, n):
+        self.port = port
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+        # Mostly customers, as in the dining room
+        kind = n % 8
+        if kind == 0:
+            self.login = ('/employee/login', {'phone': f'72{n % WAITERS:08d}', 'password': 'waiter'})
+            self.pages = ['/waiter/dashboard']
+        elif kind == 1:
+            self.login = ('/employee/login', {'phone': f'71{n % CHEFS:08d}', 'password': 'chef'})
+            self.pages = ['/chef/queue']
+        else:
+            self.login = ('/customer/login', {'phone': f'9{n % CUSTOMERS:09d}'})
+            self.pages = ['/menu', '/menu', '/customer/dashboard']
+
+    def open(self, path, form=None):
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        request = urllib.request.Request(f'http://127.0.0.1:{self.port}{path}', data=data)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def run(self, load, stop):
+        self.open(*self.login)
+        n = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                status = self.open(self.pages[n % len(self.pages)])
+                load.record(time.perf_counter() - started, failed=status >= 500)
+            except urllib.error.URLError as e:
+                turned_away = isinstance(e.reason, ConnectionError)
+                load.record(failed=not turned_away, turned_away=turned_away)
+                stop.wait(0.05)
+            except ConnectionResetError:
+                # No reply at all: the connection was never accepted
+                load.record(turned_away=True)
+            except (OSError, http.client.HTTPException):
+                load.record(failed=True)
+            n += 1
+
+
+def wait_until_up(port, process):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/db_pool', timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start')
+
+
+def start(setup, port, env, threads):
+    if setup == 'dev':
+        command = [sys.executable, os.path.abspath(__file__), '--dev', str(port)]
+    else:
+        command = [sys.executable, os.path.join(ROOT, 'serve.py'), '--workers', setup.split()[1],
+                   '--threads', str(threads), '--bind', f'127.0.0.1:{port}']
+    process = subprocess.Popen(command, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_up(port, process)
+    return process
+
+
+def stream_until_closed(port, opened):
+    user = User(port, 1)
+    user.open(*user.login)
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/events/chef')
+    try:
+        with user.opener.open(request, timeout=120) as response:
+            opened.set()
+            while response.readline():
+                pass
+    except (OSError, http.client.HTTPException):
+        pass
+    return time.monotonic()
+
+
+def run(setup, args, env):
+    port = free_port()
+    process = start(setup, port, env, args.threads)
+    load = Load()
+    stop = threading.Event()
+    users = [User(port, n) for n in range(args.users)]
+    threads = [threading.Thread(target=user.run, args=(load, stop), daemon=True) for user in users]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(1)
+        load.latencies.clear()
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        samples, elapsed = list(load.latencies), time.perf_counter() - started
+        drain = None
+        if args.drain and setup != 'dev':
+            drain = measure_drain(port, process, load)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=30)
+        if process.poll() is None:
+            process.terminate()
+            process.wait(timeout=60)
+    return samples, elapsed, drain
+
+
+def measure_drain(port, process, load):
+    opened = threading.Event()
+    stream_closed = []
+    stream = threading.Thread(target=lambda: stream_closed.append(stream_until_closed(port, opened)), daemon=True)
+    stream.start()
+    opened.wait(10)
+    time.sleep(0.5)
+    failed_before, turned_away_before = load.failed, load.turned_away
+    signalled = time.monotonic()
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=120)
+    stopped = time.monotonic()
+    stream.join(timeout=5)
+    return {
+        'failed': load.failed - failed_before,
+        'turned_away': load.turned_away - turned_away_before,
+        'stream_s': (stream_closed[0] - signalled) if stream_closed else None,
+        'stop_s': stopped - signalled,
+    }
+
+
+def pct(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000 if ordered else 0.0
+
+
+def serve_dev(port):
+    from app import create_app
+
+    create_app().run(host='127.0.0.1', port=port, debug=True, use_reloader=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=16, help='concurrent users, each waiting for its last reply')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='serve.py worker counts to try')
+    parser.add_argument('--threads', type=int, default=5)
+    parser.add_argument('--drain', action='store_true', help='SIGTERM each serve.py run under load')
+    parser.add_argument('--dev', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.dev:
+        serve_dev(args.dev)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'throughput.sqlite3')
+        seed(database, CUSTOMERS, WAITERS, CHEFS)
+        env = dict(os.environ, DB_ENGINE='sqlite', SQLITE_PATH=database, SESSION_STORE='file',
+                   SESSION_DIR=os.path.join(workdir, 'sessions'), SECRET_KEY_FILE=os.path.join(workdir, 'secret_key'))
+        print(f"{'server':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}   drain")
+        for setup in ['dev'] + [f'serve {workers}' for workers in args.workers]:
+            samples, elapsed, drain = run(setup, args, env)
+            line = (f'{setup:<10} {len(samples) / elapsed:>8.1f} {pct(samples, 50):>8.1f} {pct(samples, 95):>8.1f} '
+                    f'{pct(samples, 99):>8.1f}')
+            if drain:
+                stream = f"{drain['stream_s']:.1f}s" if drain['stream_s'] is not None else 'not closed'
+                line += (f"   {drain['failed']} failed, {drain['turned_away']} turned away, stream ended after {stream}, "
+                         f"stopped after {drain['stop_s']:.1f}s")
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
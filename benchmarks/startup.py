@@ -0,0 +1,116 @@
+"""Worker start-up cost of the full app versus apps that load only one role's blueprints.
+
+Each sample is a fresh Python process against a scratch SQLite database
+seeded with the sample data. It times:
+  import        importing app and the blueprints it loads, plus create_app()
+  login         the first request (opens the first pooled connection)
+  first page    the role's page the first time (compiles its templates)
+  warm page     the same page again
+and records how many modules were imported and the peak RSS.
+
+A pre-fork server that imports the app before forking (gunicorn --preload)
+pays the import once in the master; every worker still pays the login and
+first-page costs. Without preloading each worker pays all of them.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Sample-data logins from schema_sqlite.sql
+PROBES = {
+    'customer': ('/customer/login', {'phone': '9876543210'}, '/menu'),
+    'waiter': ('/employee/login', {'phone': '9876543214', 'password': 'waiter123'}, '/waiter/dashboard'),
+    'chef': ('/employee/login', {'phone': '9876543213', 'password': 'chef123'}, '/chef/dashboard'),
+    'admin': ('/employee/login', {'phone': '9876543212', 'password': 'admin123'}, '/admin/dashboard'),
+}
+# (blueprints loaded, probe); each narrowed app is compared with the full one on the same page
+CONFIGS = [
+    ('all', 'customer'), ('customer,billing', 'customer'),
+    ('all', 'waiter'), ('waiter,billing', 'waiter'),
+    ('all', 'chef'), ('chef', 'chef'),
+    ('all', 'admin'), ('admin', 'admin'),
+]
+
+
+def child(roles, probe):
+    started = time.perf_counter()
+    from app import create_app
+
+    app = create_app(roles)
+    imported = time.perf_counter()
+
+    login_path, form, page = PROBES[probe]
+    client = app.test_client()
+    response = client.post(login_path, data=form)
+    assert response.status_code == 302, (login_path, response.status_code)
+    logged_in = time.perf_counter()
+    response = client.get(page)
+    assert response.status_code == 200, (page, response.status_code)
+    first_page = time.perf_counter()
+    client.get(page)
+    warm_page = time.perf_counter()
+    return {
+        'import': imported - started,
+        'login': logged_in - imported,
+        'first_page': first_page - logged_in,
+        'warm_page': warm_page - first_page,
+        'modules': len(sys.modules),
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def sample(roles, probe, database):
+    env = dict(os.environ, DB_ENGINE='sqlite', SQLITE_PATH=database, SESSION_STORE='memory')
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', roles, probe],
+                            env=env, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f'{roles} / {probe} failed:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per configuration')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return
+
+    import db
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'startup.sqlite3')
+        conn = db.connect({'engine': 'sqlite', 'path': database})
+        db.create_sqlite_schema(conn, sample_data=True)
+        conn.close()
+        # One throwaway start so the first configuration is not charged for a cold disk cache
+        sample('all', 'chef', database)
+
+        print(f"{'blueprints':<18} {'page':<9} {'import ms':>10} {'login ms':>9} {'1st page':>9} "
+              f"{'warm ms':>8} {'modules':>8} {'RSS MB':>7}")
+        for roles, probe in CONFIGS:
+            runs = [sample(roles, probe, database) for _ in range(args.runs)]
+
+            def median(key):
+                return statistics.median(run[key] for run in runs)
+
+            print(f"{roles:<18} {probe:<9} {median('import') * 1000:>10.1f} {median('login') * 1000:>9.1f} "
+                  f"{median('first_page') * 1000:>9.1f} {median('warm_page') * 1000:>8.1f} "
+                  f"{median('modules'):>8.0f} {median('rss_mb'):>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
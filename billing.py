@@ -0,0 +1,121 @@
+"""Bill pricing shared by every place that shows or settles a bill.
+
+quote_bill() reads everything a bill depends on in one aggregated query:
+the order's subtotal at the prices captured when each line was ordered, its
+delivered line count, the customer's loyalty balance and the rates in
+`settings`. price_bill() turns those into Decimal amounts rounded half-up to
+the paisa, so the bill page, online payment and waiter approval always agree.
+"""
+from decimal import Decimal, ROUND_FLOOR, ROUND_HALF_UP
+
+from db import dialect_of
+
+CENTS = Decimal('0.01')
+
+
+class BillSettings:
+    """Rates from the `settings` row; tax_rate is a percentage as the admin enters it."""
+
+    def __init__(self, tax_rate=Decimal('18'), points_per_rupee=Decimal('0.1'),
+                 rupee_per_point=Decimal('1'), min_points_redemption=100):
+        self.tax_rate = Decimal(str(tax_rate))
+        self.points_per_rupee = Decimal(str(points_per_rupee))
+        self.rupee_per_point = Decimal(str(rupee_per_point))
+        self.min_points_redemption = int(min_points_redemption)
+
+
+class Bill:
+    def __init__(self, subtotal, discount, tax, total, points_redeemed, points_earned, settings):
+        self.subtotal = subtotal
+        self.discount = discount
+        self.tax = tax
+        self.total = total
+        self.points_redeemed = points_redeemed
+        self.points_earned = points_earned
+        self.settings = settings
+        self.order_id = None
+        self.cust_id = None
+        self.lines = 0
+        self.delivered = 0
+        self.points_available = 0
+
+    @property
+    def all_delivered(self):
+        return self.lines > 0 and self.delivered == self.lines
+
+    def summary(self):
+        return {
+            'total': float(self.subtotal),
+            'discount': float(self.discount),
+            'tax': float(self.tax),
+            'final_amount': float(self.total),
+            'points_redeemed': self.points_redeemed,
+            'points_earned': self.points_earned
+        }
+
+
+def price_bill(subtotal, settings, points_available=0, redeem_points=0):
+    """Apply loyalty redemption, then tax, to a subtotal; every amount is in whole paise.
+
+    Points are only redeemed when at least min_points_redemption are used,
+    never more than the customer holds, and never for more than the subtotal.
+    The customer earns points_per_rupee points per rupee of the final amount.
+    """
+    subtotal = Decimal(str(subtotal)).quantize(CENTS, rounding=ROUND_HALF_UP)
+    redeem = max(0, min(int(redeem_points or 0), int(points_available or 0)))
+    if settings.rupee_per_point > 0:
+        redeem = min(redeem, int((subtotal / settings.rupee_per_point).to_integral_value(rounding=ROUND_FLOOR)))
+    else:
+        redeem = 0
+    if redeem < settings.min_points_redemption:
+        redeem = 0
+    discount = (redeem * settings.rupee_per_point).quantize(CENTS, rounding=ROUND_HALF_UP)
+    taxable = subtotal - discount
+    tax = (taxable * settings.tax_rate / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+    total = taxable + tax
+    points_earned = int((total * settings.points_per_rupee).to_integral_value(rounding=ROUND_FLOOR))
+    return Bill(subtotal, discount, tax, total, redeem, points_earned, settings)
+
+
+def quote_bill(cursor, order_id, redeem_points=None, lock=False):
+    """Price an order from one query; None if it does not exist.
+
+    redeem_points defaults to what the customer asked for when requesting the
+    bill. With lock=True the order, its lines and the customer are locked
+    FOR UPDATE so the bill can be settled in the same transaction; the
+    settings row is read in a subquery and stays unlocked.
+    """
+    cursor.execute(f"""
+        SELECT o.order_id, o.cust_id, o.redeem_points, c.loyal_pts,
+               COUNT(od.item_id) AS line_count,
+               COALESCE(SUM(od.order_status = 'delivered'), 0) AS delivered,
+               COALESCE(SUM(od.unit_price * od.qty), 0) AS subtotal,
+               st.tax_rate, st.points_per_rupee, st.rupee_per_point, st.min_points_redemption
+        FROM orders o
+        JOIN customer c ON c.cust_id = o.cust_id
+        LEFT JOIN order_details od ON od.order_id = o.order_id
+        LEFT JOIN (
+            SELECT tax_rate, points_per_rupee, rupee_per_point, min_points_redemption
+            FROM settings ORDER BY setting_id LIMIT 1
+        ) st ON TRUE
+        WHERE o.order_id = %s
+        GROUP BY o.order_id, o.cust_id, o.redeem_points, c.loyal_pts,
+                 st.tax_rate, st.points_per_rupee, st.rupee_per_point, st.min_points_redemption
+        {dialect_of(cursor).for_update() if lock else ''}
+    """, (order_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if row['tax_rate'] is None:
+        settings = BillSettings()
+    else:
+        settings = BillSettings(row['tax_rate'], row['points_per_rupee'], row['rupee_per_point'],
+                                row['min_points_redemption'])
+    bill = price_bill(row['subtotal'], settings, row['loyal_pts'],
+                      row['redeem_points'] if redeem_points is None else redeem_points)
+    bill.order_id = row['order_id']
+    bill.cust_id = row['cust_id']
+    bill.lines = row['line_count']
+    bill.delivered = int(row['delivered'])
+    bill.points_available = row['loyal_pts'] or 0
+    return bill
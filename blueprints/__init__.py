@@ -0,0 +1,110 @@
+"""Per-role Blueprints, imported only by apps that serve them.
+
+`main` (landing page, logins, health checks) is always loaded. The role
+blueprints are customer, waiter, chef, admin and billing; a kitchen display
+worker built with create_app('chef') never imports the admin reports,
+exports or billing code.
+"""
+import importlib
+import threading
+
+from flask import current_app, has_request_context, request
+from werkzeug.routing import Map, Rule
+
+ROLE_BLUEPRINTS = ('customer', 'waiter', 'chef', 'admin', 'billing')
+
+# (rule, endpoint, methods) of every role route, so an app can link to a
+# role it does not serve without importing that role's module.
+# check_routes() fails create_app() if a loaded blueprint disagrees.
+ROUTES = {
+    'customer': [
+        ('/customer/dashboard', 'customer.customer_dashboard', ('GET',)),
+        ('/events/order/<int:order_id>', 'customer.order_events', ('GET',)),
+        ('/menu', 'customer.menu', ('GET',)),
+        ('/place_order_final', 'customer.place_order_final', ('POST',)),
+        ('/place_order_new', 'customer.place_order_new', ('POST',)),
+        ('/place_order_simple', 'customer.place_order_simple', ('POST',)),
+        ('/remove_order_item', 'customer.remove_order_item', ('POST',)),
+    ],
+    'waiter': [
+        ('/events/waiter', 'waiter.waiter_events', ('GET',)),
+        ('/update_order_status', 'waiter.update_order_status', ('POST',)),
+        ('/waiter/bulk_status', 'waiter.waiter_bulk_status', ('POST',)),
+        ('/waiter/dashboard', 'waiter.waiter_dashboard', ('GET',)),
+        ('/waiter/spot/<int:table_id>', 'waiter.waiter_spot_details', ('GET',)),
+    ],
+    'chef': [
+        ('/chef/bulk_status', 'chef.chef_bulk_status', ('POST',)),
+        ('/chef/dashboard', 'chef.chef_dashboard', ('GET',)),
+        ('/chef/manage_menu', 'chef.chef_manage_menu', ('GET',)),
+        ('/chef/mark_cooked', 'chef.chef_mark_cooked', ('POST',)),
+        ('/chef/queue', 'chef.chef_queue', ('GET',)),
+        ('/chef/toggle_menu_item', 'chef.chef_toggle_menu_item', ('POST',)),
+        ('/events/chef', 'chef.chef_events', ('GET',)),
+    ],
+    'admin': [
+        ('/admin/add_employee', 'admin.admin_add_employee', ('GET', 'POST')),
+        ('/admin/add_menu_item', 'admin.admin_add_menu_item', ('POST',)),
+        ('/admin/dashboard', 'admin.admin_dashboard', ('GET',)),
+        ('/admin/edit_menu_item/<int:item_id>', 'admin.admin_edit_menu_item', ('GET', 'POST')),
+        ('/admin/employee_details', 'admin.admin_employee_details', ('GET',)),
+        ('/admin/export/<dataset>', 'admin.admin_export', ('GET',)),
+        ('/admin/manage_menu', 'admin.admin_manage_menu', ('GET',)),
+        ('/admin/reports', 'admin.admin_reports', ('GET',)),
+        ('/admin/reports/api', 'admin.admin_reports_api', ('GET',)),
+        ('/admin/reports/lifecycle', 'admin.admin_reports_lifecycle', ('GET',)),
+        ('/admin/settings', 'admin.admin_settings', ('GET',)),
+        ('/admin/toggle_employee_status', 'admin.admin_toggle_employee_status', ('POST',)),
+        ('/admin/toggle_menu_item', 'admin.admin_toggle_menu_item', ('POST',)),
+        ('/admin/update_loyalty_settings', 'admin.admin_update_loyalty_settings', ('POST',)),
+        ('/admin/update_system_settings', 'admin.admin_update_system_settings', ('POST',)),
+        ('/admin/update_table_settings', 'admin.admin_update_table_settings', ('POST',)),
+        ('/admin/update_tax_settings', 'admin.admin_update_tax_settings', ('POST',)),
+    ],
+    'billing': [
+        ('/close_order', 'billing.close_order', ('POST',)),
+        ('/customer/bill/<int:order_id>', 'billing.customer_bill', ('GET',)),
+        ('/generate_bill', 'billing.generate_bill', ('POST',)),
+        ('/request_bill', 'billing.request_bill', ('POST',)),
+        ('/waiter/approve_bill', 'billing.approve_bill', ('POST',)),
+    ],
+}
+
+_url_maps = {}
+_lock = threading.Lock()
+
+
+def load(name):
+    return importlib.import_module(f'blueprints.{name}').bp
+
+
+def check_routes(app, name):
+    served = {(rule.rule, rule.endpoint, tuple(sorted(rule.methods - {'HEAD', 'OPTIONS'})))
+              for rule in app.url_map.iter_rules() if rule.endpoint.startswith(f'{name}.')}
+    if served != set(ROUTES[name]):
+        raise RuntimeError(f'blueprints.ROUTES is out of date for {name}: '
+                           f'{sorted(served ^ set(ROUTES[name]))}')
+
+
+def _url_map(name):
+    with _lock:
+        if name not in _url_maps:
+            _url_maps[name] = Map([Rule(rule, endpoint=endpoint, methods=methods)
+                                   for rule, endpoint, methods in ROUTES[name]])
+        return _url_maps[name]
+
+
+def build_unloaded_url(error, endpoint, values):
+    """url_build_error_handlers hook: links and redirects to a blueprint this app
+    does not serve still point at its URL, which another worker serves."""
+    name = endpoint.partition('.')[0]
+    if name not in ROLE_BLUEPRINTS or name in current_app.blueprints:
+        return None
+    url_map = _url_map(name)
+    if has_request_context():
+        adapter = url_map.bind(request.host, script_name=request.script_root, url_scheme=request.scheme)
+    else:
+        adapter = url_map.bind(current_app.config['SERVER_NAME'] or 'localhost',
+                               url_scheme=current_app.config['PREFERRED_URL_SCHEME'])
+    return adapter.build(endpoint, {key: value for key, value in values.items() if not key.startswith('_')},
+                         force_external=bool(values.get('_external')))
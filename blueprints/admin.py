@@ -0,0 +1,531 @@
+"""Admin dashboard: employees, menu, settings, reports and exports."""
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, Response
+from mysql.connector import Error
+from datetime import datetime, timedelta
+from repositories import BillRepository, EmployeeRepository, MenuRepository, OrderRepository
+from analytics import sales_extract_from_env, GRANULARITIES
+from lifecycle import GROUPINGS as LIFECYCLE_GROUPINGS, line_timelines, stage_latency
+from export import DATASETS as EXPORT_DATASETS, FORMATS as EXPORT_FORMATS, date_range, encode, export_rows, gzip_chunks
+from blueprints.common import chef_scheduler, db_pool, get_db_connection, get_menu_snapshot, identity_cache, menu_cache
+
+bp = Blueprint('admin', __name__)
+
+# Columnar copy of paid bills behind /admin/reports/api
+sales_extract = sales_extract_from_env()
+
+@bp.route('/admin/dashboard')
+def admin_dashboard():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect(url_for('main.employee_login'))
+    
+    conn = get_db_connection()
+    if not conn:
+        flash('Database connection error', 'danger')
+        return redirect(url_for('main.employee_login'))
+        
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get employee counts
+        employee_counts = EmployeeRepository(cursor).counts_by_role()
+        
+        # Get recent orders
+        recent_orders = OrderRepository(cursor).recent_lines(10)
+        
+        return render_template('admin/dashboard.html', 
+                              employee_counts=employee_counts,
+                              recent_orders=recent_orders)
+    except Error as e:
+        flash(f'Database error: {str(e)}', 'danger')
+        return redirect(url_for('main.employee_login'))
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/admin/add_employee', methods=['GET', 'POST'])
+def admin_add_employee():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect(url_for('main.employee_login'))
+    
+    if request.method == 'POST':
+        name = request.form.get('name')
+        phone = request.form.get('phone')
+        role = request.form.get('role')
+        password = request.form.get('password')
+        salary = request.form.get('salary')
+        
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Check if phone number already exists
+            employees = EmployeeRepository(cursor)
+            existing_employee = employees.by_phone(phone)
+            
+            if existing_employee:
+                flash('Phone number already registered.', 'danger')
+                return redirect(url_for('admin.admin_add_employee'))
+            
+            # Insert new employee, with their waiter or chef row
+            emp_id = employees.create(name, phone, role, password, salary)
+            if role in ('waiter', 'chef'):
+                print(f"Added {role} entry for employee {emp_id}")
+            
+            conn.commit()
+            flash('Employee added successfully!', 'success')
+            return redirect(url_for('admin.admin_dashboard'))
+            
+        except Exception as e:
+            conn.rollback()
+            flash(f'Error adding employee: {str(e)}', 'danger')
+            return redirect(url_for('admin.admin_add_employee'))
+        finally:
+            cursor.close()
+            conn.close()
+    
+    return render_template('admin/add_employee.html')
+
+@bp.route('/admin/manage_menu')
+def admin_manage_menu():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect(url_for('main.employee_login'))
+    
+    try:
+        # Get all menu items
+        menu_items = get_menu_snapshot().items
+        
+        return render_template('admin/manage_menu.html', menu_items=menu_items)
+    except Error as e:
+        flash(f'Database error: {str(e)}', 'danger')
+        return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/admin/add_menu_item', methods=['POST'])
+def admin_add_menu_item():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    item_name = request.form.get('item_name')
+    category = request.form.get('category')
+    item_price = float(request.form.get('item_price'))
+    prep_time = int(request.form.get('prep_time'))
+    allergen = request.form.get('allergen')
+    description = request.form.get('description')
+    availability = 1 if request.form.get('availability') else 0
+    image_url = "/static/images/default.jpeg"  # Default image URL
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        MenuRepository(cursor).add(item_name, category, item_price, prep_time, allergen, description, availability,
+                                   image_url)
+        conn.commit()
+        menu_cache.invalidate()
+        flash('Menu item added successfully!', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error adding menu item: {str(e)}', 'error')
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return redirect(url_for('admin.admin_manage_menu'))
+
+@bp.route('/admin/toggle_menu_item', methods=['POST'])
+def admin_toggle_menu_item():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    data = request.get_json()
+    item_id = data.get('item_id')
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        MenuRepository(cursor).toggle(item_id)
+        conn.commit()
+        menu_cache.invalidate()
+        return jsonify({'success': True})
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/admin/edit_menu_item/<int:item_id>', methods=['GET', 'POST'])
+def admin_edit_menu_item(item_id):
+    if not session.get('user_id') or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        menu_items = MenuRepository(cursor)
+        if request.method == 'POST':
+            item_name = request.form.get('item_name')
+            category = request.form.get('category')
+            item_price = float(request.form.get('item_price'))
+            prep_time = int(request.form.get('prep_time'))
+            allergen = request.form.get('allergen')
+            description = request.form.get('description')
+            availability = 1 if request.form.get('availability') else 0
+            
+            menu_items.update(item_id, item_name, category, item_price, prep_time, allergen, description, availability)
+            conn.commit()
+            menu_cache.invalidate()
+            flash('Menu item updated successfully!', 'success')
+            return redirect(url_for('admin.admin_manage_menu'))
+        
+        item = menu_items.get(item_id)
+        if not item:
+            flash('Menu item not found.', 'error')
+            return redirect(url_for('admin.admin_manage_menu'))
+        
+        return render_template('admin/edit_menu_item.html', item=item)
+    except Exception as e:
+        flash(f'Error: {str(e)}', 'error')
+        return redirect(url_for('admin.admin_manage_menu'))
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/admin/reports')
+def admin_reports():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        # Sales for the last 30 days, read from the daily rollups
+        bills = BillRepository(cursor)
+        since = datetime.now().date() - timedelta(days=30)
+        sales_data = bills.sales_since(since)
+        
+        # Get top selling items
+        top_items = bills.top_items_since(since, 5)
+        menu_by_id = get_menu_snapshot().by_id
+        for item in top_items:
+            item['item_name'] = menu_by_id.get(item['item_id'], {}).get('item_name', f"Item #{item['item_id']}")
+        
+        # Get sales by category
+        category_sales = bills.category_sales_since(since)
+        category_total = sum(category['revenue'] for category in category_sales)
+        for category in category_sales:
+            category['percentage'] = category['revenue'] / category_total * 100 if category_total else 0
+
+        return render_template('admin/reports.html', 
+                             sales_data=sales_data,
+                             top_items=top_items,
+                             category_sales=category_sales)
+    except Exception as e:
+        flash(f'Error generating reports: {str(e)}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/admin/reports/api')
+def admin_reports_api():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    
+    try:
+        today = datetime.now().date()
+        end_date = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if 'to' in request.args else today
+        start_date = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if 'from' in request.args
+                      else end_date - timedelta(days=29))
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+    if start_date > end_date:
+        return jsonify({'error': 'from must not be after to'}), 400
+    
+    if sales_extract.needs_refresh():
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Database connection failed'}), 503
+        try:
+            sales_extract.update(conn)
+        except Error as e:
+            # Serve the last extract rather than failing the report
+            print(f"Error refreshing sales extract: {e}")
+    
+    report = sales_extract.report(datetime.combine(start_date, datetime.min.time()),
+                                  datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+                                  granularity, get_menu_snapshot().by_id)
+    report['from'] = start_date.isoformat()
+    report['to'] = end_date.isoformat()
+    return jsonify(report)
+
+@bp.route('/admin/reports/lifecycle')
+def admin_reports_lifecycle():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    by = request.args.get('by', 'item')
+    if by not in LIFECYCLE_GROUPINGS:
+        return jsonify({'error': f"by must be one of {', '.join(LIFECYCLE_GROUPINGS)}"}), 400
+    try:
+        today = datetime.now().date()
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if 'to' in request.args else today
+        start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if 'from' in request.args
+                 else end - timedelta(days=6))
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+    
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        timelines = line_timelines(cursor, start, end)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+    
+    stages = stage_latency(timelines, by)
+    if by == 'item':
+        menu_items = get_menu_snapshot().by_id
+        for rows in stages.values():
+            for row in rows:
+                row['item_name'] = menu_items.get(row['key'], {}).get('item_name', f"Item #{row['key']}")
+    return jsonify({'from': start.isoformat(), 'to': end.isoformat(), 'by': by,
+                    'lines': len(timelines), 'stages': stages})
+
+@bp.route('/admin/export/<dataset>')
+def admin_export(dataset):
+    if not session.get('user_id') or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    export_dataset = EXPORT_DATASETS.get(dataset)
+    if export_dataset is None:
+        return jsonify({'error': f"dataset must be one of {', '.join(sorted(EXPORT_DATASETS))}"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    compress = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+    
+    try:
+        today = datetime.now().date().isoformat()
+        start, end = date_range(request.args.get('from', today), request.args.get('to', today))
+        after = export_dataset.parse_after(request.args['after']) if 'after' in request.args else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        # The stream outlives the request, so it holds its own connection
+        with db_pool.connection() as conn:
+            rows = export_rows(conn, export_dataset, start, end, after)
+            try:
+                chunks = encode(rows, export_dataset, fmt, header=after is None)
+                yield from gzip_chunks(chunks) if compress else chunks
+            finally:
+                # Close the cursor (or flag the connection) before it goes back to the pool
+                rows.close()
+
+    filename = f"{dataset}_{start:%Y%m%d}_{end - timedelta(days=1):%Y%m%d}.{fmt}"
+    headers = {'Content-Disposition': f'attachment; filename={filename}{".gz" if compress else ""}'}
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    return Response(generate(), mimetype=mimetype, headers=headers)
+
+@bp.route('/admin/settings')
+def admin_settings():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect(url_for('main.employee_login'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        settings = BillRepository(cursor).settings()
+        return render_template('admin/settings.html', settings=settings)
+    except Exception as e:
+        flash(f'Error loading settings: {str(e)}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/admin/update_loyalty_settings', methods=['POST'])
+def admin_update_loyalty_settings():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    points_per_rupee = float(request.form.get('points_per_rupee'))
+    rupee_per_point = float(request.form.get('rupee_per_point'))
+    min_points_redemption = int(request.form.get('min_points_redemption'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        BillRepository(cursor).update_settings(points_per_rupee=points_per_rupee, rupee_per_point=rupee_per_point,
+                                               min_points_redemption=min_points_redemption)
+        conn.commit()
+        flash('Loyalty settings updated successfully!', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error updating loyalty settings: {str(e)}', 'error')
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return redirect(url_for('admin.admin_settings'))
+
+@bp.route('/admin/update_tax_settings', methods=['POST'])
+def admin_update_tax_settings():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    tax_rate = float(request.form.get('tax_rate'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        BillRepository(cursor).update_settings(tax_rate=tax_rate)
+        conn.commit()
+        flash('Tax settings updated successfully!', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error updating tax settings: {str(e)}', 'error')
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return redirect(url_for('admin.admin_settings'))
+
+@bp.route('/admin/update_table_settings', methods=['POST'])
+def admin_update_table_settings():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    total_tables = int(request.form.get('total_tables'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        BillRepository(cursor).update_settings(total_tables=total_tables)
+        conn.commit()
+        flash('Table settings updated successfully!', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error updating table settings: {str(e)}', 'error')
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return redirect(url_for('admin.admin_settings'))
+
+@bp.route('/admin/update_system_settings', methods=['POST'])
+def admin_update_system_settings():
+    if not session.get('user_id') or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    restaurant_name = request.form.get('restaurant_name')
+    restaurant_address = request.form.get('restaurant_address')
+    restaurant_phone = request.form.get('restaurant_phone')
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        BillRepository(cursor).update_settings(restaurant_name=restaurant_name, restaurant_address=restaurant_address,
+                                               restaurant_phone=restaurant_phone)
+        conn.commit()
+        flash('System settings updated successfully!', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error updating system settings: {str(e)}', 'error')
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return redirect(url_for('admin.admin_settings'))
+
+@bp.route('/admin/employee_details')
+def admin_employee_details():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        flash('Please login as admin to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get all employees with correct column names based on the actual schema
+        employees = EmployeeRepository(cursor).directory()
+        cursor.close()
+        conn.close()
+        
+        return render_template('admin/employee_details.html', employees=employees)
+        
+    except Exception as e:
+        print(f"Error in admin_employee_details: {str(e)}")  # Add logging
+        flash('Error retrieving employee details. Please try again.', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/admin/toggle_employee_status', methods=['POST'])
+def admin_toggle_employee_status():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': 'Unauthorized access'})
+    
+    try:
+        data = request.get_json()
+        employee_id = data.get('employee_id')
+        
+        if not employee_id:
+            return jsonify({'success': False, 'error': 'Employee ID is required'})
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get current status
+        employees = EmployeeRepository(cursor)
+        employee = employees.status(employee_id)
+        
+        if not employee:
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'error': 'Employee not found'})
+        
+        # Toggle status between 'active' and 'inactive'
+        new_status = 'inactive' if employee['e_status'] == 'active' else 'active'
+        
+        # Update the status
+        employees.set_status(employee_id, new_status)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        # Inactive chefs must stop receiving new lines
+        chef_scheduler.invalidate()
+        identity_cache.invalidate_employee(int(employee_id))
+
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        print(f"Error in toggle_employee_status: {str(e)}")  # Add logging
+        return jsonify({'success': False, 'error': str(e)})
@@ -0,0 +1,266 @@
+"""Bills: customers request and pay them, waiters approve them and close orders."""
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
+from mysql.connector import Error
+from sales_rollup import order_lines, record_sale
+from billing import quote_bill
+from repositories import BillRepository, CustomerRepository, OrderRepository, SpotRepository
+from lifecycle import apply_transition, lock_lines
+from blueprints.common import current_identity, get_db_connection, hand_off_spot, kitchen_queue, publish_order_event
+
+bp = Blueprint('billing', __name__)
+
+def settle_bill(cursor, order_data, bill, pay_mode, waiter_id):
+    """Record a priced bill and close its order inside the caller's transaction.
+    
+    order_data needs order_id, cust_id, order_date and table_id. Returns an
+    error message, with nothing written, if a line is not delivered yet.
+    """
+    order_id = order_data['order_id']
+    _, rejected = apply_transition(cursor, lock_lines(cursor, 'od.order_id = %s', (order_id,)), 'billed')
+    if rejected:
+        return 'All items must be delivered before the bill is paid'
+    
+    BillRepository(cursor).create(order_id, bill, pay_mode, waiter_id)
+    OrderRepository(cursor).mark_paid(order_id, bill.points_redeemed)
+    SpotRepository(cursor).release(order_data['table_id'])
+    CustomerRepository(cursor).settle_points(order_data['cust_id'], bill.points_redeemed, bill.points_earned)
+    record_sale(cursor, order_data['order_date'], order_lines(cursor, order_id), bill)
+    return None
+
+def bill_settled(cursor, order_data, waiter_id):
+    # After commit: the kitchen forgets the order and the spot goes to the next guest
+    kitchen_queue.remove_order(int(order_data['order_id']))
+    hand_off_spot(cursor, order_data['table_id'])
+    publish_order_event({
+        'type': 'bill_paid',
+        'order_id': int(order_data['order_id']),
+        'table_id': order_data['table_id']
+    }, waiter_id=waiter_id)
+
+@bp.route('/request_bill', methods=['POST'])
+def request_bill():
+    if 'user_id' not in session or session.get('role') != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    order_id = data.get('order_id')
+    
+    if not order_id:
+        return jsonify({'error': 'Missing order_id'}), 400
+    
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Verify the order belongs to the current customer
+        orders = OrderRepository(cursor)
+        order_data = orders.seated(order_id, session['user_id'])
+        if not order_data:
+            return jsonify({'error': 'Order not found or not authorized'}), 403
+        
+        # Check if all items are delivered
+        result = orders.status_counts(order_id)
+        if result['total'] != result['delivered']:
+            return jsonify({'error': 'All items must be delivered before requesting bill'}), 400
+        
+        # Only points that can actually be redeemed are kept for the waiter's approval
+        bill = quote_bill(cursor, order_id, data.get('redeem_points', 0))
+        
+        # Update order bill_status to requested
+        orders.request_bill(order_id, bill.points_redeemed)
+        
+        conn.commit()
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/generate_bill', methods=['POST'])
+def generate_bill():
+    if 'user_id' not in session or session.get('role') != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    order_id = data.get('order_id')
+    
+    if not order_id:
+        return jsonify({'error': 'Missing order_id'}), 400
+    
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # The bill, the order and the sales rollups change together
+        conn.start_transaction()
+        
+        # Verify the order belongs to the current customer
+        order_data = OrderRepository(cursor).lock_for_bill(order_id, cust_id=session['user_id'])
+        if not order_data:
+            conn.rollback()
+            return jsonify({'error': 'Order not found or not authorized'}), 403
+        
+        bill = quote_bill(cursor, order_id, data.get('redeem_points'), lock=True)
+        if not bill.all_delivered:
+            conn.rollback()
+            return jsonify({'error': 'All items must be delivered before generating bill'}), 400
+        
+        error = settle_bill(cursor, order_data, bill, 'online', order_data['waiter_id'])
+        if error:
+            conn.rollback()
+            return jsonify({'error': error}), 400
+        
+        conn.commit()
+        bill_settled(cursor, order_data, order_data['waiter_id'])
+        return jsonify({'success': True, 'bill': bill.summary()})
+        
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/waiter/approve_bill', methods=['POST'])
+def approve_bill():
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    order_id = data.get('order_id')
+    
+    if not order_id:
+        return jsonify({'error': 'Missing order_id'}), 400
+    
+    conn = None
+    cursor = None
+    try:
+        waiter = current_identity('waiter')
+        if not waiter:
+            return jsonify({'error': 'Waiter not found'}), 403
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # The bill, the order and the sales rollups change together
+        conn.start_transaction()
+        
+        # Verify the order belongs to a spot assigned to this waiter
+        order_data = OrderRepository(cursor).lock_for_bill(order_id, waiter_id=waiter.waiter_id)
+        if not order_data:
+            conn.rollback()
+            return jsonify({'error': 'Order not found or not authorized'}), 403
+        
+        # Priced with the points the customer chose when requesting the bill
+        bill = quote_bill(cursor, order_id, lock=True)
+        error = settle_bill(cursor, order_data, bill, 'online', waiter.waiter_id)
+        if error:
+            conn.rollback()
+            return jsonify({'error': error}), 400
+        
+        conn.commit()
+        bill_settled(cursor, order_data, waiter.waiter_id)
+        return jsonify({'success': True, 'bill': bill.summary()})
+        
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/close_order', methods=['POST'])
+def close_order():
+    if 'user_id' not in session or session['role'] != 'waiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    order_id = data.get('order_id')
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        # Check if all items in the order are billed
+        orders = OrderRepository(cursor)
+        result = orders.status_counts(order_id)
+        total_items = result['total']
+        billed_items = result['billed']
+        
+        if total_items == billed_items:
+            # All items are billed, close the order
+            orders.close(order_id)
+            
+            conn.commit()
+            cursor.close()
+            conn.close()
+            
+            return jsonify({'success': True, 'message': 'Order closed successfully'})
+        else:
+            return jsonify({'error': 'Not all items have been billed yet'}), 400
+            
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/customer/bill/<int:order_id>')
+def customer_bill(order_id):
+    if 'user_id' not in session or session.get('role') != 'customer':
+        return redirect(url_for('main.customer_login'))
+    
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Verify the order belongs to the current customer
+        orders = OrderRepository(cursor)
+        order_data = orders.seated(order_id, session['user_id'])
+        if not order_data:
+            flash('Order not found or not authorized', 'danger')
+            return redirect(url_for('customer.customer_dashboard'))
+        
+        # Get order items
+        items = orders.lines(order_id)
+        
+        # Totals come from the same pricing as payment; before the bill is
+        # requested, show what redeeming `redeem` points would do
+        bill_requested = order_data['bill_status'] == 'requested'
+        redeem_points = None if bill_requested else request.args.get('redeem', 0, type=int)
+        bill = quote_bill(cursor, order_id, redeem_points)
+        
+        return render_template('customer/bill.html', 
+                              order=order_data,
+                              items=items,
+                              bill=bill,
+                              subtotal=bill.subtotal,
+                              tax=bill.tax,
+                              total=bill.total,
+                              points_earned=bill.points_earned,
+                              bill_requested=bill_requested)
+    
+    except Exception as e:
+        flash(f'An error occurred: {str(e)}', 'danger')
+        return redirect(url_for('customer.customer_dashboard'))
+    
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
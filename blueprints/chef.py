@@ -0,0 +1,211 @@
+"""Chef dashboard, kitchen queue and menu availability."""
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
+from mysql.connector import Error
+from scheduler import OPEN_STATUSES
+from repositories import MenuRepository
+from lifecycle import apply_transition, lock_lines, parse_lines
+from blueprints.common import (bulk_transition_response, current_identity, event_stream, get_db_connection,
+                               get_menu_snapshot, kitchen_queue, lines_transitioned, load_kitchen_queue, menu_cache)
+
+bp = Blueprint('chef', __name__)
+
+@bp.route('/chef/dashboard')
+def chef_dashboard():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        flash('Please login as chef to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    try:
+        chef = current_identity('chef')
+        if not chef:
+            flash('Chef profile not found.', 'error')
+            return redirect(url_for('main.employee_login'))
+        
+        # The page loads and refreshes its queue from /chef/queue
+        return render_template('chef/dashboard.html')
+
+    except Exception as e:
+        print(f"Error in chef_dashboard: {str(e)}")
+        flash('Error retrieving assigned orders. Please try again.', 'error')
+        return redirect(url_for('main.employee_login'))
+
+@bp.route('/chef/queue')
+def chef_queue():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    chef = current_identity('chef')
+    if not chef:
+        return jsonify({'error': 'Chef not found'}), 403
+    
+    if kitchen_queue.needs_load():
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Database connection failed'}), 500
+        cursor = conn.cursor(dictionary=True)
+        try:
+            load_kitchen_queue(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+    
+    menu_items = get_menu_snapshot().by_id
+    groups = kitchen_queue.queue(chef.chef_id)
+    for group in groups:
+        menu_item = menu_items.get(group['item_id'], {})
+        group['item_name'] = menu_item.get('item_name')
+        group['category'] = menu_item.get('category')
+    return jsonify({'groups': groups})
+
+@bp.route('/chef/manage_menu')
+def chef_manage_menu():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        flash('Please login as chef to access this page.', 'error')
+        return redirect(url_for('main.employee_login'))
+    
+    try:
+        # Get all menu items
+        menu_items = get_menu_snapshot().items
+        
+        return render_template('chef/manage_menu.html', menu_items=menu_items)
+        
+    except Exception as e:
+        print(f"Error in chef_manage_menu: {str(e)}")
+        flash('Error retrieving menu items. Please try again.', 'error')
+        return redirect(url_for('chef.chef_dashboard'))
+
+@bp.route('/chef/mark_cooked', methods=['POST'])
+def chef_mark_cooked():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return jsonify({'success': False, 'error': 'Unauthorized access'})
+    
+    try:
+        data = request.get_json()
+        order_id = data.get('order_id')
+        item_id = data.get('item_id')
+        
+        if not order_id or not item_id:
+            return jsonify({'success': False, 'error': 'Missing required parameters'})
+        
+        chef = current_identity('chef')
+        if not chef:
+            return jsonify({'success': False, 'error': 'Chef not found'})
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        conn.start_transaction()
+        
+        locked = lock_lines(cursor, 'od.order_id = %s AND od.item_id = %s AND od.chef_id = %s',
+                            (order_id, item_id, chef.chef_id))
+        changed, rejected = apply_transition(cursor, locked, 'cooked')
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        if not locked:
+            return jsonify({'success': False, 'error': 'Order item not found'})
+        if rejected:
+            return jsonify({'success': False, 'error': rejected[0]['error']})
+        
+        lines_transitioned(changed, 'cooked')
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        print(f"Error in chef_mark_cooked: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/chef/bulk_status', methods=['POST'])
+def chef_bulk_status():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+    
+    data = request.get_json() or {}
+    status = data.get('status', 'cooked')
+    if status not in OPEN_STATUSES + ('cooked',):
+        return jsonify({'success': False, 'error': 'Chefs can only mark lines cooking or cooked'}), 400
+    try:
+        requested = parse_lines(data.get('lines'))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid lines: {e}'}), 400
+    if not requested:
+        return jsonify({'success': False, 'error': 'No lines provided'}), 400
+    
+    chef = current_identity('chef')
+    if not chef:
+        return jsonify({'success': False, 'error': 'Chef not found'}), 403
+    
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        conn.start_transaction()
+        
+        locked = lock_lines(cursor, f"od.chef_id = %s AND (od.order_id, od.item_id) IN "
+                                    f"({', '.join(['(%s, %s)'] * len(requested))})",
+                            (chef.chef_id, *[value for pair in requested for value in pair]))
+        
+        changed, rejected = apply_transition(cursor, locked, status)
+        conn.commit()
+        
+        lines_transitioned(changed, status)
+        return bulk_transition_response(requested, locked, changed, rejected, status)
+    
+    except Error as e:
+        if conn:
+            conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/chef/toggle_menu_item', methods=['POST'])
+def chef_toggle_menu_item():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return jsonify({'success': False, 'error': 'Unauthorized access'})
+    
+    try:
+        data = request.get_json()
+        item_id = data.get('item_id')
+        
+        if not item_id:
+            return jsonify({'success': False, 'error': 'Missing item ID'})
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get current availability
+        menu_items = MenuRepository(cursor)
+        current = menu_items.availability(item_id)
+        
+        if not current:
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'error': 'Item not found'})
+        
+        # Toggle availability
+        menu_items.set_availability(item_id, not current['availability'])
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        menu_cache.invalidate()
+        
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        print(f"Error in chef_toggle_menu_item: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/events/chef')
+def chef_events():
+    if 'user_id' not in session or session.get('role') != 'chef':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    chef = current_identity('chef')
+    if not chef:
+        return jsonify({'error': 'Chef not found'}), 403
+    return event_stream(f"chef:{chef.chef_id}")
@@ -0,0 +1,255 @@
+"""State and helpers shared by the role blueprints.
+
+Everything here is built from the environment once per worker process, the
+first time a blueprint is imported, whichever blueprints the app loads.
+"""
+from flask import flash, g, jsonify, session, Response, stream_with_context
+from mysql.connector import Error
+from db import pool_from_env, db_config_from_env
+from menu_cache import menu_cache_from_env
+from events import broker_from_env, format_sse
+from scheduler import scheduler_from_env, OPEN_STATUSES
+from seating import seat_allocator_from_env
+from waitlist import waitlist_from_env
+from repositories import EmployeeRepository, MenuRepository, OrderRepository, SpotRepository
+from identity import identity_cache_from_env, resolve_identity
+from kitchen import kitchen_queue_from_env
+
+# Database configuration
+db_config = db_config_from_env()
+
+# Shared connection pool; sized through DB_POOL_* environment variables
+db_pool = pool_from_env(db_config)
+
+def get_db_connection():
+    try:
+        connection = db_pool.checkout()
+        # Remember what this request borrowed so teardown can return anything
+        # a handler forgot to close on an early return
+        g.setdefault('db_connections', []).append((connection, connection.lease))
+        return connection
+    except Error as e:
+        print(f"Error connecting to MySQL: {e}")
+        flash('Database connection error. Please try again later.', 'danger')
+        return None
+
+def release_db_connections(exc):
+    for connection, lease in g.pop('db_connections', []):
+        # A no-op for connections the handler already gave back, even if
+        # another request has borrowed them since
+        connection.close(lease)
+
+# Waiter/chef ids of logged-in employees, resolved once per session
+identity_cache = identity_cache_from_env()
+
+def remember_identity(identity):
+    key = session.get('identity_key') or identity_cache.new_key()
+    session['identity_key'] = key
+    identity_cache.put(key, identity)
+
+def current_identity(role):
+    """Identity of the logged-in employee if they are a `role` ('waiter' or 'chef'), else None."""
+    emp_id = session.get('user_id')
+    if emp_id is None or session.get('role') != role:
+        return None
+    key = session.get('identity_key')
+    identity = identity_cache.get(key, emp_id) if key else None
+    if identity is None:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            identity = resolve_identity(cursor, emp_id)
+        finally:
+            cursor.close()
+            conn.close()
+        if identity is None:
+            return None
+        remember_identity(identity)
+    # Deactivated employees lose access within IDENTITY_CACHE_TTL, at once on this worker
+    if not identity.active or getattr(identity, f'{role}_id') is None:
+        return None
+    return identity
+
+# Badge colour for each order_details.order_status
+ORDER_STATUS_COLORS = {
+    'placed': 'warning',
+    'cooking': 'info',
+    'cooked': 'success',
+    'delivered': 'primary',
+    'billed': 'secondary'
+}
+
+# Pre-grouped menu shared by the menu pages; invalidated on every menu edit
+menu_cache = menu_cache_from_env()
+
+def load_menu_items():
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg='Database connection failed')
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return MenuRepository(cursor).all()
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_menu_snapshot():
+    return menu_cache.get(load_menu_items)
+
+# Per-chef backlog used to assign new order lines to the least loaded chef
+chef_scheduler = scheduler_from_env()
+
+def load_chef_scheduler(cursor):
+    chef_scheduler.load(EmployeeRepository(cursor).chefs(), OrderRepository(cursor).chef_backlog())
+
+def parse_cart(items):
+    """[{'id': .., 'quantity': ..}, ...] -> {item_id: qty}; raises KeyError, TypeError or ValueError."""
+    # Later entries for the same item win, as they did when lines were written one by one
+    cart = {}
+    for item in items:
+        item_id, qty = int(item['id']), int(item['quantity'])
+        if qty < 1:
+            raise ValueError(f'quantity for item {item_id} must be at least 1')
+        cart[item_id] = qty
+    return cart
+
+def line_work(item_id, qty, menu_items=None):
+    # Kitchen minutes a line adds to its chef's backlog
+    menu_items = get_menu_snapshot().by_id if menu_items is None else menu_items
+    menu_item = menu_items.get(int(item_id), {})
+    return (menu_item.get('prep_time') or 0) * int(qty)
+
+# Each chef's open lines ordered by due time, behind /chef/queue
+kitchen_queue = kitchen_queue_from_env()
+
+def load_kitchen_queue(cursor):
+    kitchen_queue.load(OrderRepository(cursor).kitchen_lines())
+
+# Free spots handed out to customers at login
+seat_allocator = seat_allocator_from_env()
+
+# Customers queued for the next freed spot
+waitlist = waitlist_from_env()
+
+def hand_off_spot(cursor, table_id):
+    # Seat the head of the waitlist at a just-freed spot, otherwise it goes
+    # back on the free list; returns the seated customer's id
+    seat_allocator.release(table_id)
+    try:
+        while True:
+            cust_id = waitlist.next_waiting(cursor)
+            if cust_id is None:
+                return None
+            # Another worker may be seating the same customer right now
+            if waitlist.seat(cursor, cust_id, table_id):
+                break
+        if seat_allocator.claim_table(cursor, table_id, cust_id):
+            return cust_id
+        waitlist.unseat(cursor, cust_id)
+    except Error as e:
+        print(f"Error handing spot {table_id} to waiting customer: {e}")
+    return None
+
+def seat_waiting(cursor, cust_id):
+    # Claim a free spot for a queued customer; a worker that handed them a
+    # freed spot meanwhile wins, and this spot is given back
+    table_id = seat_allocator.claim(cursor, cust_id)
+    if table_id and not waitlist.seat(cursor, cust_id, table_id):
+        SpotRepository(cursor).release(table_id)
+        seat_allocator.release(table_id)
+        return None
+    return table_id
+
+# Order status changes pushed to live dashboards (see EVENT_BROKER)
+event_broker = broker_from_env()
+
+def order_line_event(order_id, item_id, order_status, **extra):
+    event = {
+        'type': 'line',
+        'order_id': int(order_id),
+        'item_id': int(item_id),
+        'order_status': order_status,
+        'status_color': ORDER_STATUS_COLORS.get(order_status, 'secondary')
+    }
+    event.update(extra)
+    return event
+
+def publish_order_event(event, chef_id=None, waiter_id=None):
+    event_broker.publish(f"order:{event['order_id']}", event)
+    if chef_id:
+        event_broker.publish(f'chef:{chef_id}', event)
+    if waiter_id:
+        event_broker.publish(f'waiter:{waiter_id}', event)
+
+def lines_transitioned(lines, status, menu_items=None):
+    # Backlog, kitchen queue and live dashboards for lines that just moved to `status`;
+    # each line carries its old order_status, chef_id, qty, waiter_id and table_id
+    menu_items = get_menu_snapshot().by_id if menu_items is None else menu_items
+    for line in lines:
+        menu_item = menu_items.get(line['item_id'], {})
+        was_open = line['order_status'] in OPEN_STATUSES
+        if was_open and status not in OPEN_STATUSES:
+            chef_scheduler.complete(line['chef_id'], line_work(line['item_id'], line['qty'], menu_items))
+        if status in OPEN_STATUSES:
+            kitchen_queue.update_line(line['order_id'], line['item_id'], status=status)
+        else:
+            kitchen_queue.remove_line(line['order_id'], line['item_id'])
+        publish_order_event(order_line_event(line['order_id'], line['item_id'], status,
+                                             qty=line['qty'],
+                                             item_name=menu_item.get('item_name'),
+                                             category=menu_item.get('category'),
+                                             chef_id=line['chef_id'],
+                                             table_id=line.get('table_id')),
+                            chef_id=line['chef_id'],
+                            waiter_id=line.get('waiter_id'))
+
+def bulk_transition_response(requested, locked, changed, rejected, status):
+    found = {(line['order_id'], line['item_id']) for line in locked}
+    rejected = rejected + [{'order_id': order_id, 'item_id': item_id, 'order_status': None,
+                            'error': 'line not found or not yours'}
+                           for order_id, item_id in requested if (order_id, item_id) not in found]
+    return jsonify({
+        'success': True,
+        'lines': [{'order_id': line['order_id'], 'item_id': line['item_id'], 'order_status': status,
+                   'status_color': ORDER_STATUS_COLORS.get(status, 'secondary')}
+                  for line in changed],
+        'rejected': rejected
+    })
+
+def event_stream(channel):
+    subscription = event_broker.subscribe(channel)
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            # Ends when the worker shuts down; the browser reconnects to another one
+            while not event_broker.closed:
+                event = subscription.get(timeout=15)
+                if event_broker.closed:
+                    break
+                if event is None:
+                    # Keep proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                else:
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+    
+    return Response(stream_with_context(generate()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def shared_state_gauges():
+    pool = db_pool.stats()
+    cache = menu_cache.stats()
+    return [
+        ('rms_db_pool_in_use', 'gauge', 'Pooled connections currently borrowed.', pool['in_use']),
+        ('rms_db_pool_idle', 'gauge', 'Pooled connections waiting to be borrowed.', pool['idle']),
+        ('rms_db_pool_waits_total', 'counter', 'Checkouts that had to wait for a connection.', pool['waits']),
+        ('rms_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection.', pool['wait_time_total']),
+        ('rms_db_pool_timeouts_total', 'counter', 'Checkouts that gave up waiting.', pool['timeouts']),
+        ('rms_menu_cache_hits_total', 'counter', 'Menu loads served from the cache.', cache['hits']),
+        ('rms_menu_cache_misses_total', 'counter', 'Menu loads that queried the database.', cache['misses']),
+    ]
@@ -0,0 +1,410 @@
+"""Customer dashboard, menu and ordering."""
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
+from mysql.connector import Error
+from scheduler import OPEN_STATUSES
+from repositories import CustomerRepository, OrderRepository, SpotRepository
+from lifecycle import record_events
+from blueprints.common import (chef_scheduler, event_stream, get_db_connection, get_menu_snapshot, kitchen_queue,
+                               line_work, load_chef_scheduler, order_line_event, parse_cart, publish_order_event)
+
+bp = Blueprint('customer', __name__)
+
+@bp.route('/customer/dashboard')
+def customer_dashboard():
+    if 'user_id' not in session or session['role'] != 'customer':
+        return redirect(url_for('main.customer_login'))
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        # Get customer details
+        customer = CustomerRepository(cursor).get(session['user_id'])
+        
+        # Get current order (unpaid)
+        orders = OrderRepository(cursor)
+        current_order = orders.current(session['user_id'])
+        
+        # Initialize order_items list for current order
+        if current_order:
+            current_order['order_items'] = []
+            
+            # Get order details for current order
+            all_delivered = True
+            for item in orders.lines(current_order['order_id']):
+                status_color = {
+                    'placed': 'warning',
+                    'cooking': 'info',
+                    'cooked': 'success',
+                    'delivered': 'primary',
+                    'billed': 'secondary'
+                }.get(item['order_status'], 'secondary')
+                
+                # Check if all items are delivered
+                if item['order_status'] != 'delivered' and item['order_status'] != 'billed':
+                    all_delivered = False
+                
+                current_order['order_items'].append({
+                    'item_id': item['item_id'],
+                    'item_name': item['item_name'],
+                    'qty': item['qty'],
+                    'order_status': item['order_status'],
+                    'status_color': status_color
+                })
+            
+            # Add all_delivered flag to current_order
+            current_order['all_delivered'] = all_delivered
+        
+        return render_template('customer/dashboard.html', 
+                              customer=customer, 
+                              current_order=current_order)
+        
+    except Error as e:
+        flash(f'Database error: {str(e)}', 'danger')
+        return redirect(url_for('main.customer_login'))
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/menu')
+def menu():
+    if 'user_id' not in session or session['role'] != 'customer':
+        return redirect(url_for('main.customer_login'))
+    
+    conn = None
+    cursor = None
+    
+    try:
+        # Menu items grouped by category come from the menu cache
+        categories = get_menu_snapshot().categories
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get current order if exists
+        orders = OrderRepository(cursor)
+        current_order = orders.current(session['user_id'])
+        
+        # If there's a current order, get its items to pre-populate the cart
+        current_order_items = {}
+        if current_order:
+            current_order_items = orders.quantities(current_order['order_id'])
+        
+        return render_template('menu.html', 
+                              categories=categories, 
+                              current_order=current_order,
+                              current_order_items=current_order_items)
+    except Error as e:
+        flash(f'Database error: {str(e)}', 'danger')
+        return redirect(url_for('customer.customer_dashboard'))
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/place_order_simple', methods=['POST'])
+def place_order_simple():
+    if 'user_id' not in session or session['role'] != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    items = data.get('items', [])
+    
+    if not items:
+        return jsonify({'error': 'No items provided'}), 400
+    
+    # Borrow a pooled connection for this operation
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    try:
+        # First, check if customer has an unpaid order
+        cursor = conn.cursor(dictionary=True)
+        existing_order = OrderRepository(cursor).unpaid(session['user_id'])
+        cursor.close()
+        
+        if existing_order:
+            order_id = existing_order['order_id']
+        else:
+            # Create new order
+            cursor = conn.cursor(dictionary=True)
+            order_id = OrderRepository(cursor).create(session['user_id'])
+            cursor.close()
+        
+        # Process each item separately
+        for item in items:
+            # Check if item already exists in order
+            cursor = conn.cursor(dictionary=True)
+            orders = OrderRepository(cursor)
+            existing_item = orders.line(order_id, item['id'])
+            
+            if existing_item:
+                # Update quantity if item exists
+                orders.set_quantity(order_id, item['id'], item['quantity'])
+            else:
+                # Add new item to order
+                orders.add_line_at_menu_price(order_id, item['id'], item['quantity'])
+            cursor.close()
+        
+        return jsonify({'success': True, 'order_id': order_id})
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@bp.route('/remove_order_item', methods=['POST'])
+def remove_order_item():
+    if 'user_id' not in session or session['role'] != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    order_id = data.get('order_id')
+    item_id = data.get('item_id')
+    
+    if not order_id or not item_id:
+        return jsonify({'error': 'Missing order_id or item_id'}), 400
+    
+    # Borrow a pooled connection for this operation
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    try:
+        # Verify the order belongs to the current customer with a new cursor
+        cursor = conn.cursor(dictionary=True)
+        if not OrderRepository(cursor).owned_unpaid(order_id, session['user_id']):
+            cursor.close()
+            return jsonify({'error': 'Order not found or not authorized'}), 403
+        cursor.close()  # Close cursor after fetching results
+        
+        # Remove the item from order_details with a new cursor
+        cursor = conn.cursor(dictionary=True)
+        orders = OrderRepository(cursor)
+        line = orders.line(order_id, item_id)
+        orders.remove_line(order_id, item_id)
+        cursor.close()  # Close cursor after operation
+        
+        # The chef no longer has to cook a removed line
+        if line and line['order_status'] in OPEN_STATUSES:
+            chef_scheduler.complete(line['chef_id'], line_work(item_id, line['qty']))
+        kitchen_queue.remove_line(int(order_id), int(item_id))
+
+        # Check if there are any items left in the order with a new cursor
+        cursor = conn.cursor(dictionary=True)
+        item_count = OrderRepository(cursor).line_count(order_id)
+        cursor.close()  # Close cursor after fetching results
+        
+        # If no items left, delete the order with a new cursor
+        if item_count == 0:
+            cursor = conn.cursor(dictionary=True)
+            OrderRepository(cursor).delete(order_id)
+            cursor.close()  # Close cursor after operation
+        
+        return jsonify({'success': True})
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@bp.route('/place_order_new', methods=['POST'])
+def place_order_new():
+    if 'user_id' not in session or session['role'] != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    items = data.get('items', [])
+    
+    if not items:
+        return jsonify({'error': 'No items provided'}), 400
+    
+    # Borrow a pooled connection for this operation
+    conn = None
+    cursor = None
+    
+    try:
+        # Borrow a connection from the pool
+        conn = get_db_connection()
+        
+        if not conn:
+            return jsonify({'error': 'Database connection failed'}), 500
+        
+        # Start transaction
+        conn.start_transaction()
+        
+        # First, check if customer has an unpaid order
+        cursor = conn.cursor(dictionary=True)
+        orders = OrderRepository(cursor)
+        existing_order = orders.unpaid(session['user_id'])
+        
+        if existing_order:
+            order_id = existing_order['order_id']
+            print(f"Using existing order: {order_id}")
+        else:
+            # Create new order
+            order_id = orders.create(session['user_id'])
+            print(f"Created new order: {order_id}")
+        
+        # Process each item separately
+        for item in items:
+            # Check if item already exists in order
+            existing_item = orders.line(order_id, item['id'])
+            
+            if existing_item:
+                # Update quantity if item exists
+                orders.set_quantity(order_id, item['id'], item['quantity'])
+                print(f"Updated item {item['id']} in order {order_id}")
+            else:
+                # Add new item to order
+                orders.add_line_at_menu_price(order_id, item['id'], item['quantity'])
+        
+        # Commit the transaction
+        conn.commit()
+        print(f"Transaction committed for order {order_id}")
+        
+        return jsonify({'success': True, 'order_id': order_id})
+    except Error as e:
+        # Rollback the transaction in case of error
+        if conn:
+            conn.rollback()
+            print(f"Transaction rolled back due to error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/place_order_final', methods=['POST'])
+def place_order_final():
+    if 'user_id' not in session or session['role'] != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    
+    if not items:
+        return jsonify({'error': 'No items provided'}), 400
+    try:
+        cart = parse_cart(items)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid items: {e}'}), 400
+    
+    # Borrow a pooled connection for this operation
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        
+        if not conn:
+            return jsonify({'error': 'Database connection failed'}), 500
+        
+        cursor = conn.cursor(dictionary=True)
+        
+        # Refresh the in-memory chef queues when they are cold or due a resync
+        if chef_scheduler.needs_load():
+            load_chef_scheduler(cursor)
+        
+        # Apply the whole cart atomically
+        conn.start_transaction()
+        
+        # First, check if customer has an unpaid order
+        orders = OrderRepository(cursor)
+        existing_order = orders.unpaid(session['user_id'], lock=True)
+        placed_at = None
+        
+        if existing_order:
+            order_id = existing_order['order_id']
+            placed_at = existing_order['time_stamp'].timestamp()
+        else:
+            # Create new order
+            order_id = orders.create(session['user_id'])
+        
+        # Lines already on the order keep their status and chef; only qty changes
+        existing_lines = {line['item_id']: line for line in orders.lines_for_items(order_id, list(cart))}
+        
+        # New lines go to the chef with the least outstanding prep work;
+        # existing open lines only change their chef's backlog by the qty delta
+        menu_items = get_menu_snapshot().by_id
+        unknown = [item_id for item_id in cart if item_id not in menu_items]
+        if unknown:
+            conn.rollback()
+            return jsonify({'error': f'Unknown menu item {unknown[0]}'}), 400
+        assigned = {}
+        for item_id, qty in cart.items():
+            line = existing_lines.get(item_id)
+            if line:
+                if line['order_status'] in OPEN_STATUSES:
+                    chef_scheduler.add_work(line['chef_id'], line_work(item_id, qty - line['qty']))
+                continue
+            chef_id = chef_scheduler.assign(line_work(item_id, qty),
+                                            menu_items.get(item_id, {}).get('category'))
+            if chef_id is None:
+                conn.rollback()
+                chef_scheduler.invalidate()
+                return jsonify({'error': 'No chefs available in the system'}), 500
+            assigned[item_id] = chef_id
+        
+        # One multi-row upsert for the whole cart; new lines keep the name and
+        # price the customer ordered at, later qty changes do not reprice them
+        orders.upsert_lines([(order_id, item_id, qty, assigned.get(item_id), menu_items[item_id]['item_name'],
+                              menu_items[item_id]['category'], menu_items[item_id]['item_price'])
+                             for item_id, qty in cart.items()])
+        record_events(cursor, [(order_id, item_id, chef_id, None, 'placed') for item_id, chef_id in assigned.items()])
+        
+        spot = SpotRepository(cursor).for_customer(session['user_id'])
+        
+        conn.commit()
+        
+        for item_id, qty in cart.items():
+            line = existing_lines.get(item_id, {'order_status': 'placed', 'chef_id': assigned.get(item_id)})
+            menu_item = menu_items.get(item_id, {})
+            if line['order_status'] in OPEN_STATUSES:
+                kitchen_queue.upsert_line(line['chef_id'], order_id, item_id, qty, line['order_status'],
+                                          menu_item.get('prep_time'), placed_at)
+            publish_order_event(order_line_event(order_id, item_id, line['order_status'],
+                                                 qty=qty,
+                                                 item_name=menu_item.get('item_name'),
+                                                 category=menu_item.get('category'),
+                                                 item_price=menu_item.get('item_price'),
+                                                 chef_id=line['chef_id'],
+                                                 table_id=spot['table_id'] if spot else None),
+                                chef_id=line['chef_id'],
+                                waiter_id=spot['waiter_id'] if spot else None)
+        
+        return jsonify({'success': True, 'order_id': order_id})
+    except Error as e:
+        if conn:
+            conn.rollback()
+        # Backlog charged for the failed cart is dropped on the next resync
+        chef_scheduler.invalidate()
+        print(f"Error in place_order_final: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/events/order/<int:order_id>')
+def order_events(order_id):
+    if 'user_id' not in session or session.get('role') != 'customer':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        order = OrderRepository(cursor).owned(order_id, session['user_id'])
+    finally:
+        cursor.close()
+        conn.close()
+    
+    if not order:
+        return jsonify({'error': 'Order not found or not authorized'}), 403
+    return event_stream(f'order:{order_id}')
@@ -0,0 +1,247 @@
+"""Landing page, logins and health checks; every app loads these."""
+from flask import Blueprint, current_app, render_template, request, jsonify, session, redirect, url_for, flash
+from mysql.connector import Error
+from repositories import CustomerRepository, EmployeeRepository, SpotRepository
+from identity import resolve_identity
+from sessions import ServerSessionInterface
+from blueprints.common import (chef_scheduler, db_pool, get_db_connection, identity_cache, kitchen_queue, menu_cache,
+                               remember_identity, seat_allocator, seat_waiting, waitlist)
+
+bp = Blueprint('main', __name__)
+
+@bp.route('/health/db_pool')
+def db_pool_stats():
+    return jsonify(db_pool.stats())
+
+@bp.route('/health/menu_cache')
+def menu_cache_stats():
+    return jsonify(menu_cache.stats())
+
+@bp.route('/health/seats')
+def seat_allocator_stats():
+    return jsonify(seat_allocator.stats())
+
+@bp.route('/health/identity_cache')
+def identity_cache_stats():
+    return jsonify(identity_cache.stats())
+
+@bp.route('/health/waitlist')
+def waitlist_stats():
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify(waitlist.stats())
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return jsonify(waitlist.stats(cursor))
+    finally:
+        cursor.close()
+        conn.close()
+
+@bp.route('/health/kitchen_queue')
+def kitchen_queue_stats():
+    return jsonify(kitchen_queue.stats())
+
+@bp.route('/health/chef_scheduler')
+def chef_scheduler_stats():
+    return jsonify(chef_scheduler.stats())
+
+@bp.route('/health/sessions')
+def session_store_stats():
+    if not isinstance(current_app.session_interface, ServerSessionInterface):
+        return jsonify({'store': 'cookie'})
+    return jsonify(current_app.session_interface.stats())
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+@bp.route('/customer/login', methods=['GET', 'POST'])
+def customer_login():
+    if request.method == 'POST':
+        phone = request.form.get('phone')
+        
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            # Check customer credentials (only phone number)
+            customer = CustomerRepository(cursor).by_phone(phone)
+            
+            if customer:
+                # Check if customer already has an assigned spot
+                existing_spot = SpotRepository(cursor).for_customer(customer['cust_id'])
+                
+                if existing_spot:
+                    # Customer already has a spot, log them in
+                    waitlist.leave(cursor, customer['cust_id'])
+                    session['user_id'] = customer['cust_id']
+                    session['role'] = 'customer'
+                    return redirect(url_for('customer.menu'))
+                
+                # Atomically claim a free spot, unless others are already queued
+                table_id = None
+                queued, ahead = waitlist.waiting_ahead(cursor, customer['cust_id'])
+                if queued and ahead == 0:
+                    table_id = seat_waiting(cursor, customer['cust_id'])
+                elif ahead == 0:
+                    table_id = seat_allocator.claim(cursor, customer['cust_id'])
+                
+                if table_id:
+                    # Log customer in
+                    waitlist.leave(cursor, customer['cust_id'])
+                    session['user_id'] = customer['cust_id']
+                    session['role'] = 'customer'
+                    return redirect(url_for('customer.menu'))
+                else:
+                    # No spots available, queue for the next one to free up
+                    waitlist.join(cursor, customer['cust_id'])
+                    session['waitlist_cust_id'] = customer['cust_id']
+                    return render_template('customer_waiting.html', 
+                                        customer_name=customer['c_name'])
+
+            flash('Phone number not found. Please register first.', 'danger')
+            return redirect(url_for('main.customer_login'))
+        
+        except Exception as e:
+            flash(f'An error occurred: {str(e)}', 'danger')
+            return redirect(url_for('main.customer_login'))
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+    
+    return render_template('customer_login.html')
+
+@bp.route('/customer/waitlist/status')
+def customer_waitlist_status():
+    cust_id = session.get('waitlist_cust_id')
+    if cust_id is None:
+        return jsonify({'status': 'expired', 'redirect': url_for('main.customer_login')})
+    
+    conn = get_db_connection()
+    if conn is None:
+        # The customer stays queued; the page polls again
+        return jsonify({'error': 'Database connection failed'}), 503
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        polled = waitlist.poll(cursor, cust_id)
+        if polled is None:
+            session.pop('waitlist_cust_id', None)
+            return jsonify({'status': 'expired', 'redirect': url_for('main.customer_login')})
+        table_id, position = polled
+        
+        # Only claim a spot when one is known to be free, and only reload
+        # the wait estimate when it is stale
+        if table_id is None and position == 0 and seat_allocator.has_free():
+            table_id = seat_waiting(cursor, cust_id)
+        if table_id is None and waitlist.needs_tables():
+            waitlist.load_tables(cursor)
+        
+        if table_id is not None:
+            waitlist.leave(cursor, cust_id)
+            session.pop('waitlist_cust_id', None)
+            session['user_id'] = cust_id
+            session['role'] = 'customer'
+            return jsonify({'status': 'seated', 'table_id': table_id, 'redirect': url_for('customer.menu')})
+    except Error as e:
+        print(f"Error refreshing waitlist: {e}")
+        return jsonify({'error': 'Database error'}), 503
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+    
+    return jsonify({
+        'status': 'waiting',
+        'position': position + 1,
+        'eta_minutes': waitlist.estimate(position, seat_allocator.dining_minutes)
+    })
+
+@bp.route('/employee/login', methods=['GET', 'POST'])
+def employee_login():
+    if request.method == 'POST':
+        phone = request.form.get('phone')
+        password = request.form.get('password')
+        
+        conn = get_db_connection()
+        if not conn:
+            return render_template('employee_login.html', error="Database connection error")
+            
+        try:
+            cursor = conn.cursor(dictionary=True)
+            user = EmployeeRepository(cursor).login(phone, password)
+            
+            identity = None
+            if user and user['role'] in ('waiter', 'chef'):
+                identity = resolve_identity(cursor, user['emp_id'])
+            if identity and not identity.active:
+                flash('This account has been deactivated', 'danger')
+                return render_template('employee_login.html')
+            if user:
+                session['user_id'] = user['emp_id']
+                session['role'] = user['role']
+                if identity:
+                    remember_identity(identity)
+                if user['role'] == 'waiter':
+                    return redirect(url_for('waiter.waiter_dashboard'))
+                elif user['role'] == 'chef':
+                    return redirect(url_for('chef.chef_dashboard'))
+                elif user['role'] == 'admin':
+                    return redirect(url_for('admin.admin_dashboard'))
+            
+            flash('Invalid credentials', 'danger')
+        except Error as e:
+            flash(f'Database error: {str(e)}', 'danger')
+        finally:
+            cursor.close()
+            conn.close()
+            
+    return render_template('employee_login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        name = request.form['name']
+        phone = request.form['phone']
+        
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            # Check if phone number already exists
+            customers = CustomerRepository(cursor)
+            existing_customer = customers.by_phone(phone)
+            
+            if existing_customer:
+                flash('Phone number already registered. Please login.', 'danger')
+                return redirect(url_for('main.customer_login'))
+            
+            # Insert new customer with default loyalty points
+            customers.create(name, phone)
+            conn.commit()
+            
+            flash('Registration successful! Please login.', 'success')
+            return redirect(url_for('main.customer_login'))
+            
+        except Exception as e:
+            flash('An error occurred during registration. Please try again.', 'danger')
+            print(f"Registration error: {str(e)}")
+            return redirect(url_for('main.register'))
+        finally:
+            if 'conn' in locals():
+                conn.close()
+    
+    return render_template('register.html')
+
+@bp.route('/logout')
+def logout():
+    if session.get('identity_key'):
+        identity_cache.forget(session['identity_key'])
+    session.clear()
+    flash('You have been successfully logged out!', 'success')
+    return redirect(url_for('main.index'))
@@ -0,0 +1,296 @@
+"""Waiter dashboard, spot details and delivery status updates."""
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
+from mysql.connector import Error
+from repositories import OrderRepository, SpotRepository
+from lifecycle import WAITER_STATUSES, apply_transition, lock_lines, parse_lines
+from blueprints.common import (ORDER_STATUS_COLORS, bulk_transition_response, current_identity, event_stream,
+                               get_db_connection, lines_transitioned)
+
+bp = Blueprint('waiter', __name__)
+
+def fetch_waiter_spots(cursor, waiter_id):
+    # One joined fetch for spots, customers, open orders and their lines,
+    # grouped here so the page costs the same number of queries for any
+    # number of tables
+    spots = []
+    by_key = {}
+    for row in SpotRepository(cursor).floor(waiter_id):
+        key = (row['table_id'], row['order_id'])
+        spot = by_key.get(key)
+        if spot is None:
+            spot = {
+                'table_id': row['table_id'],
+                'availability': row['availability'],
+                'cust_id': row['cust_id'],
+                'c_name': row['c_name'],
+                'c_phone': row['c_phone'],
+                'loyal_pts': row['loyal_pts'],
+                'order_id': row['order_id'],
+                'paid_status': row['paid_status'],
+                'bill_status': row['bill_status'],
+                'total_items': 0,
+                'delivered_items': 0,
+                'order_items': []
+            }
+            by_key[key] = spot
+            spots.append(spot)
+        
+        if row['item_id'] is not None:
+            spot['order_items'].append({
+                'order_id': row['order_id'],
+                'item_id': row['item_id'],
+                'order_status': row['order_status'],
+                'chef_id': row['chef_id'],
+                'qty': row['qty'],
+                'item_name': row['item_name'],
+                'category': row['category'],
+                'item_price': row['item_price'],
+                'status_color': ORDER_STATUS_COLORS.get(row['order_status'], 'secondary')
+            })
+            spot['total_items'] += 1
+            if row['order_status'] == 'delivered':
+                spot['delivered_items'] += 1
+    
+    for spot in spots:
+        if spot['order_id']:
+            # Check if all items are delivered
+            spot['all_items_delivered'] = spot['total_items'] == spot['delivered_items'] and spot['total_items'] > 0
+    
+    return spots
+
+@bp.route('/waiter/dashboard')
+def waiter_dashboard():
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return redirect(url_for('main.employee_login'))
+    
+    conn = None
+    cursor = None
+    try:
+        waiter = current_identity('waiter')
+        if not waiter:
+            return redirect(url_for('main.employee_login'))
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get waiter's spots with their open orders in a single round trip
+        spots = fetch_waiter_spots(cursor, waiter.waiter_id)
+        
+        # Check if there are any spots assigned to this waiter
+        if not spots:
+            # If no spots are assigned, assign up to 3 spots to this waiter
+            SpotRepository(cursor).assign_unclaimed(waiter.waiter_id, 3)
+            conn.commit()
+            
+            # Get the updated spots
+            spots = fetch_waiter_spots(cursor, waiter.waiter_id)
+        
+        return render_template('waiter/dashboard.html', spots=spots)
+    
+    except Exception as e:
+        import traceback
+        print(f"Error in waiter_dashboard: {str(e)}")
+        print(traceback.format_exc())
+        return redirect(url_for('main.employee_login'))
+    
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/update_order_status', methods=['POST'])
+def update_order_status():
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.json
+    order_id = data.get('order_id')
+    item_id = data.get('item_id')
+    status = data.get('status')
+    
+    if not all([order_id, item_id, status]):
+        return jsonify({'error': 'Missing required parameters'}), 400
+    if status not in WAITER_STATUSES:
+        return jsonify({'error': f"status must be one of {', '.join(WAITER_STATUSES)}"}), 400
+    
+    conn = None
+    cursor = None
+    try:
+        waiter = current_identity('waiter')
+        if not waiter:
+            return jsonify({'error': 'Waiter not found'}), 403
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        conn.start_transaction()
+        
+        # Verify the order belongs to a spot assigned to this waiter
+        locked = lock_lines(cursor, 'od.order_id = %s AND od.item_id = %s AND s.waiter_id = %s',
+                            (order_id, item_id, waiter.waiter_id))
+        if not locked:
+            conn.rollback()
+            return jsonify({'error': 'Order not found or not authorized'}), 403
+        
+        changed, rejected = apply_transition(cursor, locked, status)
+        if rejected:
+            conn.rollback()
+            return jsonify({'error': rejected[0]['error']}), 409
+        
+        conn.commit()
+        lines_transitioned(changed, status)
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/waiter/bulk_status', methods=['POST'])
+def waiter_bulk_status():
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json() or {}
+    status = data.get('status')
+    if status not in WAITER_STATUSES:
+        return jsonify({'error': f"status must be one of {', '.join(WAITER_STATUSES)}"}), 400
+    try:
+        requested = parse_lines(data.get('lines'))
+        table_id = int(data['table_id']) if data.get('table_id') is not None else None
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid lines: {e}'}), 400
+    if not requested and table_id is None:
+        return jsonify({'error': 'Provide lines or a table_id'}), 400
+    from_status = data.get('from_status')
+    
+    waiter = current_identity('waiter')
+    if not waiter:
+        return jsonify({'error': 'Waiter not found'}), 403
+    
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        conn.start_transaction()
+        
+        # Only unpaid orders at this waiter's spots, locked for the update
+        filters = ['s.waiter_id = %s', 'o.paid_status = 0']
+        params = [waiter.waiter_id]
+        if requested:
+            filters.append(f"(od.order_id, od.item_id) IN ({', '.join(['(%s, %s)'] * len(requested))})")
+            params.extend(value for pair in requested for value in pair)
+        if table_id is not None:
+            filters.append('s.table_id = %s')
+            params.append(table_id)
+        if from_status:
+            filters.append('od.order_status = %s')
+            params.append(from_status)
+        locked = lock_lines(cursor, ' AND '.join(filters), params)
+        
+        changed, rejected = apply_transition(cursor, locked, status)
+        conn.commit()
+        
+        lines_transitioned(changed, status)
+        return bulk_transition_response(requested, locked, changed, rejected, status)
+    
+    except Error as e:
+        if conn:
+            conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/waiter/spot/<int:table_id>')
+def waiter_spot_details(table_id):
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        flash('Please login as a waiter to access this page.', 'danger')
+        return redirect(url_for('main.employee_login'))
+    
+    conn = None
+    cursor = None
+    try:
+        waiter = current_identity('waiter')
+        if not waiter:
+            flash('Waiter not found.', 'danger')
+            return redirect(url_for('main.employee_login'))
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        # Get spot details
+        spot = SpotRepository(cursor).for_waiter(table_id, waiter.waiter_id)
+        
+        if not spot:
+            flash('Spot not found or not assigned to you.', 'danger')
+            return redirect(url_for('waiter.waiter_dashboard'))
+        
+        # Initialize order as None
+        order = None
+        
+        # Get current order if exists
+        if not spot['availability'] and spot['cust_id']:
+            orders = OrderRepository(cursor)
+            order_data = orders.current(spot['cust_id'])
+            
+            if order_data:
+                # Create a new dictionary for the order
+                order = {
+                    'order_id': order_data['order_id'],
+                    'time_stamp': order_data['time_stamp'],
+                    'paid_status': order_data['paid_status'],
+                    'items': []  # Initialize as an empty list
+                }
+                
+                # Get order items with chef information
+                items = orders.lines_with_chef(order_data['order_id'])
+                
+                # Process order items
+                for item in items:
+                    # Add status color
+                    status_colors = {
+                        'placed': 'warning',
+                        'cooking': 'info',
+                        'cooked': 'success',
+                        'delivered': 'primary',
+                        'billed': 'secondary'
+                    }
+                    item['status_color'] = status_colors.get(item['order_status'], 'secondary')
+                    order['items'].append(item)
+                
+                # Check if all items are billed
+                order['all_billed'] = all(item['order_status'] == 'billed' for item in order['items'])
+        
+        return render_template('waiter/spot_details.html', spot=spot, order=order)
+    
+    except Exception as e:
+        import traceback
+        print(f"Error in waiter_spot_details: {str(e)}")
+        print(traceback.format_exc())
+        flash(f'An error occurred: {str(e)}', 'danger')
+        return redirect(url_for('waiter.waiter_dashboard'))
+    
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@bp.route('/events/waiter')
+def waiter_events():
+    if 'user_id' not in session or session.get('role') != 'waiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    waiter = current_identity('waiter')
+    if not waiter:
+        return jsonify({'error': 'Waiter not found'}), 403
+    return event_stream(f"waiter:{waiter.waiter_id}")
@@ -0,0 +1,509 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import Error, errors
+
+SQLITE_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+SAMPLE_DATA_MARKER = '-- Sample data'
+CENTS = Decimal('0.01')
+
+# Values go into SQLite as the text MySQL would print for them, and typed
+# columns come back as the types mysql.connector returns
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+# Every DECIMAL column in the schema has two places
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()).quantize(CENTS))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+class PoolTimeoutError(Error):
+    """Raised when no connection could be borrowed within the pool timeout."""
+
+
+class MySQLDialect:
+    """The few statements that are spelled differently per engine; all other SQL is shared."""
+
+    name = 'mysql'
+
+    def for_update(self):
+        # Plain FOR UPDATE: OF and SKIP LOCKED need MySQL 8.0, and 5.7 is still
+        # supported. Rows read inside subqueries are not locked either way.
+        return 'FOR UPDATE'
+
+    def upsert(self, *key):
+        # Followed by "column = expression" assignments
+        return 'ON DUPLICATE KEY UPDATE'
+
+    def inserted(self, column):
+        """The value an upsert tried to insert into `column`."""
+        return f'VALUES({column})'
+
+
+class SQLiteDialect(MySQLDialect):
+    name = 'sqlite'
+
+    def for_update(self):
+        # start_transaction() already holds the database's single write lock
+        return ''
+
+    def upsert(self, *key):
+        return f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET"
+
+    def inserted(self, column):
+        return f'excluded.{column}'
+
+
+MYSQL = MySQLDialect()
+SQLITE = SQLiteDialect()
+
+
+def dialect_of(cursor):
+    return getattr(cursor, 'dialect', MYSQL)
+
+
+def to_datetime(value):
+    # SQLite returns computed columns such as MIN(time_stamp) as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class InstrumentedCursor:
+    """Cursor proxy that reports how long each statement and fetch took."""
+
+    def __init__(self, cursor, listener):
+        self._cursor = cursor
+        self._listener = listener
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, statement, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._listener(statement, time.perf_counter() - started)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._timed(operation, self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._timed(operation, self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    # Fetch time counts towards database time but not towards the statement count
+    def fetchone(self):
+        return self._timed(None, self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._timed(None, self._cursor.fetchall)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed(None, self._cursor.fetchmany, *args, **kwargs)
+
+
+class PooledConnection:
+    """Thin proxy around a MySQL connection that hands it back to its pool on close()."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.created_at = time.monotonic()
+        self.checked_out = False
+        # Bumped by every checkout, so a stale handle cannot give back a later borrower's connection
+        self.lease = 0
+        self.invalid = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        if self._pool.query_listener:
+            return InstrumentedCursor(cursor, self._pool.query_listener)
+        return cursor
+
+    def close(self, lease=None):
+        # Existing handlers call conn.close() in their finally blocks; for a
+        # pooled connection that means "give it back", not "disconnect".
+        # With `lease`, only if that checkout has not given it back already.
+        if self._pool.end_lease(self, self.lease if lease is None else lease):
+            self._pool.release(self)
+
+    def invalidate(self):
+        # Drop this connection instead of pooling it on close(), e.g. when a
+        # streaming cursor was abandoned with rows still unread
+        self.invalid = True
+
+    def really_close(self):
+        try:
+            self._raw.close()
+        except Error:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, db_config, pool_size=5, max_overflow=10, recycle=3600,
+                 timeout=30, pre_ping=True):
+        self.db_config = dict(db_config)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        # Called as listener(statement, seconds) for every statement and fetch
+        self.query_listener = None
+
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+        # Counters exposed through stats()
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_pings = 0
+
+    def _connect(self):
+        raw = mysql.connector.connect(consume_results=True, **self.db_config)
+        return PooledConnection(self, raw)
+
+    def _is_stale(self, conn):
+        if self.recycle and time.monotonic() - conn.created_at > self.recycle:
+            self._recycled += 1
+            return True
+        if self.pre_ping:
+            try:
+                conn._raw.ping(reconnect=False)
+            except Error:
+                self._failed_pings += 1
+                return True
+        return False
+
+    def checkout(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.pool_size + self.max_overflow:
+                    # Reserve the slot before connecting outside the lock
+                    self._open += 1
+                    conn = None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._waits += 1
+                    self._timeouts += 1
+                    self._wait_time += time.monotonic() - started
+                    raise PoolTimeoutError(
+                        msg=f'Timed out after {self.timeout}s waiting for a database connection')
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                self._waits += 1
+                self._wait_time += time.monotonic() - started
+
+        try:
+            if conn is not None and self._is_stale(conn):
+                conn.really_close()
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        # Set autocommit to True to avoid transaction issues
+        conn._raw.autocommit = True
+        with self._cond:
+            conn.checked_out = True
+            conn.lease += 1
+            self._in_use += 1
+            self._checkouts += 1
+        return conn
+
+    def end_lease(self, conn, lease):
+        """Mark checkout `lease` of conn as given back; False if it already was."""
+        with self._cond:
+            if not conn.checked_out or conn.lease != lease:
+                return False
+            conn.checked_out = False
+            return True
+
+    def release(self, conn):
+        discard = conn.invalid
+        try:
+            if not discard and conn.in_transaction:
+                conn.rollback()
+        except Error:
+            discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            # Connections opened beyond pool_size are overflow and are not kept
+            if discard or len(self._idle) >= self.pool_size:
+                self._open -= 1
+                conn.really_close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def warm(self, count=None):
+        count = self.pool_size if count is None else min(count, self.pool_size)
+        conns = [self.checkout() for _ in range(count)]
+        for conn in conns:
+            conn.close()
+
+    def dispose(self):
+        with self._cond:
+            while self._idle:
+                self._idle.pop().really_close()
+                self._open -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'overflow': max(0, self._open - self.pool_size),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time, 6),
+                'timeouts': self._timeouts,
+                'recycled': self._recycled,
+                'failed_pings': self._failed_pings,
+            }
+
+
+def _sqlite_error(error):
+    # Callers catch mysql.connector errors whichever engine is behind them
+    if isinstance(error, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=str(error))
+    if isinstance(error, sqlite3.OperationalError):
+        return errors.OperationalError(msg=str(error))
+    return errors.DatabaseError(msg=str(error))
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that takes %s placeholders and returns dictionary rows like mysql.connector."""
+
+    dialect = SQLITE
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        if dictionary:
+            cursor.row_factory = _dict_row
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @staticmethod
+    def _operation(operation):
+        return operation.replace('%s', '?').replace('%%', '%')
+
+    def _call(self, method, *args):
+        try:
+            return method(*args)
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    def execute(self, operation, params=None):
+        # Like mysql.connector, only substitute placeholders when there are params
+        if params is None:
+            return self._call(self._cursor.execute, operation)
+        return self._call(self._cursor.execute, self._operation(operation), tuple(params))
+
+    def executemany(self, operation, seq_params):
+        return self._call(self._cursor.executemany, self._operation(operation),
+                          [tuple(params) for params in seq_params])
+
+    def fetchone(self):
+        return self._call(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._call(self._cursor.fetchall)
+
+    def fetchmany(self, size=1):
+        return self._call(self._cursor.fetchmany, size)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """One SQLite connection with the parts of the mysql.connector API the app relies on.
+
+    Statements autocommit unless start_transaction() was called, which takes
+    the write lock straight away (BEGIN IMMEDIATE). That serializes writers
+    the way the FOR UPDATE locks do on MySQL; WAL keeps readers unblocked.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.autocommit = True
+        try:
+            self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                         detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+            self._conn.execute('PRAGMA foreign_keys = ON')
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('PRAGMA synchronous = NORMAL')
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def _call(self, method, *args):
+        try:
+            return method(*args)
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    def start_transaction(self):
+        self._call(self._conn.execute, 'BEGIN IMMEDIATE')
+
+    def commit(self):
+        self._call(self._conn.commit)
+
+    def rollback(self):
+        self._call(self._conn.rollback)
+
+    def ping(self, reconnect=False):
+        self._call(self._conn.execute, 'SELECT 1')
+
+    def close(self):
+        self._conn.close()
+
+
+def sqlite_schema_statements(sample_data=True, path=SQLITE_SCHEMA_PATH):
+    with open(path) as schema:
+        sql = schema.read()
+    if not sample_data:
+        sql = sql.split(SAMPLE_DATA_MARKER)[0]
+    # schema_sqlite.sql keeps semicolons out of comments and string literals
+    for statement in sql.split(';'):
+        lines = [line for line in statement.splitlines() if not line.strip().startswith('--')]
+        if any(line.strip() for line in lines):
+            yield '\n'.join(lines)
+
+
+def create_sqlite_schema(conn, sample_data=True):
+    """Create the tables in an empty SQLite database; returns False if it already had some."""
+    conn.start_transaction()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'")
+        if cursor.fetchone()[0]:
+            conn.rollback()
+            return False
+        for statement in sqlite_schema_statements(sample_data):
+            cursor.execute(statement)
+        conn.commit()
+        return True
+    except Error:
+        conn.rollback()
+        raise
+
+
+class SQLitePool(ConnectionPool):
+    """ConnectionPool over a single SQLite file, for kiosks and in-process benchmarks.
+
+    A database file with no tables gets schema_sqlite.sql, sample data
+    included, the first time a connection is opened.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__({'engine': 'sqlite', 'path': path}, **kwargs)
+        self.path = path
+        self._schema_ready = False
+
+    def _connect(self):
+        raw = SQLiteConnection(self.path, timeout=self.timeout)
+        if not self._schema_ready:
+            create_sqlite_schema(raw)
+            self._schema_ready = True
+        return PooledConnection(self, raw)
+
+
+def connect(db_config):
+    """One unpooled connection to the engine db_config describes, for scripts and CLIs."""
+    if db_config.get('engine') == 'sqlite':
+        return SQLiteConnection(db_config['path'])
+    return mysql.connector.connect(**db_config)
+
+
+def db_config_from_env():
+    if os.getenv('DB_ENGINE', 'mysql').lower() == 'sqlite':
+        return {'engine': 'sqlite', 'path': os.getenv('SQLITE_PATH', 'restaurant.sqlite3')}
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', 3306)),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', ''),
+        'database': os.getenv('DB_NAME', 'restaurant_db')
+    }
+
+
+def pool_from_env(db_config):
+    if db_config.get('engine') == 'sqlite':
+        pool_class, target = SQLitePool, db_config['path']
+    else:
+        pool_class, target = ConnectionPool, db_config
+    return pool_class(
+        target,
+        pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+        max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+        recycle=int(os.getenv('DB_POOL_RECYCLE', 3600)),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        pre_ping=os.getenv('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no'),
+    )
@@ -0,0 +1,149 @@
+import asyncio
+import importlib
+import json
+import os
+import queue
+import threading
+
+
+class Subscription:
+    def __init__(self, broker, channel, maxsize=100):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A stalled client should not hold up the kitchen; it will
+            # resynchronise on its next page load
+            pass
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """A subscription read by a coroutine; events may be published from any thread."""
+
+    def __init__(self, broker, channel, maxsize=100):
+        super().__init__(broker, channel, maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The event loop has already stopped
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Fan-out of events to subscribers living in this worker process."""
+
+    # publish() only fills in-process queues, so asgi.py calls it on the event loop
+    publish_blocks = False
+
+    def __init__(self):
+        self._subscribers = {}
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, subscription_class=Subscription):
+        subscription = subscription_class(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def subscribe_async(self, channel):
+        """subscribe() for a coroutine running on the current event loop."""
+        return self.subscribe(channel, AsyncSubscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def close(self):
+        # The worker is shutting down: wake every stream so it can end
+        with self._lock:
+            self.closed = True
+            subscribers = [s for channel in self._subscribers.values() for s in channel]
+        for subscription in subscribers:
+            subscription.put(None)
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+class RedisBroker(InProcessBroker):
+    """Relays events through Redis pub/sub so every worker process sees them."""
+
+    publish_blocks = True
+
+    def __init__(self, url=None, prefix='rms:'):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RedisBroker requires the redis package (pip install redis)')
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(prefix + '*')
+        self._thread = threading.Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def publish(self, channel, event):
+        self._redis.publish(self.prefix + channel, json.dumps(event, default=str))
+
+    def _listen(self):
+        for message in self._pubsub.listen():
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            self.deliver(channel[len(self.prefix):], json.loads(message['data']))
+
+
+def broker_from_env():
+    # EVENT_BROKER is "memory", "redis" or a "module:Class" path to a custom broker
+    name = os.getenv('EVENT_BROKER', 'memory')
+    if name == 'memory':
+        return InProcessBroker()
+    if name == 'redis':
+        return RedisBroker()
+    module_name, class_name = name.split(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def format_sse(event):
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,235 @@
+"""Streaming CSV/JSONL exports of orders, order lines and bills.
+
+Rows are read through an unbuffered cursor in batches, so MySQL streams the
+result set and memory stays flat however long the range is. Every dataset
+is ordered by its key, and `after` resumes an interrupted export right
+after the last key that was received.
+
+    python export.py bills --from 2025-04-01 --to 2026-03-31 --gzip -o bills.csv.gz
+    python export.py bills --from 2025-04-01 --to 2026-03-31 --gzip -o bills.csv.gz --resume
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+FORMATS = ('csv', 'jsonl')
+
+
+class Dataset:
+    def __init__(self, columns, key, query):
+        self.columns = columns
+        self.key = key
+        self.query = query
+
+    def parse_after(self, value):
+        """'12' or '12:5' -> a tuple matching self.key; raises ValueError."""
+        parts = [int(part) for part in str(value).split(':')]
+        if len(parts) != len(self.key):
+            raise ValueError(f"after must look like {':'.join(self.key)}")
+        return tuple(parts)
+
+    def key_of(self, row):
+        return ':'.join(str(row[column]) for column in self.key)
+
+
+DATASETS = {
+    'orders': Dataset(
+        ['order_id', 'time_stamp', 'cust_id', 'paid_status', 'bill_status'],
+        ['order_id'],
+        """
+            SELECT order_id, time_stamp, cust_id, paid_status, bill_status
+            FROM orders
+            WHERE time_stamp >= %s AND time_stamp < %s AND order_id > %s
+            ORDER BY order_id
+        """),
+    'order_lines': Dataset(
+        ['order_id', 'item_id', 'time_stamp', 'item_name', 'category', 'qty', 'item_price',
+         'order_status', 'chef_id'],
+        ['order_id', 'item_id'],
+        """
+            SELECT od.order_id, od.item_id, o.time_stamp, od.item_name, od.category, od.qty,
+                   od.unit_price AS item_price, od.order_status, od.chef_id
+            FROM order_details od
+            JOIN orders o ON o.order_id = od.order_id
+            WHERE o.time_stamp >= %s AND o.time_stamp < %s
+              AND (od.order_id > %s OR (od.order_id = %s AND od.item_id > %s))
+            ORDER BY od.order_id, od.item_id
+        """),
+    'bills': Dataset(
+        ['bill_id', 'order_id', 'time_stamp', 'tot_amt', 'tax', 'discount', 'final_amt',
+         'pay_mode', 'waiter_id'],
+        ['bill_id'],
+        """
+            SELECT b.bill_id, b.order_id, o.time_stamp, b.tot_amt, b.tax, b.discount,
+                   b.final_amt, b.pay_mode, b.waiter_id
+            FROM bill b
+            JOIN orders o ON o.order_id = b.order_id
+            WHERE o.time_stamp >= %s AND o.time_stamp < %s AND b.bill_id > %s
+            ORDER BY b.bill_id
+        """),
+}
+
+
+def export_rows(conn, dataset, start, end, after=None, batch=1000):
+    """Yield rows of `dataset` with start <= time_stamp < end, keyed after `after`."""
+    after = after or (0,) * len(dataset.key)
+    params = (start, end) + (after if len(after) == 1 else (after[0], after[0], after[1]))
+    cursor = conn.cursor(dictionary=True)
+    finished = False
+    try:
+        cursor.execute(dataset.query, params)
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+        finished = True
+    finally:
+        if finished:
+            cursor.close()
+        elif hasattr(conn, 'invalidate'):
+            # The rest of the result set is still on the wire
+            conn.invalidate()
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def encode(rows, dataset, fmt, header=True, chunk_size=64 * 1024):
+    """Turn rows into text chunks of roughly chunk_size characters."""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(buffer, lineterminator='\n')
+        if header:
+            writer.writerow(dataset.columns)
+    for row in rows:
+        if writer:
+            writer.writerow([_plain(row[column]) for column in dataset.columns])
+        else:
+            buffer.write(json.dumps({column: _plain(row[column]) for column in dataset.columns}))
+            buffer.write('\n')
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def date_range(start, end):
+    """Inclusive YYYY-MM-DD dates -> (start, end) datetimes with an exclusive end."""
+    start = datetime.strptime(start, '%Y-%m-%d')
+    end = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
+    return start, end
+
+
+def last_key(path, dataset, fmt, compressed):
+    """Key of the last complete row already written to path, or None.
+
+    A plain file is cut back to its last complete line so appending continues
+    cleanly; a gzip file is read through once, which fails if it was cut off
+    mid-member.
+    """
+    if not os.path.exists(path):
+        return None
+    last = None
+    if compressed:
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8', newline='') as existing:
+                for line in existing:
+                    last = line
+        except EOFError:
+            raise ValueError(f'{path} ends in a truncated gzip stream; restart it with --after')
+    else:
+        with open(path, 'r+b') as existing:
+            size = existing.seek(0, os.SEEK_END)
+            existing.seek(max(0, size - 64 * 1024))
+            tail = existing.read()
+            end = tail.rfind(b'\n')
+            existing.truncate(size - len(tail) + end + 1)
+            if end >= 0:
+                last = tail[:end].rsplit(b'\n', 1)[-1].decode('utf-8')
+    if not last or not last.strip():
+        return None
+    if fmt == 'csv':
+        values = next(csv.reader([last]))
+        if values == dataset.columns:
+            return None
+        row = dict(zip(dataset.columns, values))
+    else:
+        row = json.loads(last)
+    return dataset.parse_after(dataset.key_of(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dataset', choices=sorted(DATASETS))
+    parser.add_argument('--from', dest='start', required=True, help='first day, YYYY-MM-DD')
+    parser.add_argument('--to', dest='end', required=True, help='last day, YYYY-MM-DD')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--after', help='resume after this key (e.g. 1200 or 1200:7 for order_lines)')
+    parser.add_argument('--resume', action='store_true', help='continue after the last row already in --output')
+    parser.add_argument('-o', '--output', help='file to write (default stdout)')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from db import connect, db_config_from_env
+
+    dataset = DATASETS[args.dataset]
+    start, end = date_range(args.start, args.end)
+    after = dataset.parse_after(args.after) if args.after else None
+    header = True
+    if args.resume:
+        if not args.output:
+            parser.error('--resume needs --output')
+        try:
+            after = last_key(args.output, dataset, args.format, args.gzip) or after
+        except ValueError as e:
+            parser.error(str(e))
+        # The header is already in the file being resumed
+        header = not (os.path.exists(args.output) and os.path.getsize(args.output))
+
+    load_dotenv()
+    conn = connect(db_config_from_env())
+    try:
+        chunks = encode(export_rows(conn, dataset, start, end, after), dataset, args.format, header)
+        if args.output:
+            # Appending a new gzip member keeps a resumed .gz file valid
+            with open(args.output, 'ab' if args.resume else 'wb') as out:
+                for chunk in gzip_chunks(chunks) if args.gzip else chunks:
+                    out.write(chunk if args.gzip else chunk.encode('utf-8'))
+        elif args.gzip:
+            for chunk in gzip_chunks(chunks):
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import secrets
+import threading
+import time
+
+
+class Identity:
+    """Who is behind an employee session: their role ids and whether they are active."""
+
+    def __init__(self, emp_id, role, active=True, waiter_id=None, chef_id=None):
+        self.emp_id = emp_id
+        self.role = role
+        self.active = active
+        self.waiter_id = waiter_id
+        self.chef_id = chef_id
+        self.loaded_at = time.monotonic()
+
+
+IDENTITY_QUERY = """
+    SELECT e.emp_id, e.role, e.e_status, w.waiter_id, c.chef_id
+    FROM employee e
+    LEFT JOIN waiter w ON w.emp_id = e.emp_id
+    LEFT JOIN chef c ON c.emp_id = e.emp_id
+    WHERE e.emp_id = %s
+"""
+
+
+def identity_from_row(row):
+    if not row:
+        return None
+    return Identity(row['emp_id'], row['role'], (row.get('e_status') or 'active') == 'active',
+                    row['waiter_id'], row['chef_id'])
+
+
+def resolve_identity(cursor, emp_id):
+    cursor.execute(IDENTITY_QUERY, (emp_id,))
+    return identity_from_row(cursor.fetchone())
+
+
+class IdentityCache:
+    """Employee identities keyed by a random per-session key.
+
+    Entries expire after `ttl` seconds so a status change made through
+    another worker process is picked up; changes made here are applied
+    straight away with invalidate_employee().
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_key():
+        return secrets.token_urlsafe(16)
+
+    def get(self, key, emp_id):
+        with self._lock:
+            identity = self._entries.get(key)
+            if identity is None or identity.emp_id != emp_id or self._expired(identity):
+                self._entries.pop(key, None)
+                self._misses += 1
+                return None
+            self._hits += 1
+            return identity
+
+    def _expired(self, identity):
+        return time.monotonic() - identity.loaded_at > self.ttl
+
+    def put(self, key, identity):
+        with self._lock:
+            self._entries[key] = identity
+            # Sessions that ended without logging out are swept now and then
+            if len(self._entries) % 256 == 0:
+                for stale in [key for key, other in self._entries.items() if self._expired(other)]:
+                    del self._entries[stale]
+
+    def forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_employee(self, emp_id):
+        with self._lock:
+            for key in [key for key, identity in self._entries.items() if identity.emp_id == emp_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._entries), 'hits': self._hits, 'misses': self._misses,
+                    'ttl': self.ttl}
+
+
+def identity_cache_from_env():
+    return IdentityCache(ttl=float(os.getenv('IDENTITY_CACHE_TTL', 300)))
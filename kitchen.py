@@ -0,0 +1,176 @@
+import bisect
+import os
+import threading
+import time
+
+
+class KitchenLine:
+    def __init__(self, order_id, item_id, chef_id, qty, status, prep_time):
+        self.order_id = order_id
+        self.item_id = item_id
+        self.chef_id = chef_id
+        self.qty = qty
+        self.status = status
+        self.prep_time = prep_time or 0
+        self.latest_start = 0.0
+
+
+class KitchenQueue:
+    """Open order lines per chef, ordered by how soon they must be started.
+
+    An order is due `buffer` minutes after its longest dish could be ready,
+    so every dish lands together; a line must start by due - its prep_time,
+    and its slack is that latest start minus now. Lines for the same item_id
+    are grouped so a chef can cook them in one batch; each chef's groups sit
+    in a list kept sorted by their earliest latest-start, updated in place as
+    lines come and go instead of re-sorting a full query on every refresh.
+    """
+
+    def __init__(self, buffer_minutes=5, resync=60):
+        self.buffer_minutes = buffer_minutes
+        self.resync = resync
+        self._lines = {}
+        self._orders = {}
+        self._groups = {}
+        self._group_starts = {}
+        self._sorted = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def needs_load(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.resync
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def load(self, rows):
+        """rows: open lines with order_id, item_id, chef_id, qty, order_status, time_stamp, prep_time."""
+        with self._lock:
+            self._lines = {}
+            self._orders = {}
+            self._groups = {}
+            self._group_starts = {}
+            self._sorted = {}
+            for row in rows:
+                self._upsert(row['chef_id'], row['order_id'], row['item_id'], row['qty'],
+                             row['order_status'], row['prep_time'], row['time_stamp'].timestamp())
+            self._loaded_at = time.monotonic()
+
+    def upsert_line(self, chef_id, order_id, item_id, qty, status, prep_time, placed_at=None):
+        with self._lock:
+            self._upsert(chef_id, order_id, item_id, qty, status, prep_time, placed_at)
+
+    def update_line(self, order_id, item_id, qty=None, status=None):
+        with self._lock:
+            line = self._lines.get((order_id, item_id))
+            if line is None:
+                return
+            if qty is not None:
+                line.qty = qty
+            if status is not None:
+                line.status = status
+
+    def remove_line(self, order_id, item_id):
+        with self._lock:
+            self._remove(order_id, item_id)
+
+    def remove_order(self, order_id):
+        with self._lock:
+            order = self._orders.get(order_id)
+            for item_id in list(order['items']) if order else []:
+                self._remove(order_id, item_id)
+
+    def _upsert(self, chef_id, order_id, item_id, qty, status, prep_time, placed_at):
+        if chef_id is None:
+            return
+        key = (order_id, item_id)
+        line = self._lines.get(key)
+        if line is not None and line.chef_id != chef_id:
+            self._remove(order_id, item_id)
+            line = None
+        if line is None:
+            line = self._lines[key] = KitchenLine(order_id, item_id, chef_id, qty, status, prep_time)
+            self._groups.setdefault((chef_id, item_id), set()).add(key)
+        else:
+            line.qty, line.status, line.prep_time = qty, status, prep_time or 0
+        order = self._orders.setdefault(order_id, {'placed_at': placed_at or time.time(), 'items': set()})
+        order['items'].add(item_id)
+        self._reschedule(order_id)
+
+    def _remove(self, order_id, item_id):
+        line = self._lines.pop((order_id, item_id), None)
+        if line is None:
+            return
+        group = self._groups.get((line.chef_id, item_id))
+        if group is not None:
+            group.discard((order_id, item_id))
+            if not group:
+                del self._groups[(line.chef_id, item_id)]
+        order = self._orders.get(order_id)
+        if order is not None:
+            order['items'].discard(item_id)
+            if not order['items']:
+                del self._orders[order_id]
+        self._refresh_group(line.chef_id, item_id)
+        if order_id in self._orders:
+            self._reschedule(order_id)
+
+    def _reschedule(self, order_id):
+        # The order's due time follows its longest open dish
+        order = self._orders[order_id]
+        lines = [self._lines[(order_id, item_id)] for item_id in order['items']]
+        due = order['placed_at'] + (max(line.prep_time for line in lines) + self.buffer_minutes) * 60
+        for line in lines:
+            latest_start = due - line.prep_time * 60
+            if latest_start != line.latest_start:
+                line.latest_start = latest_start
+                self._refresh_group(line.chef_id, line.item_id)
+
+    def _refresh_group(self, chef_id, item_id):
+        members = self._groups.get((chef_id, item_id))
+        start = min(self._lines[key].latest_start for key in members) if members else None
+        old = self._group_starts.get((chef_id, item_id))
+        if start == old:
+            return
+        ordered = self._sorted.setdefault(chef_id, [])
+        if old is not None:
+            del ordered[bisect.bisect_left(ordered, (old, item_id))]
+        if start is None:
+            del self._group_starts[(chef_id, item_id)]
+        else:
+            self._group_starts[(chef_id, item_id)] = start
+            bisect.insort(ordered, (start, item_id))
+
+    def queue(self, chef_id, now=None):
+        """This chef's work, most urgent first, as JSON-ready groups of identical items."""
+        now = now or time.time()
+        groups = []
+        with self._lock:
+            for start, item_id in self._sorted.get(chef_id, []):
+                lines = sorted((self._lines[key] for key in self._groups[(chef_id, item_id)]),
+                               key=lambda line: line.latest_start)
+                groups.append({
+                    'item_id': item_id,
+                    'total_qty': sum(line.qty for line in lines),
+                    'prep_time': lines[0].prep_time,
+                    'slack_minutes': round((start - now) / 60, 1),
+                    'lines': [{
+                        'order_id': line.order_id,
+                        'qty': line.qty,
+                        'order_status': line.status,
+                        'slack_minutes': round((line.latest_start - now) / 60, 1),
+                        'due_at': round(line.latest_start + line.prep_time * 60),
+                    } for line in lines],
+                })
+        return groups
+
+    def stats(self):
+        with self._lock:
+            return {'lines': len(self._lines), 'orders': len(self._orders),
+                    'groups': len(self._groups), 'buffer_minutes': self.buffer_minutes}
+
+
+def kitchen_queue_from_env():
+    return KitchenQueue(buffer_minutes=float(os.getenv('KITCHEN_DUE_BUFFER', 5)),
+                        resync=float(os.getenv('KITCHEN_QUEUE_RESYNC', 60)))
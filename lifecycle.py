@@ -0,0 +1,228 @@
+"""Order line lifecycle: which status changes are allowed, and when each happened.
+
+Every change goes through apply_transition(), which checks it against
+TRANSITIONS, applies it with one UPDATE and appends one row per line to the
+`order_line_events` log in the same transaction. stage_latency() derives how
+long lines sit in each stage from that log. async_db.py runs the same
+statements (lock_lines_statement(), transition_statement(), RECORD_EVENTS)
+on an asyncio cursor.
+
+    python lifecycle.py report --from 2026-01-01 --to 2026-01-31 --by chef
+"""
+import argparse
+from datetime import date, timedelta
+
+from db import dialect_of, to_datetime
+
+ORDER_STATUSES = ('placed', 'cooking', 'cooked', 'delivered', 'billed')
+
+# Chefs may go straight from placed to cooked without marking cooking first
+TRANSITIONS = {
+    'placed': ('cooking', 'cooked'),
+    'cooking': ('cooked',),
+    'cooked': ('delivered',),
+    'delivered': ('billed',),
+    'billed': (),
+}
+
+# Lines only become billed when billing settles their bill
+WAITER_STATUSES = ('placed', 'cooking', 'cooked', 'delivered')
+
+MAX_BULK_LINES = 200
+
+# (name, status the line enters, status it leaves for)
+STAGES = [
+    ('placed_to_cooked', 'placed', 'cooked'),
+    ('cooked_to_delivered', 'cooked', 'delivered'),
+    ('delivered_to_billed', 'delivered', 'billed'),
+]
+GROUPINGS = ('item', 'chef', 'hour')
+
+
+def can_transition(current, new):
+    return new in TRANSITIONS.get(current, ())
+
+
+def sources(status):
+    """Statuses a line may be in to move to `status`."""
+    return tuple(current for current, targets in TRANSITIONS.items() if status in targets)
+
+
+RECORD_EVENTS = """
+    INSERT INTO order_line_events (order_id, item_id, chef_id, from_status, to_status)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+def lock_lines_statement(dialect, where):
+    return f"""
+        SELECT od.order_id, od.item_id, od.order_status, od.chef_id, od.qty,
+               s.table_id, s.waiter_id
+        FROM order_details od
+        JOIN orders o ON o.order_id = od.order_id
+        LEFT JOIN spots s ON s.cust_id = o.cust_id
+        WHERE {where}
+        {dialect.for_update()}
+    """
+
+
+def lock_lines(cursor, where, params):
+    """Order lines matching `where`, locked FOR UPDATE, with their spot's table and waiter."""
+    cursor.execute(lock_lines_statement(dialect_of(cursor), where), params)
+    return cursor.fetchall()
+
+
+def record_events(cursor, events):
+    """Append (order_id, item_id, chef_id, from_status, to_status) rows in one insert."""
+    if events:
+        cursor.executemany(RECORD_EVENTS, events)
+
+
+def split_transition(lines, status):
+    """(changed, rejected): the lines that may move to `status`, and why the others may not."""
+    changed = []
+    rejected = []
+    for line in lines:
+        if can_transition(line['order_status'], status):
+            changed.append(line)
+        else:
+            rejected.append({'order_id': line['order_id'], 'item_id': line['item_id'],
+                             'order_status': line['order_status'],
+                             'error': f"cannot go from {line['order_status']} to {status}"})
+    return changed, rejected
+
+
+def transition_statement(changed, status):
+    """(sql, params) moving the `changed` lines to `status` in one UPDATE."""
+    pairs = ', '.join(['(%s, %s)'] * len(changed))
+    allowed = ', '.join(['%s'] * len(sources(status)))
+    return f"""
+        UPDATE order_details
+        SET order_status = %s
+        WHERE order_status IN ({allowed}) AND (order_id, item_id) IN ({pairs})
+    """, (status, *sources(status), *[value for line in changed for value in (line['order_id'], line['item_id'])])
+
+
+def transition_events(changed, status):
+    return [(line['order_id'], line['item_id'], line.get('chef_id'), line['order_status'], status)
+            for line in changed]
+
+
+def apply_transition(cursor, lines, status):
+    """Move locked lines to `status` with one UPDATE and log the change.
+
+    lines: rows from lock_lines() (order_id, item_id, chef_id and their
+    current order_status) in the caller's transaction. Returns
+    (changed, rejected); rejected lines are left untouched.
+    """
+    changed, rejected = split_transition(lines, status)
+    if changed:
+        cursor.execute(*transition_statement(changed, status))
+        record_events(cursor, transition_events(changed, status))
+    return changed, rejected
+
+
+def parse_lines(raw):
+    """[{'order_id': .., 'item_id': ..}, ...] -> de-duplicated list of int pairs; raises ValueError."""
+    pairs = []
+    seen = set()
+    for line in raw or []:
+        pair = (int(line['order_id']), int(line['item_id']))
+        if pair not in seen:
+            seen.add(pair)
+            pairs.append(pair)
+    if len(pairs) > MAX_BULK_LINES:
+        raise ValueError(f'at most {MAX_BULK_LINES} lines per request')
+    return pairs
+
+
+def line_timelines(cursor, start, end):
+    """When each line placed between start and end (dates, inclusive) first entered each status."""
+    columns = ', '.join(f"MIN(CASE WHEN to_status = '{status}' THEN created_at END) AS {status}_at"
+                        for status in ORDER_STATUSES)
+    # Lines placed late on `end` may be billed days later
+    cursor.execute(f"""
+        SELECT order_id, item_id, MAX(chef_id) AS chef_id, {columns}
+        FROM order_line_events
+        WHERE created_at >= %s AND created_at < %s
+        GROUP BY order_id, item_id
+    """, (start, end + timedelta(days=2)))
+    timelines = []
+    for row in cursor.fetchall():
+        for status in ORDER_STATUSES:
+            row[f'{status}_at'] = to_datetime(row[f'{status}_at'])
+        if row['placed_at'] is not None and row['placed_at'].date() <= end:
+            timelines.append(row)
+    return timelines
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def stage_latency(timelines, by='item'):
+    """Minutes lines spent in each stage, grouped by item, chef or the hour the stage began.
+
+    Returns {stage: [{'key', 'lines', 'avg_minutes', 'p50_minutes', 'p90_minutes',
+    'max_minutes'}, ...]}, slowest average first. Lines still in a stage
+    are left out of it.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"by must be one of {', '.join(GROUPINGS)}")
+    report = {}
+    for name, entered, left in STAGES:
+        groups = {}
+        for line in timelines:
+            started, finished = line[f'{entered}_at'], line[f'{left}_at']
+            if started is None or finished is None or finished < started:
+                continue
+            key = {'item': line['item_id'], 'chef': line['chef_id'], 'hour': started.hour}[by]
+            groups.setdefault(key, []).append((finished - started).total_seconds() / 60)
+        rows = []
+        for key, minutes in groups.items():
+            minutes.sort()
+            rows.append({
+                'key': key,
+                'lines': len(minutes),
+                'avg_minutes': round(sum(minutes) / len(minutes), 1),
+                'p50_minutes': round(_percentile(minutes, 50), 1),
+                'p90_minutes': round(_percentile(minutes, 90), 1),
+                'max_minutes': round(minutes[-1], 1),
+            })
+        rows.sort(key=lambda row: row['avg_minutes'], reverse=True)
+        report[name] = rows
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-stage order line latency from the event log')
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                        default=date.today() - timedelta(days=6))
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--by', choices=GROUPINGS, default='item')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from db import connect, db_config_from_env
+
+    load_dotenv()
+    conn = connect(db_config_from_env())
+    cursor = conn.cursor(dictionary=True)
+    try:
+        timelines = line_timelines(cursor, args.start, args.end)
+    finally:
+        cursor.close()
+        conn.close()
+    report = stage_latency(timelines, args.by)
+    print(f'{len(timelines)} lines placed {args.start} to {args.end}')
+    for name, rows in report.items():
+        print(f'\n{name}')
+        print(f'  {args.by:>8s} {"lines":>7s} {"avg":>7s} {"p50":>7s} {"p90":>7s} {"max":>7s}')
+        for row in rows:
+            print(f"  {str(row['key']):>8s} {row['lines']:7d} {row['avg_minutes']:7.1f} "
+                  f"{row['p50_minutes']:7.1f} {row['p90_minutes']:7.1f} {row['max_minutes']:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+# Order in which categories are shown on the customer menu page
+CATEGORY_ORDER = ['Tiffin', 'Lunch', 'Pizza', 'Burger', 'Salad', 'Drinks']
+
+
+class MenuSnapshot:
+    """One immutable load of the menu table plus the views built from it."""
+
+    def __init__(self, version, rows, category_order=CATEGORY_ORDER):
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        # Same ordering as "ORDER BY category, item_name"
+        self.items = sorted(rows, key=lambda item: (item['category'].lower(), item['item_name'].lower()))
+        self.by_id = {item['item_id']: item for item in rows}
+
+        # Group available items by category in the specified order; any
+        # categories not in the predefined order follow in name order
+        self.categories = {category: [] for category in category_order}
+        for item in sorted(rows, key=lambda item: item['item_name'].lower()):
+            if not item['availability']:
+                continue
+            self.categories.setdefault(item['category'], []).append(item)
+
+
+class MenuCache:
+    def __init__(self, ttl=300, category_order=CATEGORY_ORDER):
+        self.ttl = ttl
+        self.category_order = list(category_order)
+        self.version = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, loader):
+        snapshot, version = self._cached()
+        if snapshot is None:
+            snapshot = self._keep(version, loader())
+        return snapshot
+
+    async def get_async(self, loader):
+        """get() with a coroutine loader, for the asyncio app."""
+        snapshot, version = self._cached()
+        if snapshot is None:
+            snapshot = self._keep(version, await loader())
+        return snapshot
+
+    def _cached(self):
+        # (fresh snapshot or None, version a new load would belong to)
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+                self.hits += 1
+                return snapshot, self.version
+            self.misses += 1
+            return None, self.version
+
+    def _keep(self, version, rows):
+        snapshot = MenuSnapshot(version, rows, self.category_order)
+        with self._lock:
+            # Only keep the load if no edit happened while it was running
+            if version == self.version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._snapshot = None
+
+    def stats(self):
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'version': self.version,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'cached': snapshot is not None,
+                'age': round(time.monotonic() - snapshot.loaded_at, 3) if snapshot else None,
+                'items': len(snapshot.items) if snapshot else 0,
+            }
+
+
+def menu_cache_from_env():
+    return MenuCache(ttl=float(os.getenv('MENU_CACHE_TTL', 300)))
@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger('rms.slow_query')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.duration = Histogram(REQUEST_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = 0.0
+        self.slowest_query = 0.0
+        self.errors = 0
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+
+class Metrics:
+    """Per-request wall time and SQL timings, exported in Prometheus text format."""
+
+    def __init__(self, slow_query_ms=200):
+        self.slow_query_seconds = slow_query_ms / 1000.0
+        self.endpoints = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app, pool=None):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        if pool is not None:
+            pool.query_listener = self.record_query
+        app.add_url_rule('/metrics', 'metrics', self.export)
+
+    def add_collector(self, collector):
+        # collector() returns an iterable of (name, type, help, value) gauges
+        self.collectors.append(collector)
+
+    def start_request(self):
+        g.request_stats = RequestStats()
+
+    def record_query(self, statement, seconds):
+        if not has_request_context() or 'request_stats' not in g:
+            return
+        stats = g.request_stats
+        stats.db_time += seconds
+        if statement is None:
+            return
+        stats.queries += 1
+        if seconds > stats.slowest_time:
+            stats.slowest_time = seconds
+            stats.slowest_statement = statement
+        if seconds >= self.slow_query_seconds:
+            slow_query_log.warning('%.1f ms %s %s', seconds * 1000, request.endpoint,
+                                   ' '.join(statement.split()))
+
+    def finish_request(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unmatched'
+        with self._lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = EndpointMetrics()
+            metrics.duration.observe(elapsed)
+            metrics.queries.observe(stats.queries)
+            metrics.db_time += stats.db_time
+            metrics.slowest_query = max(metrics.slowest_query, stats.slowest_time)
+            if response.status_code >= 500:
+                metrics.errors += 1
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'total;dur={elapsed * 1000:.1f}')
+        return response
+
+    def export(self):
+        lines = []
+
+        def histogram(name, help_text, attr):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, metrics in sorted(self.endpoints.items()):
+                hist = getattr(metrics, attr)
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {hist.total}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {hist.sum}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {hist.total}')
+
+        def per_endpoint(name, kind, help_text, attr):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for endpoint, metrics in sorted(self.endpoints.items()):
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {getattr(metrics, attr)}')
+
+        with self._lock:
+            histogram('rms_request_duration_seconds', 'Wall time per request.', 'duration')
+            histogram('rms_request_queries', 'SQL statements per request.', 'queries')
+            per_endpoint('rms_db_time_seconds_total', 'counter', 'Time spent in SQL statements and fetches.', 'db_time')
+            per_endpoint('rms_slowest_query_seconds', 'gauge', 'Slowest single SQL statement seen.', 'slowest_query')
+            per_endpoint('rms_request_errors_total', 'counter', 'Responses with a 5xx status.', 'errors')
+
+        for collector in self.collectors:
+            for name, kind, help_text, value in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
+def metrics_from_env():
+    slow_query_log_path = os.getenv('SLOW_QUERY_LOG')
+    if slow_query_log_path and not slow_query_log.handlers:
+        handler = logging.FileHandler(slow_query_log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_log.addHandler(handler)
+    return Metrics(slow_query_ms=float(os.getenv('SLOW_QUERY_MS', 200)))
@@ -0,0 +1,208 @@
+"""Versioned schema migrations on top of schema.sql.
+
+Each file in migrations/ named NNNN_description.py defines up(cursor) and
+down(cursor). Applied versions are recorded in `schema_migrations`.
+
+    python migrate.py status
+    python migrate.py up               # apply everything pending
+    python migrate.py up --to 1
+    python migrate.py down             # roll back the latest migration
+    python migrate.py down --to 0      # roll back everything
+
+Index changes go through add_index/drop_index, which use InnoDB online DDL
+(ALGORITHM=INPLACE, LOCK=NONE) so reads and writes carry on while the index
+builds, and give up quickly on the metadata lock instead of queueing behind
+a long transaction and stalling service traffic.
+"""
+import argparse
+import importlib.util
+import os
+import re
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+ER_LOCK_WAIT_TIMEOUT = 1205
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f'migration_{self.version:04d}', self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = re.match(r'^(\d{4})_(\w+)\.py$', filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2),
+                                        os.path.join(directory, filename)))
+    return migrations
+
+
+def ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    ensure_table(cursor)
+    cursor.execute('SELECT version FROM schema_migrations ORDER BY version')
+    return {row[0] if isinstance(row, tuple) else row['version'] for row in cursor.fetchall()}
+
+
+def index_exists(cursor, table, name):
+    cursor.execute("""
+        SELECT COUNT(*) AS found FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, name))
+    row = cursor.fetchone()
+    return bool(row[0] if isinstance(row, tuple) else row['found'])
+
+
+def column_exists(cursor, table, name):
+    cursor.execute("""
+        SELECT COUNT(*) AS found FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, name))
+    row = cursor.fetchone()
+    return bool(row[0] if isinstance(row, tuple) else row['found'])
+
+
+def online_ddl(cursor, statement, attempts=5, lock_wait=None):
+    """Run an ALTER without blocking service tables for long.
+
+    The DDL needs a brief exclusive metadata lock at its start and end; a
+    short lock_wait_timeout makes it back off and retry rather than hold up
+    every query queued behind it.
+    """
+    from mysql.connector import Error
+
+    lock_wait = lock_wait or int(os.getenv('MIGRATION_LOCK_WAIT', 5))
+    cursor.execute(f'SET SESSION lock_wait_timeout = {int(lock_wait)}')
+    for attempt in range(1, attempts + 1):
+        try:
+            cursor.execute(statement)
+            return
+        except Error as e:
+            if e.errno != ER_LOCK_WAIT_TIMEOUT or attempt == attempts:
+                raise
+            print(f'  metadata lock busy, retrying in {attempt * 2}s')
+            time.sleep(attempt * 2)
+
+
+def add_index(cursor, table, name, columns):
+    if index_exists(cursor, table, name):
+        print(f'  {table}.{name} already exists')
+        return
+    started = time.perf_counter()
+    online_ddl(cursor, f'ALTER TABLE {table} ADD INDEX {name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE')
+    print(f'  added {table}.{name} ({columns}) in {time.perf_counter() - started:.1f}s')
+
+
+def drop_index(cursor, table, name):
+    if not index_exists(cursor, table, name):
+        print(f'  {table}.{name} already gone')
+        return
+    online_ddl(cursor, f'ALTER TABLE {table} DROP INDEX {name}, ALGORITHM=INPLACE, LOCK=NONE')
+    print(f'  dropped {table}.{name}')
+
+
+def backfill(cursor, table, key, statement, batch=5000):
+    """Run an UPDATE over `table` in ranges of `key`, committing after each.
+
+    statement must filter on `key BETWEEN %s AND %s`; small transactions keep
+    row locks short so service traffic carries on during the backfill.
+    """
+    cursor.execute(f'SELECT MIN({key}) AS low, MAX({key}) AS high FROM {table}')
+    row = cursor.fetchone()
+    low, high = (row[0], row[1]) if isinstance(row, tuple) else (row['low'], row['high'])
+    if low is None:
+        return 0
+    started = time.perf_counter()
+    updated = 0
+    for start in range(low, high + 1, batch):
+        cursor.execute(statement, (start, start + batch - 1))
+        updated += cursor.rowcount
+        cursor.execute('COMMIT')
+    print(f'  backfilled {updated} {table} rows in {time.perf_counter() - started:.1f}s')
+    return updated
+
+
+def migrate(conn, target=None, direction='up', migrations=None):
+    """Apply (or roll back) migrations until `target`; returns the versions touched."""
+    migrations = migrations if migrations is not None else discover()
+    cursor = conn.cursor()
+    try:
+        applied = applied_versions(cursor)
+        if direction == 'up':
+            todo = [m for m in migrations
+                    if m.version not in applied and (target is None or m.version <= target)]
+        else:
+            if target is None:
+                # Just the latest one
+                versions = sorted(applied)
+                target = versions[-2] if len(versions) > 1 else 0
+            todo = [m for m in reversed(migrations) if m.version in applied and m.version > target]
+        for migration in todo:
+            print(f'{direction} {migration.version:04d} {migration.name}')
+            getattr(migration.module, direction)(cursor)
+            if direction == 'up':
+                cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                               (migration.version, migration.name))
+            else:
+                cursor.execute('DELETE FROM schema_migrations WHERE version = %s', (migration.version,))
+            conn.commit()
+        return [migration.version for migration in todo]
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['status', 'up', 'down'])
+    parser.add_argument('--to', type=int, help='target version')
+    args = parser.parse_args()
+
+    import mysql.connector
+    from dotenv import load_dotenv
+    from db import db_config_from_env
+
+    load_dotenv()
+    db_config = db_config_from_env()
+    if db_config.get('engine') == 'sqlite':
+        parser.error('migrations are MySQL-only, SQLite databases are created from schema_sqlite.sql')
+    conn = mysql.connector.connect(**db_config)
+    try:
+        if args.command == 'status':
+            cursor = conn.cursor()
+            applied = applied_versions(cursor)
+            cursor.close()
+            for migration in discover():
+                mark = 'applied' if migration.version in applied else 'pending'
+                print(f'{migration.version:04d} {migration.name:40s} {mark}')
+        else:
+            touched = migrate(conn, args.to, args.command)
+            if not touched:
+                print('nothing to do')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Indexes for the lookups the app runs on every request.
+
+spots.waiter_id and spots.cust_id already have the indexes InnoDB creates
+for their foreign keys, so spots only gains one on availability.
+"""
+from migrate import add_index, drop_index
+
+INDEXES = [
+    # Unpaid order for a customer: place_order_final, customer_dashboard, menu
+    ('orders', 'idx_orders_cust_paid', 'cust_id, paid_status'),
+    # Date-range reports and exports
+    ('orders', 'idx_orders_time_stamp', 'time_stamp'),
+    # A chef's open lines: chef_dashboard, scheduler backlog
+    ('order_details', 'idx_order_details_chef_status', 'chef_id, order_status'),
+    # Free spots at login
+    ('spots', 'idx_spots_availability', 'availability'),
+]
+
+
+def up(cursor):
+    for table, name, columns in INDEXES:
+        add_index(cursor, table, name, columns)
+
+
+def down(cursor):
+    for table, name, _ in reversed(INDEXES):
+        drop_index(cursor, table, name)
@@ -0,0 +1,24 @@
+"""Append-only log of order line status changes, read by the stage latency report.
+
+No foreign keys: the log outlives removed lines and stays cheap to append to.
+"""
+
+
+def up(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_line_events (
+            event_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+            order_id INT NOT NULL,
+            item_id INT NOT NULL,
+            chef_id INT,
+            from_status ENUM('placed', 'cooking', 'cooked', 'delivered', 'billed'),
+            to_status ENUM('placed', 'cooking', 'cooked', 'delivered', 'billed') NOT NULL,
+            created_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+            KEY idx_order_line_events_created (created_at),
+            KEY idx_order_line_events_line (order_id, item_id)
+        )
+    """)
+
+
+def down(cursor):
+    cursor.execute('DROP TABLE IF EXISTS order_line_events')
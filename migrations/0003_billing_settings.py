@@ -0,0 +1,34 @@
+"""Billing settings and the loyalty points a customer asks to redeem.
+
+The admin settings page has always read and written a `settings` row; this
+creates it with the rates billing used to hard-code (18% tax, one point per
+₹10). orders.redeem_points holds the points chosen when the bill is
+requested, until the bill is settled.
+"""
+from migrate import column_exists, online_ddl
+
+
+def up(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            setting_id INT PRIMARY KEY AUTO_INCREMENT,
+            tax_rate DECIMAL(5,2) NOT NULL DEFAULT 18.00,
+            points_per_rupee DECIMAL(6,2) NOT NULL DEFAULT 0.10,
+            rupee_per_point DECIMAL(6,2) NOT NULL DEFAULT 1.00,
+            min_points_redemption INT NOT NULL DEFAULT 100,
+            total_tables INT NOT NULL DEFAULT 20,
+            restaurant_name VARCHAR(100) NOT NULL DEFAULT 'Restaurant',
+            restaurant_address VARCHAR(255) NOT NULL DEFAULT '',
+            restaurant_phone VARCHAR(15) NOT NULL DEFAULT ''
+        )
+    """)
+    cursor.execute('INSERT INTO settings (tax_rate) SELECT 18.00 FROM DUAL WHERE NOT EXISTS (SELECT 1 FROM settings)')
+    if not column_exists(cursor, 'orders', 'redeem_points'):
+        online_ddl(cursor, 'ALTER TABLE orders ADD COLUMN redeem_points INT NOT NULL DEFAULT 0, '
+                           'ALGORITHM=INPLACE, LOCK=NONE')
+
+
+def down(cursor):
+    if column_exists(cursor, 'orders', 'redeem_points'):
+        online_ddl(cursor, 'ALTER TABLE orders DROP COLUMN redeem_points, ALGORITHM=INPLACE, LOCK=NONE')
+    cursor.execute('DROP TABLE IF EXISTS settings')
@@ -0,0 +1,36 @@
+"""Snapshot of each order line's name, category and unit price at order time.
+
+Bills, reports and exports read these instead of joining `menu`, so a later
+price edit no longer changes open bills or past revenue. Existing lines are
+backfilled from the current menu, which is the best record there is of what
+they were charged.
+"""
+from migrate import backfill, column_exists, online_ddl
+
+COLUMNS = [
+    ('item_name', 'VARCHAR(100)'),
+    ('category', 'VARCHAR(50)'),
+    ('unit_price', 'DECIMAL(10,2)'),
+]
+
+
+def up(cursor):
+    missing = [(name, kind) for name, kind in COLUMNS if not column_exists(cursor, 'order_details', name)]
+    if missing:
+        online_ddl(cursor, 'ALTER TABLE order_details '
+                           + ', '.join(f'ADD COLUMN {name} {kind}' for name, kind in missing)
+                           + ', ALGORITHM=INPLACE, LOCK=NONE')
+    backfill(cursor, 'order_details', 'order_id', """
+        UPDATE order_details od
+        JOIN menu m ON m.item_id = od.item_id
+        SET od.item_name = m.item_name, od.category = m.category, od.unit_price = m.item_price
+        WHERE od.order_id BETWEEN %s AND %s AND od.unit_price IS NULL
+    """)
+
+
+def down(cursor):
+    present = [name for name, _ in COLUMNS if column_exists(cursor, 'order_details', name)]
+    if present:
+        online_ddl(cursor, 'ALTER TABLE order_details '
+                           + ', '.join(f'DROP COLUMN {name}' for name in present)
+                           + ', ALGORITHM=INPLACE, LOCK=NONE')
@@ -0,0 +1,23 @@
+"""Loyalty points each bill earned, as price_bill() worked them out.
+
+Rebuilding the daily sales rollups sums these instead of re-deriving points
+from the amount paid. Existing bills are backfilled with the current
+points_per_rupee, which is the best record there is of what they earned.
+"""
+from migrate import backfill, column_exists, online_ddl
+
+
+def up(cursor):
+    if not column_exists(cursor, 'bill', 'points_earned'):
+        online_ddl(cursor, 'ALTER TABLE bill ADD COLUMN points_earned INT, ALGORITHM=INPLACE, LOCK=NONE')
+    backfill(cursor, 'bill', 'bill_id', """
+        UPDATE bill b
+        CROSS JOIN (SELECT points_per_rupee FROM settings ORDER BY setting_id LIMIT 1) s
+        SET b.points_earned = FLOOR(b.final_amt * s.points_per_rupee)
+        WHERE b.bill_id BETWEEN %s AND %s AND b.points_earned IS NULL
+    """)
+
+
+def down(cursor):
+    if column_exists(cursor, 'bill', 'points_earned'):
+        online_ddl(cursor, 'ALTER TABLE bill DROP COLUMN points_earned, ALGORITHM=INPLACE, LOCK=NONE')
@@ -0,0 +1,23 @@
+"""The waitlist queue, shared by every worker process.
+
+ticket_id orders the queue; table_id is set once a freed spot has been
+handed to the customer and cleared again when they pick it up.
+"""
+
+
+def up(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS waitlist (
+            ticket_id INT PRIMARY KEY AUTO_INCREMENT,
+            cust_id INT NOT NULL,
+            polled_at DATETIME(3) NOT NULL,
+            table_id INT,
+            UNIQUE KEY uq_waitlist_cust (cust_id),
+            KEY idx_waitlist_polled (polled_at),
+            FOREIGN KEY (cust_id) REFERENCES customer(cust_id) ON DELETE CASCADE
+        )
+    """)
+
+
+def down(cursor):
+    cursor.execute('DROP TABLE IF EXISTS waitlist')
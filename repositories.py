@@ -0,0 +1,424 @@
+"""Data access for the app's aggregates: customers, spots, menu, orders, bills and employees.
+
+Each repository wraps a cursor borrowed by the caller, so the caller still
+decides which statements share a transaction, and runs the same statements
+the routes used to run inline. The SQL is written once for MySQL and SQLite;
+the few clauses that differ come from the cursor's dialect (see db.py).
+
+Methods that just return what _one(), _all(), _insert() or _many() return
+also run on an asyncio cursor: the Async* repositories in async_db.py make
+those four coroutines, so the same statements serve both apps.
+"""
+from db import dialect_of
+
+
+class Repository:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.dialect = dialect_of(cursor)
+
+    def _one(self, sql, params=None):
+        self.cursor.execute(sql, params)
+        return self.cursor.fetchone()
+
+    def _all(self, sql, params=None, into=None):
+        # into: builds the return value from the rows
+        self.cursor.execute(sql, params)
+        rows = self.cursor.fetchall()
+        return into(rows) if into else rows
+
+    def _insert(self, sql, params):
+        self.cursor.execute(sql, params)
+        return self.cursor.lastrowid
+
+    def _many(self, sql, seq_params):
+        self.cursor.executemany(sql, seq_params)
+
+
+class CustomerRepository(Repository):
+    def get(self, cust_id):
+        return self._one('SELECT * FROM customer WHERE cust_id = %s', (cust_id,))
+
+    def by_phone(self, phone):
+        return self._one('SELECT * FROM customer WHERE c_phone = %s', (phone,))
+
+    def create(self, name, phone, loyal_pts=100):
+        self.cursor.execute('INSERT INTO customer (c_name, c_phone, loyal_pts) VALUES (%s, %s, %s)',
+                            (name, phone, loyal_pts))
+        return self.cursor.lastrowid
+
+    def settle_points(self, cust_id, redeemed, earned):
+        self.cursor.execute("""
+            UPDATE customer
+            SET loyal_pts = loyal_pts - %s + %s
+            WHERE cust_id = %s
+        """, (redeemed, earned, cust_id))
+
+
+class SpotRepository(Repository):
+    def for_customer(self, cust_id):
+        return self._one('SELECT * FROM spots WHERE cust_id = %s', (cust_id,))
+
+    def for_waiter(self, table_id, waiter_id):
+        """A spot with its seated customer, if it is assigned to waiter_id."""
+        return self._one("""
+            SELECT s.*, c.c_name, c.c_phone, c.loyal_pts
+            FROM spots s
+            LEFT JOIN customer c ON s.cust_id = c.cust_id
+            WHERE s.table_id = %s AND s.waiter_id = %s
+        """, (table_id, waiter_id))
+
+    def floor(self, waiter_id):
+        """One row per line of each open order at the waiter's spots (spots without one appear once)."""
+        return self._all("""
+            SELECT s.table_id, s.availability, s.cust_id, c.c_name, c.c_phone, c.loyal_pts,
+                   o.order_id, o.paid_status, o.bill_status,
+                   od.item_id, od.order_status, od.chef_id, od.qty,
+                   od.item_name, od.category, od.unit_price AS item_price
+            FROM spots s
+            LEFT JOIN customer c ON s.cust_id = c.cust_id
+            LEFT JOIN orders o ON s.cust_id = o.cust_id AND o.paid_status = 0
+            LEFT JOIN order_details od ON od.order_id = o.order_id
+            WHERE s.waiter_id = %s
+            ORDER BY s.table_id, o.order_id
+        """, (waiter_id,))
+
+    def assign_unclaimed(self, waiter_id, count):
+        """Give waiter_id up to `count` spots nobody serves yet; returns how many they got."""
+        # UPDATE ... LIMIT is MySQL-only, so pick the spots first
+        table_ids = [row['table_id'] for row in self._all(
+            'SELECT table_id FROM spots WHERE waiter_id IS NULL ORDER BY table_id LIMIT %s', (count,))]
+        if not table_ids:
+            return 0
+        self.cursor.execute(f"""
+            UPDATE spots
+            SET waiter_id = %s
+            WHERE waiter_id IS NULL AND table_id IN ({', '.join(['%s'] * len(table_ids))})
+        """, (waiter_id, *table_ids))
+        return self.cursor.rowcount
+
+    def release(self, table_id):
+        self.cursor.execute("""
+            UPDATE spots
+            SET availability = 1, cust_id = NULL
+            WHERE table_id = %s
+        """, (table_id,))
+
+
+class MenuRepository(Repository):
+    def all(self):
+        return self._all('SELECT * FROM menu')
+
+    def get(self, item_id):
+        return self._one('SELECT * FROM menu WHERE item_id = %s', (item_id,))
+
+    def add(self, item_name, category, item_price, prep_time, allergen, description, availability, image_url):
+        self.cursor.execute("""
+            INSERT INTO menu (item_name, category, item_price, prep_time, allergen, description, availability, image_url)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (item_name, category, item_price, prep_time, allergen, description, availability, image_url))
+        return self.cursor.lastrowid
+
+    def update(self, item_id, item_name, category, item_price, prep_time, allergen, description, availability):
+        self.cursor.execute("""
+            UPDATE menu
+            SET item_name = %s, category = %s, item_price = %s, prep_time = %s,
+                allergen = %s, description = %s, availability = %s
+            WHERE item_id = %s
+        """, (item_name, category, item_price, prep_time, allergen, description, availability, item_id))
+
+    def availability(self, item_id):
+        return self._one('SELECT availability FROM menu WHERE item_id = %s', (item_id,))
+
+    def set_availability(self, item_id, available):
+        self.cursor.execute('UPDATE menu SET availability = %s WHERE item_id = %s', (available, item_id))
+
+    def toggle(self, item_id):
+        self.cursor.execute('UPDATE menu SET availability = NOT availability WHERE item_id = %s', (item_id,))
+
+
+class OrderRepository(Repository):
+    def current(self, cust_id):
+        """The customer's latest unpaid order."""
+        return self._one("""
+            SELECT o.order_id, o.time_stamp, o.paid_status
+            FROM orders o
+            WHERE o.cust_id = %s AND o.paid_status = FALSE
+            ORDER BY o.time_stamp DESC
+            LIMIT 1
+        """, (cust_id,))
+
+    def unpaid(self, cust_id, lock=False):
+        return self._one(f"""
+            SELECT order_id, time_stamp FROM orders
+            WHERE cust_id = %s AND paid_status = FALSE
+            {self.dialect.for_update() if lock else ''}
+        """, (cust_id,))
+
+    def owned(self, order_id, cust_id):
+        return self._one('SELECT order_id FROM orders WHERE order_id = %s AND cust_id = %s', (order_id, cust_id))
+
+    def owned_unpaid(self, order_id, cust_id):
+        return self._one("""
+            SELECT cust_id FROM orders
+            WHERE order_id = %s AND cust_id = %s AND paid_status = FALSE
+        """, (order_id, cust_id))
+
+    def seated(self, order_id, cust_id):
+        """The customer's unpaid order with the spot they are seated at."""
+        return self._one("""
+            SELECT o.order_id, o.cust_id, o.bill_status, s.table_id, s.waiter_id
+            FROM orders o
+            JOIN spots s ON o.cust_id = s.cust_id
+            WHERE o.order_id = %s AND o.cust_id = %s AND o.paid_status = 0
+        """, (order_id, cust_id))
+
+    def lock_for_bill(self, order_id, cust_id=None, waiter_id=None):
+        """An order about to be paid, locked: unpaid and the customer's, or bill requested at the waiter's spot."""
+        if waiter_id is not None:
+            where, owner = "s.waiter_id = %s AND o.bill_status = 'requested'", waiter_id
+        else:
+            where, owner = 'o.cust_id = %s AND o.paid_status = 0', cust_id
+        return self._one(f"""
+            SELECT o.order_id, o.cust_id, DATE(o.time_stamp) AS order_date, s.table_id, s.waiter_id
+            FROM orders o
+            JOIN spots s ON o.cust_id = s.cust_id
+            WHERE o.order_id = %s AND {where}
+            {self.dialect.for_update()}
+        """, (order_id, owner))
+
+    def create(self, cust_id):
+        return self._insert('INSERT INTO orders (cust_id) VALUES (%s)', (cust_id,))
+
+    def delete(self, order_id):
+        self.cursor.execute('DELETE FROM orders WHERE order_id = %s', (order_id,))
+
+    def lines(self, order_id):
+        return self._all("""
+            SELECT od.*, od.unit_price AS item_price
+            FROM order_details od
+            WHERE od.order_id = %s
+        """, (order_id,))
+
+    def lines_with_chef(self, order_id):
+        return self._all("""
+            SELECT od.*, od.unit_price AS item_price, e.e_name as chef_name
+            FROM order_details od
+            LEFT JOIN chef ch ON ch.chef_id = od.chef_id
+            LEFT JOIN employee e ON e.emp_id = ch.emp_id
+            WHERE od.order_id = %s
+        """, (order_id,))
+
+    def quantities(self, order_id):
+        return self._all("""
+            SELECT od.item_id, od.qty
+            FROM order_details od
+            WHERE od.order_id = %s
+        """, (order_id,), into=lambda rows: {row['item_id']: row['qty'] for row in rows})
+
+    def line(self, order_id, item_id):
+        return self._one("""
+            SELECT qty, order_status, chef_id FROM order_details
+            WHERE order_id = %s AND item_id = %s
+        """, (order_id, item_id))
+
+    def lines_for_items(self, order_id, item_ids):
+        return self._all(f"""
+            SELECT item_id, qty, order_status, chef_id FROM order_details
+            WHERE order_id = %s AND item_id IN ({', '.join(['%s'] * len(item_ids))})
+        """, (order_id, *item_ids))
+
+    def set_quantity(self, order_id, item_id, qty):
+        self.cursor.execute("""
+            UPDATE order_details
+            SET qty = %s
+            WHERE order_id = %s AND item_id = %s
+        """, (qty, order_id, item_id))
+
+    def add_line_at_menu_price(self, order_id, item_id, qty):
+        self.cursor.execute("""
+            INSERT INTO order_details (order_id, item_id, qty, order_status, item_name, category, unit_price)
+            SELECT %s, item_id, %s, 'placed', item_name, category, item_price FROM menu WHERE item_id = %s
+        """, (order_id, qty, item_id))
+
+    def upsert_lines(self, lines):
+        """(order_id, item_id, qty, chef_id, item_name, category, unit_price) rows in one statement.
+
+        New lines are placed; lines already on the order only take the new qty.
+        """
+        return self._many(f"""
+            INSERT INTO order_details (order_id, item_id, qty, order_status, chef_id,
+                                       item_name, category, unit_price)
+            VALUES (%s, %s, %s, 'placed', %s, %s, %s, %s)
+            {self.dialect.upsert('order_id', 'item_id')} qty = {self.dialect.inserted('qty')}
+        """, lines)
+
+    def remove_line(self, order_id, item_id):
+        self.cursor.execute("""
+            DELETE FROM order_details
+            WHERE order_id = %s AND item_id = %s
+        """, (order_id, item_id))
+
+    def line_count(self, order_id):
+        return self._one('SELECT COUNT(*) as count FROM order_details WHERE order_id = %s', (order_id,))['count']
+
+    def status_counts(self, order_id):
+        """Total, delivered and billed line counts."""
+        return self._one("""
+            SELECT COUNT(*) as total,
+                   SUM(CASE WHEN order_status = 'delivered' THEN 1 ELSE 0 END) as delivered,
+                   SUM(CASE WHEN order_status = 'billed' THEN 1 ELSE 0 END) as billed
+            FROM order_details
+            WHERE order_id = %s
+        """, (order_id,))
+
+    def request_bill(self, order_id, redeem_points):
+        self.cursor.execute("""
+            UPDATE orders
+            SET bill_status = 'requested', redeem_points = %s
+            WHERE order_id = %s
+        """, (redeem_points, order_id))
+
+    def mark_paid(self, order_id, redeem_points):
+        self.cursor.execute("""
+            UPDATE orders
+            SET paid_status = 1, bill_status = 'paid', redeem_points = %s
+            WHERE order_id = %s
+        """, (redeem_points, order_id))
+
+    def close(self, order_id):
+        self.cursor.execute('UPDATE orders SET paid_status = TRUE WHERE order_id = %s', (order_id,))
+
+    def recent_lines(self, limit):
+        return self._all("""
+            SELECT o.order_id, c.c_name, o.time_stamp, od.order_status
+            FROM orders o
+            JOIN customer c ON o.cust_id = c.cust_id
+            JOIN order_details od ON o.order_id = od.order_id
+            ORDER BY o.time_stamp DESC
+            LIMIT %s
+        """, (limit,))
+
+    def kitchen_lines(self):
+        """Open lines with a chef, with when their order was placed and their prep_time."""
+        return self._all("""
+            SELECT od.order_id, od.item_id, od.chef_id, od.qty, od.order_status,
+                   o.time_stamp, m.prep_time
+            FROM order_details od
+            JOIN orders o ON o.order_id = od.order_id
+            JOIN menu m ON m.item_id = od.item_id
+            WHERE od.order_status IN ('placed', 'cooking') AND od.chef_id IS NOT NULL
+        """)
+
+    def chef_backlog(self):
+        """{chef_id: outstanding prep minutes}."""
+        return self._all("""
+            SELECT od.chef_id, SUM(m.prep_time * od.qty) as work
+            FROM order_details od
+            JOIN menu m ON od.item_id = m.item_id
+            WHERE od.order_status IN ('placed', 'cooking')
+            GROUP BY od.chef_id
+        """, into=lambda rows: {row['chef_id']: row['work'] for row in rows})
+
+
+class BillRepository(Repository):
+    def create(self, order_id, bill, pay_mode, waiter_id):
+        """Record a priced billing.Bill."""
+        self.cursor.execute("""
+            INSERT INTO bill (tot_amt, tax, discount, final_amt, pay_mode, order_id, waiter_id, points_earned)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (bill.subtotal, bill.tax, bill.discount, bill.total, pay_mode, order_id, waiter_id,
+              bill.points_earned))
+        return self.cursor.lastrowid
+
+    def settings(self):
+        return self._one('SELECT * FROM settings ORDER BY setting_id LIMIT 1')
+
+    def update_settings(self, **values):
+        self.cursor.execute(f"UPDATE settings SET {', '.join(f'{column} = %s' for column in values)}",
+                            tuple(values.values()))
+
+    def sales_since(self, since):
+        """Totals from the daily rollups for sale_date >= since."""
+        return self._one("""
+            SELECT
+                COALESCE(SUM(bills), 0) as total_orders,
+                COALESCE(SUM(revenue), 0) as total_sales,
+                COALESCE(SUM(revenue) / NULLIF(SUM(bills), 0), 0) as avg_order_value,
+                COALESCE(SUM(loyalty_points), 0) as total_loyalty_points
+            FROM sales_daily
+            WHERE sale_date >= %s
+        """, (since,))
+
+    def top_items_since(self, since, limit):
+        return self._all("""
+            SELECT
+                item_id,
+                category,
+                SUM(qty) as quantity_sold,
+                SUM(revenue) as revenue
+            FROM sales_daily_items
+            WHERE sale_date >= %s
+            GROUP BY item_id, category
+            ORDER BY quantity_sold DESC
+            LIMIT %s
+        """, (since, limit))
+
+    def category_sales_since(self, since):
+        return self._all("""
+            SELECT
+                category,
+                SUM(qty) as items_sold,
+                SUM(revenue) as revenue
+            FROM sales_daily_items
+            WHERE sale_date >= %s
+            GROUP BY category
+            ORDER BY revenue DESC
+        """, (since,))
+
+
+class EmployeeRepository(Repository):
+    def login(self, phone, password):
+        return self._one('SELECT * FROM employee WHERE e_phone = %s AND passwd = %s', (phone, password))
+
+    def by_phone(self, phone):
+        return self._one('SELECT * FROM employee WHERE e_phone = %s', (phone,))
+
+    def create(self, name, phone, role, password, salary, specialization='General'):
+        """Add an employee, with their waiter or chef row; returns emp_id."""
+        self.cursor.execute("""
+            INSERT INTO employee (e_name, e_phone, role, passwd, salary)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (name, phone, role, password, salary))
+        emp_id = self.cursor.lastrowid
+        if role == 'waiter':
+            self.cursor.execute('INSERT INTO waiter (emp_id) VALUES (%s)', (emp_id,))
+        elif role == 'chef':
+            self.cursor.execute('INSERT INTO chef (emp_id, specialization) VALUES (%s, %s)',
+                                (emp_id, specialization))
+        return emp_id
+
+    def counts_by_role(self):
+        return self._all('SELECT role, COUNT(*) as count FROM employee GROUP BY role')
+
+    def directory(self):
+        return self._all("""
+            SELECT emp_id as employee_id, e_name as full_name, e_phone as phone,
+                   role, e_status as is_active, salary
+            FROM employee
+            ORDER BY role, e_name
+        """)
+
+    def status(self, emp_id):
+        return self._one('SELECT e_status FROM employee WHERE emp_id = %s', (emp_id,))
+
+    def set_status(self, emp_id, status):
+        self.cursor.execute('UPDATE employee SET e_status = %s WHERE emp_id = %s', (status, emp_id))
+
+    def chefs(self):
+        """Every chef with their specialization and employee status."""
+        return self._all("""
+            SELECT c.chef_id, c.specialization, e.e_status
+            FROM chef c
+            LEFT JOIN employee e ON c.emp_id = e.emp_id
+        """)
@@ -0,0 +1,109 @@
+"""Daily sales rollups, kept up to date as bills are paid.
+
+`sales_daily_items` holds one row per day and menu item, `sales_daily` one
+row per day. Both are upserted inside the transaction that pays a bill, so
+reports only ever read a few hundred rows however large `order_details`
+grows. `python sales_rollup.py rebuild` recomputes them from history.
+"""
+import argparse
+from decimal import Decimal, ROUND_HALF_UP
+
+from db import dialect_of
+
+CENTS = Decimal('0.01')
+
+
+def order_lines(cursor, order_id):
+    # Charged price of every line of an order, in the same units as the bill
+    cursor.execute("""
+        SELECT od.item_id, od.category, od.qty, od.unit_price * od.qty AS revenue
+        FROM order_details od
+        WHERE od.order_id = %s
+    """, (order_id,))
+    return cursor.fetchall()
+
+
+def record_sale(cursor, sale_date, lines, bill):
+    """Add one paid billing.Bill to the rollups; call inside the bill's transaction."""
+    if not lines:
+        return
+    rows = []
+    revenue_total = Decimal('0')
+    for line in lines:
+        # Already exact on MySQL; SQLite computes unit_price * qty as a float
+        revenue = Decimal(str(line['revenue'] or 0)).quantize(CENTS, rounding=ROUND_HALF_UP)
+        # The bill's tax, charged after any loyalty discount, split by revenue as rebuild() does
+        tax = Decimal('0')
+        if bill.subtotal:
+            tax = (revenue * bill.tax / bill.subtotal).quantize(CENTS, rounding=ROUND_HALF_UP)
+        revenue_total += revenue
+        rows.append((sale_date, line['item_id'], line['category'], line['qty'], revenue, tax))
+
+    dialect = dialect_of(cursor)
+    cursor.executemany(f"""
+        INSERT INTO sales_daily_items (sale_date, item_id, category, qty, revenue, bills, tax)
+        VALUES (%s, %s, %s, %s, %s, 1, %s)
+        {dialect.upsert('sale_date', 'item_id')}
+            qty = qty + {dialect.inserted('qty')},
+            revenue = revenue + {dialect.inserted('revenue')},
+            bills = bills + 1,
+            tax = tax + {dialect.inserted('tax')}
+    """, rows)
+    cursor.execute(f"""
+        INSERT INTO sales_daily (sale_date, bills, revenue, tax, loyalty_points)
+        VALUES (%s, 1, %s, %s, %s)
+        {dialect.upsert('sale_date')}
+            bills = bills + 1,
+            revenue = revenue + {dialect.inserted('revenue')},
+            tax = tax + {dialect.inserted('tax')},
+            loyalty_points = loyalty_points + {dialect.inserted('loyalty_points')}
+    """, (sale_date, revenue_total, bill.tax, bill.points_earned))
+
+
+def rebuild(cursor):
+    """Recompute both rollups from every billed order."""
+    cursor.execute('DELETE FROM sales_daily_items')
+    cursor.execute('DELETE FROM sales_daily')
+    cursor.execute("""
+        INSERT INTO sales_daily_items (sale_date, item_id, category, qty, revenue, bills, tax)
+        SELECT DATE(o.time_stamp), od.item_id, od.category, SUM(od.qty),
+               SUM(od.qty * od.unit_price), COUNT(DISTINCT o.order_id),
+               SUM(ROUND(od.qty * od.unit_price * b.tax / NULLIF(b.tot_amt, 0), 2))
+        FROM bill b
+        JOIN orders o ON o.order_id = b.order_id
+        JOIN order_details od ON od.order_id = o.order_id
+        GROUP BY DATE(o.time_stamp), od.item_id, od.category
+    """)
+    cursor.execute("""
+        INSERT INTO sales_daily (sale_date, bills, revenue, tax, loyalty_points)
+        SELECT DATE(o.time_stamp), COUNT(*), SUM(b.tot_amt), SUM(b.tax), SUM(b.points_earned)
+        FROM bill b
+        JOIN orders o ON o.order_id = b.order_id
+        GROUP BY DATE(o.time_stamp)
+    """)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['rebuild'])
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from db import connect, db_config_from_env
+
+    load_dotenv()
+    conn = connect(db_config_from_env())
+    cursor = conn.cursor()
+    try:
+        if args.command == 'rebuild':
+            rebuild(cursor)
+            conn.commit()
+            cursor.execute('SELECT COUNT(*) FROM sales_daily')
+            print(f'Rebuilt sales rollups for {cursor.fetchone()[0]} days')
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# order_details statuses that still need kitchen time
+OPEN_STATUSES = ('placed', 'cooking')
+
+
+class ChefState:
+    def __init__(self, chef_id, specialization=None, active=True, work=0):
+        self.chef_id = chef_id
+        self.specialization = (specialization or '').strip().lower()
+        self.active = active
+        self.work = work
+
+
+class ChefScheduler:
+    """Assigns order lines to the active chef with the least outstanding prep work.
+
+    Each chef's backlog (sum of prep_time * qty over their open lines) lives in
+    memory and is indexed by a heap, so picking a chef is O(log chefs). Heap
+    entries are never updated in place; a changed backlog pushes a new entry
+    and stale ones are skipped when they reach the top.
+    """
+
+    def __init__(self, match_specialization=False, resync=60):
+        self.match_specialization = match_specialization
+        self.resync = resync
+        self._chefs = {}
+        self._heaps = {}
+        self._counter = itertools.count()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self, chefs, backlog):
+        """chefs: rows with chef_id, specialization, e_status; backlog: {chef_id: work}."""
+        with self._lock:
+            self._chefs = {}
+            self._heaps = {}
+            for chef in chefs:
+                state = ChefState(chef['chef_id'], chef.get('specialization'),
+                                  (chef.get('e_status') or 'active') == 'active',
+                                  int(backlog.get(chef['chef_id'], 0)))
+                self._chefs[state.chef_id] = state
+                self._push(state)
+            self._loaded_at = time.monotonic()
+
+    def needs_load(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.resync
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _push(self, state):
+        if not state.active:
+            return
+        entry = (state.work, next(self._counter), state.chef_id)
+        heapq.heappush(self._heaps.setdefault(None, []), entry)
+        if state.specialization:
+            heapq.heappush(self._heaps.setdefault(state.specialization, []), entry)
+        # Drop stale entries once they dominate the heap
+        heap = self._heaps[None]
+        if len(heap) > 4 * len(self._chefs) + 16:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heaps = {}
+        for state in self._chefs.values():
+            if state.active:
+                entry = (state.work, next(self._counter), state.chef_id)
+                self._heaps.setdefault(None, []).append(entry)
+                if state.specialization:
+                    self._heaps.setdefault(state.specialization, []).append(entry)
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def _peek(self, key):
+        heap = self._heaps.get(key)
+        while heap:
+            work, _, chef_id = heap[0]
+            state = self._chefs.get(chef_id)
+            if state and state.active and state.work == work:
+                return state
+            heapq.heappop(heap)
+        return None
+
+    def assign(self, work, category=None):
+        """Pick a chef for a line needing `work` minutes and charge it to them."""
+        with self._lock:
+            state = None
+            if self.match_specialization and category:
+                state = self._peek(category.strip().lower())
+            if state is None:
+                state = self._peek(None)
+            if state is None:
+                return None
+            state.work += work
+            self._push(state)
+            return state.chef_id
+
+    def add_work(self, chef_id, work):
+        with self._lock:
+            state = self._chefs.get(chef_id)
+            if state is None or not work:
+                return
+            state.work = max(0, state.work + work)
+            self._push(state)
+
+    def complete(self, chef_id, work):
+        self.add_work(chef_id, -work)
+
+    def stats(self):
+        with self._lock:
+            return {
+                chef_id: {'work': state.work, 'active': state.active,
+                          'specialization': state.specialization}
+                for chef_id, state in self._chefs.items()
+            }
+
+
+def round_robin_chef(order_id, chef_ids):
+    # The original policy: every line of an order goes to chef (order_id mod count)
+    return chef_ids[order_id % len(chef_ids)]
+
+
+def scheduler_from_env():
+    return ChefScheduler(
+        match_specialization=os.getenv('CHEF_MATCH_SPECIALIZATION', '0').lower() in ('1', 'true', 'yes'),
+        resync=float(os.getenv('CHEF_SCHEDULER_RESYNC', 60)),
+    )
@@ -138,3 +138,24 @@ INSERT INTO menu (item_name, allergen, rating, category, item_price, prep_time,
 ('Filter Coffee', 'Dairy', 4.5, 'Drinks', 39.00, 3, '/static/images/coffee.jpeg');
 
 ALTER TABLE orders ADD COLUMN bill_status ENUM('pending', 'requested', 'paid') DEFAULT 'pending';
+
+-- Daily sales rollups, updated when a bill is paid (see sales_rollup.py)
+CREATE TABLE IF NOT EXISTS sales_daily_items (
+    sale_date DATE NOT NULL,
+    item_id INT NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    qty INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    bills INT NOT NULL DEFAULT 0,
+    tax DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, item_id),
+    FOREIGN KEY (item_id) REFERENCES menu(item_id)
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily (
+    sale_date DATE PRIMARY KEY,
+    bills INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    tax DECIMAL(12,2) NOT NULL DEFAULT 0,
+    loyalty_points INT NOT NULL DEFAULT 0
+);
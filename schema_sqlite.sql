@@ -0,0 +1,200 @@
+-- SQLite schema for single-terminal kiosks and in-process benchmarks.
+-- Same tables as schema.sql with migrations 0001-0006 applied. A new database
+-- file gets it automatically the first time the app connects (DB_ENGINE=sqlite).
+-- Column types keep their MySQL names so values are read back as the same
+-- Python types (DECIMAL -> Decimal, TIMESTAMP/DATETIME -> datetime, DATE -> date).
+-- Timestamps default to local time, as MySQL's CURRENT_TIMESTAMP does.
+-- Keep semicolons out of comments and strings: statements are split on them.
+
+CREATE TABLE IF NOT EXISTS customer (
+    cust_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    c_phone VARCHAR(15) UNIQUE NOT NULL,
+    c_name VARCHAR(100) NOT NULL,
+    loyal_pts INT DEFAULT 100
+);
+
+CREATE TABLE IF NOT EXISTS employee (
+    emp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    e_name VARCHAR(100) NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('admin', 'chef', 'waiter')),
+    e_phone VARCHAR(15) UNIQUE NOT NULL,
+    passwd VARCHAR(255) NOT NULL,
+    e_status TEXT DEFAULT 'active' CHECK (e_status IN ('active', 'inactive')),
+    salary DECIMAL(10,2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chef (
+    chef_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id INT REFERENCES employee(emp_id),
+    specialization VARCHAR(100)
+);
+CREATE INDEX IF NOT EXISTS idx_chef_emp ON chef (emp_id);
+
+CREATE TABLE IF NOT EXISTS waiter (
+    waiter_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id INT REFERENCES employee(emp_id)
+);
+CREATE INDEX IF NOT EXISTS idx_waiter_emp ON waiter (emp_id);
+
+CREATE TABLE IF NOT EXISTS spots (
+    table_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    availability BOOLEAN DEFAULT 1,
+    QR_code VARCHAR(255) UNIQUE NOT NULL,
+    cust_id INT REFERENCES customer(cust_id),
+    waiter_id INT REFERENCES waiter(waiter_id)
+);
+-- InnoDB indexes foreign keys by itself
+CREATE INDEX IF NOT EXISTS idx_spots_cust ON spots (cust_id);
+CREATE INDEX IF NOT EXISTS idx_spots_waiter ON spots (waiter_id);
+CREATE INDEX IF NOT EXISTS idx_spots_availability ON spots (availability);
+
+CREATE TABLE IF NOT EXISTS menu (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name VARCHAR(100) NOT NULL,
+    allergen VARCHAR(255),
+    description TEXT,
+    rating DECIMAL(3,2) DEFAULT 0,
+    category VARCHAR(50) NOT NULL,
+    availability BOOLEAN DEFAULT 1,
+    item_price DECIMAL(10,2) NOT NULL,
+    prep_time INT NOT NULL,
+    image_url VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    paid_status BOOLEAN DEFAULT 0,
+    time_stamp TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    cust_id INT REFERENCES customer(cust_id),
+    bill_status TEXT DEFAULT 'pending' CHECK (bill_status IN ('pending', 'requested', 'paid')),
+    redeem_points INT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_orders_cust_paid ON orders (cust_id, paid_status);
+CREATE INDEX IF NOT EXISTS idx_orders_time_stamp ON orders (time_stamp);
+
+CREATE TABLE IF NOT EXISTS order_details (
+    order_id INT REFERENCES orders(order_id),
+    item_id INT REFERENCES menu(item_id),
+    order_status TEXT DEFAULT 'placed'
+        CHECK (order_status IN ('placed', 'cooking', 'cooked', 'delivered', 'billed')),
+    chef_id INT REFERENCES chef(chef_id),
+    qty INT NOT NULL,
+    item_name VARCHAR(100),
+    category VARCHAR(50),
+    unit_price DECIMAL(10,2),
+    PRIMARY KEY (order_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_order_details_item ON order_details (item_id);
+CREATE INDEX IF NOT EXISTS idx_order_details_chef_status ON order_details (chef_id, order_status);
+
+CREATE TABLE IF NOT EXISTS bill (
+    bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tot_amt DECIMAL(10,2) NOT NULL,
+    tax DECIMAL(10,2) NOT NULL,
+    discount DECIMAL(10,2) DEFAULT 0,
+    final_amt DECIMAL(10,2) NOT NULL,
+    pay_mode TEXT NOT NULL CHECK (pay_mode IN ('cash', 'online')),
+    order_id INT REFERENCES orders(order_id),
+    waiter_id INT REFERENCES waiter(waiter_id),
+    points_earned INT
+);
+CREATE INDEX IF NOT EXISTS idx_bill_order ON bill (order_id);
+
+CREATE TABLE IF NOT EXISTS sales_daily_items (
+    sale_date DATE NOT NULL,
+    item_id INT NOT NULL REFERENCES menu(item_id),
+    category VARCHAR(50) NOT NULL,
+    qty INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    bills INT NOT NULL DEFAULT 0,
+    tax DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, item_id)
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily (
+    sale_date DATE PRIMARY KEY,
+    bills INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    tax DECIMAL(12,2) NOT NULL DEFAULT 0,
+    loyalty_points INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS order_line_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INT NOT NULL,
+    item_id INT NOT NULL,
+    chef_id INT,
+    from_status TEXT CHECK (from_status IN ('placed', 'cooking', 'cooked', 'delivered', 'billed')),
+    to_status TEXT NOT NULL CHECK (to_status IN ('placed', 'cooking', 'cooked', 'delivered', 'billed')),
+    created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_order_line_events_created ON order_line_events (created_at);
+CREATE INDEX IF NOT EXISTS idx_order_line_events_line ON order_line_events (order_id, item_id);
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cust_id INT NOT NULL UNIQUE REFERENCES customer(cust_id) ON DELETE CASCADE,
+    polled_at DATETIME NOT NULL,
+    table_id INT
+);
+CREATE INDEX IF NOT EXISTS idx_waitlist_polled ON waitlist (polled_at);
+
+CREATE TABLE IF NOT EXISTS settings (
+    setting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tax_rate DECIMAL(5,2) NOT NULL DEFAULT 18.00,
+    points_per_rupee DECIMAL(6,2) NOT NULL DEFAULT 0.10,
+    rupee_per_point DECIMAL(6,2) NOT NULL DEFAULT 1.00,
+    min_points_redemption INT NOT NULL DEFAULT 100,
+    total_tables INT NOT NULL DEFAULT 20,
+    restaurant_name VARCHAR(100) NOT NULL DEFAULT 'Restaurant',
+    restaurant_address VARCHAR(255) NOT NULL DEFAULT '',
+    restaurant_phone VARCHAR(15) NOT NULL DEFAULT ''
+);
+INSERT INTO settings (tax_rate) VALUES (18.00);
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+INSERT INTO schema_migrations (version, name) VALUES
+(1, 'hot_path_indexes'),
+(2, 'order_line_events'),
+(3, 'billing_settings'),
+(4, 'order_line_price_snapshot'),
+(5, 'bill_points_earned'),
+(6, 'waitlist');
+
+-- Sample data, left out of benchmark databases
+INSERT INTO customer (c_phone, c_name, loyal_pts) VALUES
+('9876543210', 'John Doe', 150),
+('9876543211', 'Jane Smith', 200);
+
+INSERT INTO employee (e_name, role, e_phone, passwd, salary) VALUES
+('Admin User', 'admin', '9876543212', 'admin123', 50000),
+('Chef Gordon', 'chef', '9876543213', 'chef123', 45000),
+('Waiter Tom', 'waiter', '9876543214', 'waiter123', 30000);
+
+INSERT INTO chef (emp_id, specialization) VALUES
+(2, 'Italian Cuisine');
+
+INSERT INTO waiter (emp_id) VALUES
+(3);
+
+INSERT INTO spots (QR_code, waiter_id) VALUES
+('spot1_qr', 1),
+('spot2_qr', 1),
+('spot3_qr', 1);
+
+INSERT INTO menu (item_name, allergen, rating, category, item_price, prep_time, image_url) VALUES
+('Margherita Pizza', 'Dairy, Gluten', 4.5, 'Pizza', 299.00, 15, '/static/images/pizza.jpeg'),
+('Chicken Burger', 'Egg, Gluten', 4.2, 'Burgers', 199.00, 10, '/static/images/burger.jpeg'),
+('Caesar Salad', 'Egg, Dairy', 4.0, 'Salads', 149.00, 5, '/static/images/salad.jpeg'),
+('Dosa', 'Ghee, oil', 4.5, 'Tiffin', 99.00, 10, '/static/images/dosa.jpg'),
+('Idly', NULL, 4.9, 'Tiffin', 69.00, 15, '/static/images/idly.jpeg'),
+('Chapthi', 'Maida', 4.6, 'Tiffin', 49.00, 6, '/static/images/chapathi.jpeg'),
+('Veg Thali', 'Dairy', 4.7, 'Lunch', 349.00, 25, '/static/images/veg-thali.jpeg'),
+('Biryani', 'Cashew, Spices', 4.8, 'Lunch', 279.00, 25, '/static/images/biryani.jpeg'),
+('Noodles', 'Agino Moto', 4.9, 'Lunch', 350.00, 10, '/static/images/noodles.jpeg'),
+('Fresh Lime Soda', NULL, 4.2, 'Drinks', 49.00, 2, '/static/images/soda.jpeg'),
+('Filter Coffee', 'Dairy', 4.5, 'Drinks', 39.00, 3, '/static/images/coffee.jpeg');
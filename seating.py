@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class SeatAllocator:
+    """Hands out free spots from an in-memory free list.
+
+    Claiming a spot pops a candidate in O(1) and confirms it with a
+    conditional UPDATE; only the request whose UPDATE changed the row gets
+    the seat, so two logins can never be given the same table even across
+    worker processes. Releases from this process go straight back on the
+    list; releases made by other processes are picked up by a resync.
+    """
+
+    def __init__(self, resync=30, dining_minutes=45):
+        self.resync = resync
+        self._free = deque()
+        self._members = set()
+        self._synced_at = None
+        self._lock = threading.Lock()
+        # When each spot seated in this process was taken, and a moving
+        # average of how long a table stays occupied
+        self.seated_at = {}
+        self.dining_minutes = dining_minutes
+
+    def _take(self):
+        with self._lock:
+            if not self._free:
+                return None
+            table_id = self._free.popleft()
+            self._members.discard(table_id)
+            return table_id
+
+    def _due_resync(self):
+        return self._synced_at is None or time.monotonic() - self._synced_at > self.resync
+
+    def sync(self, cursor):
+        cursor.execute('SELECT table_id FROM spots WHERE availability = 1 ORDER BY table_id')
+        table_ids = [row['table_id'] for row in cursor.fetchall()]
+        with self._lock:
+            self._free = deque(table_ids)
+            self._members = set(table_ids)
+            self._synced_at = time.monotonic()
+
+    def claim(self, cursor, cust_id):
+        """Seat cust_id at a free spot and return its table_id, or None if the floor is full."""
+        if self._due_resync():
+            self.sync(cursor)
+        synced = False
+        while True:
+            table_id = self._take()
+            if table_id is None:
+                # The list may be missing spots freed by another worker
+                if synced or not self._due_resync():
+                    return None
+                self.sync(cursor)
+                synced = True
+                continue
+            cursor.execute("""
+                UPDATE spots
+                SET availability = 0, cust_id = %s
+                WHERE table_id = %s AND availability = 1
+            """, (cust_id, table_id))
+            if cursor.rowcount == 1:
+                self.seated_at[table_id] = time.monotonic()
+                return table_id
+            # Someone else got there first; the stale entry is already dropped
+
+    def claim_table(self, cursor, table_id, cust_id):
+        """Seat cust_id at one particular spot; False if it is no longer free."""
+        with self._lock:
+            if table_id in self._members:
+                self._members.discard(table_id)
+                self._free.remove(table_id)
+        cursor.execute("""
+            UPDATE spots
+            SET availability = 0, cust_id = %s
+            WHERE table_id = %s AND availability = 1
+        """, (cust_id, table_id))
+        if cursor.rowcount == 1:
+            self.seated_at[table_id] = time.monotonic()
+            return True
+        return False
+
+    def has_free(self):
+        return bool(self._free)
+
+    def release(self, table_id):
+        seated_at = self.seated_at.pop(table_id, None)
+        if seated_at is not None:
+            minutes = (time.monotonic() - seated_at) / 60
+            self.dining_minutes = 0.8 * self.dining_minutes + 0.2 * minutes
+        with self._lock:
+            if table_id not in self._members:
+                self._members.add(table_id)
+                self._free.append(table_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._synced_at = None
+
+    def stats(self):
+        with self._lock:
+            return {'free': len(self._free), 'resync': self.resync,
+                    'dining_minutes': round(self.dining_minutes, 1)}
+
+
+def seat_allocator_from_env():
+    return SeatAllocator(resync=float(os.getenv('SEAT_RESYNC', 30)),
+                         dining_minutes=float(os.getenv('DEFAULT_DINING_MINUTES', 45)))
@@ -0,0 +1,120 @@
+"""Production server: pre-forked gunicorn worker processes, each running a pool of threads.
+
+    python serve.py --workers 4 --threads 5 --bind 0.0.0.0:8000
+
+Each worker builds its own app after the fork, so nothing opened in the
+master (connections, the Redis listener thread) is shared between them.
+Before a worker accepts its first request it fills the connection pool
+with one connection per thread, loads the menu cache and compiles every
+template. SIGTERM stops the workers from accepting new connections, ends
+the open event streams and lets in-flight requests finish for up to
+--graceful-timeout seconds. SIGHUP replaces the workers the same way
+without closing the listening socket.
+
+`python app.py` is still the development server, with the debugger on.
+"""
+import argparse
+import os
+import signal
+import time
+
+
+def warm_up(app, connections):
+    """Open `connections` pooled connections, load the menu cache and compile the templates."""
+    from jinja2 import TemplateSyntaxError
+    from mysql.connector import Error
+    from blueprints.common import db_pool, get_menu_snapshot
+
+    menu_items = 0
+    try:
+        db_pool.warm(connections)
+        with app.app_context():
+            menu_items = len(get_menu_snapshot().by_id)
+    except Error as e:
+        # Serve anyway; the pool and the cache fill on demand once the database is back
+        print(f"Warm-up could not reach the database: {e}")
+    templates = 0
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(name)
+            templates += 1
+        except TemplateSyntaxError as e:
+            print(f"Template {name} does not compile: {e}")
+    return {'connections': db_pool.stats()['idle'], 'menu_items': menu_items, 'templates': templates}
+
+
+def post_worker_init(worker):
+    from blueprints.common import event_broker
+
+    started = time.perf_counter()
+    warmed = warm_up(worker.wsgi, worker.cfg.threads)
+    worker.log.info('Worker %s warmed in %.0f ms: %d connections, %d menu items, %d templates', worker.pid,
+                    (time.perf_counter() - started) * 1000, warmed['connections'], warmed['menu_items'],
+                    warmed['templates'])
+
+    # Event streams never finish by themselves; end them so the graceful
+    # shutdown only waits for real requests
+    stop = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        event_broker.close()
+        stop(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def server(options, roles=None):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError('serve.py requires gunicorn (pip install gunicorn), which runs on Unix only; '
+                           'use python app.py elsewhere')
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('post_worker_init', post_worker_init)
+
+        def load(self):
+            # Runs in each worker after the fork
+            from app import create_app
+
+            return create_app(roles)
+
+    return Server()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default=os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 8000)}"))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', (os.cpu_count() or 1) * 2)),
+                        help='worker processes (WEB_CONCURRENCY)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', os.getenv('DB_POOL_SIZE', 5))),
+                        help='request threads per worker (WEB_THREADS, default DB_POOL_SIZE)')
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv('GRACEFUL_TIMEOUT', 30)),
+                        help='seconds in-flight requests get to finish after SIGTERM')
+    parser.add_argument('--blueprints', default=os.getenv('APP_BLUEPRINTS'),
+                        help='roles this server serves, e.g. chef (APP_BLUEPRINTS, default all)')
+    parser.add_argument('--access-log', default=os.getenv('ACCESS_LOG'), help="file, or '-' for stdout")
+    args = parser.parse_args()
+
+    if args.workers > 1 and os.getenv('EVENT_BROKER', 'memory') == 'memory':
+        print('EVENT_BROKER=memory: live dashboards only see changes made through their own worker; '
+              'use EVENT_BROKER=redis with several workers')
+
+    server({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'graceful_timeout': args.graceful_timeout,
+        'accesslog': args.access_log,
+    }, args.blueprints).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+"""Server-side sessions whose cookie is a compact signed role token.
+
+The cookie carries only a session id, the user's id and role, and a flag
+saying whether anything else is kept for the session. Route guards read
+user_id and role straight from it. A logged-in session always has an entry
+in the SessionStore, read once per request: logging out deletes it, which
+revokes every copy of the cookie. Other session data (flash messages, the
+identity cache key, a waitlist ticket) lives in that entry; for visitors who
+are not logged in it is loaded the first time a route reads it. The token is
+signed with a key every worker process shares and that survives restarts, so
+a deploy does not log anyone out.
+"""
+import importlib
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, TimestampSigner
+
+TOKEN_KEYS = ('user_id', 'role')
+# WSGI environ key under which a caller hands over a session it already opened
+OPENED_SESSION = 'rms.session'
+
+
+class MemorySessionStore:
+    """Session data for this worker process only; lost on restart, which logs everyone out."""
+
+    # get(), touch() and set() do no I/O, so asgi.py calls them on the event loop
+    blocking = False
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._writes = 0
+        self._swept = 0
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if time.monotonic() > entry[1]:
+                del self._entries[sid]
+                return None
+            return entry[0]
+
+    def set(self, sid, data):
+        with self._lock:
+            self._entries[sid] = (data, time.monotonic() + self.ttl)
+            self._writes += 1
+            # Sessions that ended without logging out are swept now and then
+            if self._writes % 256 == 0:
+                self._sweep()
+
+    def touch(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (entry[0], time.monotonic() + self.ttl)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def _sweep(self):
+        now = time.monotonic()
+        for sid in [sid for sid, (_, expires) in self._entries.items() if now > expires]:
+            del self._entries[sid]
+            self._swept += 1
+
+    def stats(self):
+        with self._lock:
+            return {'store': 'memory', 'sessions': len(self._entries), 'writes': self._writes,
+                    'swept': self._swept}
+
+
+class FileSessionStore:
+    """One JSON file per session in a directory shared by every worker process on the host.
+
+    Files are replaced atomically, and a file's mtime is its last use, so
+    expiry needs no index. Expired files are swept at most every
+    `sweep_interval` seconds by whichever process writes next.
+    """
+
+    def __init__(self, ttl, directory, sweep_interval=300):
+        self.ttl = ttl
+        self.directory = directory
+        self.sweep_interval = sweep_interval
+        os.makedirs(directory, exist_ok=True)
+        self._swept_at = time.monotonic()
+        self._writes = 0
+        self._swept = 0
+        self._lock = threading.Lock()
+
+    def _path(self, sid):
+        # Session ids are token_urlsafe, so they are safe file names
+        return os.path.join(self.directory, f'{sid}.json')
+
+    def get(self, sid):
+        path = self._path(sid)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self.delete(sid)
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, sid, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self._path(sid))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self._lock:
+            self._writes += 1
+            due = time.monotonic() - self._swept_at > self.sweep_interval
+            if due:
+                self._swept_at = time.monotonic()
+        if due:
+            self.sweep()
+
+    def touch(self, sid):
+        try:
+            os.utime(self._path(sid))
+        except OSError:
+            pass
+
+    def delete(self, sid):
+        try:
+            os.unlink(self._path(sid))
+        except OSError:
+            pass
+
+    def sweep(self):
+        cutoff = time.time() - self.ttl
+        swept = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    # Leftover temp files of a crashed writer go too
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        swept += 1
+                except OSError:
+                    pass
+        with self._lock:
+            self._swept += swept
+        return swept
+
+    def stats(self):
+        with self._lock:
+            stats = {'store': 'file', 'directory': self.directory, 'writes': self._writes, 'swept': self._swept}
+        stats['sessions'] = sum(1 for name in os.listdir(self.directory) if name.endswith('.json'))
+        return stats
+
+
+class RedisSessionStore:
+    """Session data in Redis, shared by every worker on every host; Redis expires it."""
+
+    def __init__(self, ttl, url=None, prefix='rms:session:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RedisSessionStore requires the redis package (pip install redis)')
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        raw = self._redis.get(self.prefix + sid)
+        return json.loads(raw) if raw else None
+
+    def set(self, sid, data):
+        self._redis.setex(self.prefix + sid, int(self.ttl), json.dumps(data))
+        with self._lock:
+            self._writes += 1
+
+    def touch(self, sid):
+        self._redis.expire(self.prefix + sid, int(self.ttl))
+
+    def delete(self, sid):
+        self._redis.delete(self.prefix + sid)
+
+    def stats(self):
+        with self._lock:
+            return {'store': 'redis', 'writes': self._writes}
+
+
+class ServerSession(SessionMixin):
+    """user_id and role come from the cookie; every other key is loaded from the store on first use."""
+
+    def __init__(self, sid=None, token=None, load=None, issued_at=None, data=None):
+        self.sid = sid
+        self.token = dict(token or {})
+        self.issued_at = issued_at
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+        self.token_changed = False
+        self.data_changed = False
+        self._load = load
+        if data is None and not load:
+            data = {}
+        self._data = data
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def stored(self):
+        """True if the store may hold data for this session (read or not)."""
+        return bool(self._data) if self.loaded else self._load is not None
+
+    def _extras(self):
+        if self._data is None:
+            self._data = self._load() or {}
+        return self._data
+
+    # Sessions expire server-side after SESSION_TTL of inactivity, whatever Flask asks for
+    permanent = True
+
+    def __getitem__(self, key):
+        self.accessed = True
+        if key in TOKEN_KEYS:
+            return self.token[key]
+        return self._extras()[key]
+
+    def __setitem__(self, key, value):
+        self.accessed = self.modified = True
+        if key in TOKEN_KEYS:
+            self.token[key] = value
+            self.token_changed = True
+        else:
+            self._extras()[key] = value
+            self.data_changed = True
+
+    def __delitem__(self, key):
+        self.accessed = self.modified = True
+        if key in TOKEN_KEYS:
+            del self.token[key]
+            self.token_changed = True
+        else:
+            del self._extras()[key]
+            self.data_changed = True
+
+    def __iter__(self):
+        yield from list(self.token)
+        yield from list(self._extras())
+
+    def __len__(self):
+        return len(self.token) + len(self._extras())
+
+    def clear(self):
+        # Logging out needs nothing from the store
+        self.accessed = self.modified = True
+        self.token_changed = self.data_changed = True
+        self.token = {}
+        self._data = {}
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store, ttl):
+        self.store = store
+        self.ttl = ttl
+        # Re-issue the cookie, and keep its data alive, once it is this old
+        self.refresh_after = ttl / 4
+        self._opened = 0
+        self._loads = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def _signer(self, app):
+        return TimestampSigner(app.secret_key, salt='rms-session')
+
+    def open_session(self, app, request):
+        opened = request.environ.get(OPENED_SESSION)
+        if opened is not None:
+            return opened
+        return self.session_from_cookie(app, request.cookies.get(self.get_cookie_name(app)))
+
+    def session_from_cookie(self, app, raw):
+        """The session a cookie value stands for; also used by the asyncio app (asgi.py)."""
+        if not raw:
+            return ServerSession()
+        try:
+            value, issued_at = self._signer(app).unsign(raw, max_age=self.ttl, return_timestamp=True)
+            sid, role, user_id, has_data = value.decode().split('.')
+        except (BadSignature, ValueError):
+            with self._lock:
+                self._rejected += 1
+            return ServerSession()
+        token = {}
+        if user_id:
+            token['user_id'] = int(user_id)
+        if role:
+            token['role'] = role
+        load = self._loader(sid) if has_data == '1' else None
+        data = None
+        if user_id:
+            # Logging out deleted the entry: the cookie is revoked, even if it was copied
+            data = self._loader(sid)()
+            if data is None:
+                with self._lock:
+                    self._rejected += 1
+                return ServerSession()
+        with self._lock:
+            self._opened += 1
+        return ServerSession(sid, token, load, issued_at.timestamp(), data)
+
+    def _loader(self, sid):
+        def load():
+            with self._lock:
+                self._loads += 1
+            return self.store.get(sid)
+        return load
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        has_data = session.stored
+        # Logged-in sessions always keep an entry, even an empty one; see session_from_cookie()
+        keep = has_data or 'user_id' in session.token
+        if not session.token and not has_data:
+            if session.sid is not None:
+                if session.data_changed:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.sid is None or session.token_changed:
+            # A fresh id on login and logout, so a session id seen before cannot be reused after
+            if session.sid is not None:
+                if has_data:
+                    session._extras()
+                self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(24)
+            session.new = session.data_changed = True
+        refresh = self.needs_refresh(session)
+        if session.data_changed:
+            if keep:
+                self.store.set(session.sid, session._extras())
+            else:
+                self.store.delete(session.sid)
+        elif refresh and keep:
+            self.store.touch(session.sid)
+        if not (session.new or session.token_changed or session.data_changed or refresh):
+            return
+
+        response.set_cookie(name, self.cookie_value(app, session),
+                            domain=domain, path=path,
+                            httponly=self.get_cookie_httponly(app),
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+
+    def needs_refresh(self, session):
+        return session.issued_at is None or time.time() - session.issued_at > self.refresh_after
+
+    def cookie_value(self, app, session):
+        value = '.'.join([session.sid, session.token.get('role', ''), str(session.token.get('user_id', '')),
+                          '1' if session.stored else '0'])
+        return self._signer(app).sign(value).decode()
+
+    def refresh(self, app, session):
+        """Keep an unchanged session alive: a fresh cookie value once it is due, else None.
+
+        save_session() does this for the Flask app; asgi.py calls it for its own routes.
+        """
+        if session.sid is None or not session.token or not self.needs_refresh(session):
+            return None
+        self.store.touch(session.sid)
+        return self.cookie_value(app, session)
+
+    def stats(self):
+        stats = self.store.stats()
+        with self._lock:
+            stats.update({'opened': self._opened, 'loads': self._loads, 'rejected': self._rejected,
+                          'ttl': self.ttl})
+        return stats
+
+
+def secret_key_from_env(path=None):
+    """SECRET_KEY, or a key generated once into SECRET_KEY_FILE and shared by every worker process."""
+    key = os.getenv('SECRET_KEY')
+    if key:
+        return key
+    path = path or os.getenv('SECRET_KEY_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              '.secret_key'))
+    try:
+        with open(path) as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    # Publish the key with a hard link so simultaneously starting workers all
+    # end up with whichever key was written first
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+        os.chmod(tmp, 0o600)
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(tmp)
+    with open(path) as f:
+        return f.read().strip()
+
+
+def session_interface_from_env():
+    # SESSION_STORE is "memory", "file", "redis", "cookie" (Flask's signed
+    # cookie sessions) or a "module:Class" path to a custom store
+    # file is the default: its entries outlive a restart, and a logged-in
+    # cookie without an entry is rejected (see session_from_cookie)
+    name = os.getenv('SESSION_STORE', 'file')
+    ttl = float(os.getenv('SESSION_TTL', 12 * 3600))
+    if name == 'cookie':
+        return None
+    if name == 'memory':
+        store = MemorySessionStore(ttl)
+    elif name == 'file':
+        store = FileSessionStore(ttl, os.getenv('SESSION_DIR', os.path.join(tempfile.gettempdir(), 'rms_sessions')))
+    elif name == 'redis':
+        store = RedisSessionStore(ttl)
+    else:
+        module_name, class_name = name.split(':')
+        store = getattr(importlib.import_module(module_name), class_name)(ttl)
+    return ServerSessionInterface(store, ttl)
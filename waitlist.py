@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import dialect_of, to_datetime
+
+# Stands in for the ticket of a customer who is not queued: everyone is ahead
+MAX_TICKET = 2 ** 31 - 1
+
+
+class Waitlist:
+    """FIFO queue of customers waiting for a spot, kept in the `waitlist` table.
+
+    Every worker process sees the same queue, so a status poll or a freed
+    spot can be handled by any of them. A customer's row is seated by
+    setting its table_id with a conditional UPDATE; only one worker can
+    do that, so nobody is handed two spots. Rows that stop polling for
+    `abandon` seconds are ignored and later deleted. Wait estimates come
+    from a per-table snapshot (minutes seated and the longest open
+    prep_time) that each process refreshes at most every `refresh` seconds.
+    """
+
+    def __init__(self, abandon=120, refresh=15, buffer_minutes=10):
+        self.abandon = abandon
+        self.refresh = refresh
+        self.buffer_minutes = buffer_minutes
+        self._tables = []
+        self._tables_at = None
+        self._joins = 0
+        self._seated = 0
+        self._lock = threading.Lock()
+
+    def _cutoff(self):
+        return datetime.now() - timedelta(seconds=self.abandon)
+
+    def join(self, cursor, cust_id):
+        # Abandoned rows are deleted here, off the polling path
+        cursor.execute('DELETE FROM waitlist WHERE polled_at < %s', (self._cutoff(),))
+        # Joining again keeps the customer's place in the queue
+        dialect = dialect_of(cursor)
+        cursor.execute(f"""
+            INSERT INTO waitlist (cust_id, polled_at) VALUES (%s, %s)
+            {dialect.upsert('cust_id')}
+                polled_at = {dialect.inserted('polled_at')}
+        """, (cust_id, datetime.now()))
+        with self._lock:
+            self._joins += 1
+
+    def waiting_ahead(self, cursor, cust_id):
+        """(queued, ahead): whether cust_id is queued, and how many live, unseated
+        customers are before it (all of them if it is not queued)."""
+        cursor.execute("""
+            SELECT (SELECT ticket_id FROM waitlist WHERE cust_id = %s AND polled_at >= %s) AS ticket_id,
+                   COUNT(*) AS ahead
+            FROM waitlist
+            WHERE table_id IS NULL AND polled_at >= %s
+              AND ticket_id < COALESCE((SELECT ticket_id FROM waitlist WHERE cust_id = %s AND polled_at >= %s), %s)
+        """, (cust_id, self._cutoff(), self._cutoff(), cust_id, self._cutoff(), MAX_TICKET))
+        row = cursor.fetchone()
+        return row['ticket_id'] is not None, row['ahead']
+
+    def poll(self, cursor, cust_id):
+        """Keep cust_id's row alive and return (table_id, position), or None if it expired."""
+        cursor.execute("""
+            SELECT w.table_id,
+                   (SELECT COUNT(*) FROM waitlist a
+                    WHERE a.ticket_id < w.ticket_id AND a.table_id IS NULL AND a.polled_at >= %s) AS ahead
+            FROM waitlist w
+            WHERE w.cust_id = %s AND w.polled_at >= %s
+        """, (self._cutoff(), cust_id, self._cutoff()))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute('UPDATE waitlist SET polled_at = %s WHERE cust_id = %s', (datetime.now(), cust_id))
+        return row['table_id'], row['ahead']
+
+    def next_waiting(self, cursor):
+        cursor.execute("""
+            SELECT cust_id FROM waitlist
+            WHERE table_id IS NULL AND polled_at >= %s
+            ORDER BY ticket_id
+            LIMIT 1
+        """, (self._cutoff(),))
+        row = cursor.fetchone()
+        return row['cust_id'] if row else None
+
+    def seat(self, cursor, cust_id, table_id):
+        """Give cust_id's row table_id; False if it is gone or another worker seated it first."""
+        # The row is kept until the customer's next poll picks up the seat
+        cursor.execute("""
+            UPDATE waitlist SET table_id = %s, polled_at = %s
+            WHERE cust_id = %s AND table_id IS NULL
+        """, (table_id, datetime.now(), cust_id))
+        if cursor.rowcount != 1:
+            return False
+        with self._lock:
+            self._seated += 1
+        return True
+
+    def unseat(self, cursor, cust_id):
+        # The spot seat() promised could not be claimed after all
+        cursor.execute('UPDATE waitlist SET table_id = NULL WHERE cust_id = %s', (cust_id,))
+
+    def leave(self, cursor, cust_id):
+        cursor.execute('DELETE FROM waitlist WHERE cust_id = %s', (cust_id,))
+
+    def needs_tables(self):
+        return self._tables_at is None or time.monotonic() - self._tables_at > self.refresh
+
+    def load_tables(self, cursor):
+        # One row per occupied spot: when its unpaid order was opened and the
+        # longest prep_time still waiting in the kitchen
+        cursor.execute("""
+            SELECT s.table_id,
+                   MIN(o.time_stamp) AS opened_at,
+                   MAX(CASE WHEN od.order_status IN ('placed', 'cooking') THEN m.prep_time END) AS open_prep
+            FROM spots s
+            LEFT JOIN orders o ON o.cust_id = s.cust_id AND o.paid_status = 0
+            LEFT JOIN order_details od ON od.order_id = o.order_id
+            LEFT JOIN menu m ON m.item_id = od.item_id
+            WHERE s.availability = 0
+            GROUP BY s.table_id
+        """)
+        now = datetime.now()
+        tables = []
+        for row in cursor.fetchall():
+            opened_at = to_datetime(row['opened_at'])
+            seated_minutes = max(0.0, (now - opened_at).total_seconds() / 60) if opened_at else 0.0
+            tables.append((seated_minutes, float(row['open_prep'] or 0)))
+        with self._lock:
+            self._tables = tables
+            self._tables_at = time.monotonic()
+
+    def estimate(self, position, dining_minutes):
+        """Minutes until the customer at `position` (0 = next) should get a spot."""
+        with self._lock:
+            tables = list(self._tables)
+            age = 0 if self._tables_at is None else (time.monotonic() - self._tables_at) / 60
+        if not tables:
+            return 0
+        # A table frees up once its open dishes are served and eaten, but not
+        # before a typical meal there has run its course
+        etas = sorted(max(open_prep + self.buffer_minutes if open_prep else 0,
+                          dining_minutes - seated_minutes) - age
+                      for seated_minutes, open_prep in tables)
+        rounds, index = divmod(position, len(etas))
+        return max(0, round(etas[index] + rounds * dining_minutes))
+
+    def stats(self, cursor=None):
+        with self._lock:
+            stats = {'joins': self._joins, 'seated': self._seated, 'occupied_tables': len(self._tables)}
+        if cursor is not None:
+            cursor.execute("""
+                SELECT COALESCE(SUM(CASE WHEN table_id IS NULL THEN 1 ELSE 0 END), 0) AS waiting,
+                       COALESCE(SUM(CASE WHEN table_id IS NOT NULL THEN 1 ELSE 0 END), 0) AS seated_pending_poll
+                FROM waitlist
+                WHERE polled_at >= %s
+            """, (self._cutoff(),))
+            row = cursor.fetchone()
+            stats.update({'waiting': int(row['waiting']), 'seated_pending_poll': int(row['seated_pending_poll'])})
+        return stats
+
+
+def waitlist_from_env():
+    return Waitlist(
+        abandon=float(os.getenv('WAITLIST_ABANDON', 120)),
+        refresh=float(os.getenv('WAITLIST_ETA_REFRESH', 15)),
+        buffer_minutes=float(os.getenv('WAITLIST_BUFFER_MINUTES', 10)),
+    )